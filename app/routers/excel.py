@@ -1,11 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from app.services import excel_service, simo_service
 from schemas import simo_schemas
+from utils.json_serializer import SerializedPayload
 import os
 import json
 from typing import Dict, Any, List
 
-router = APIRouter()
+# Đóng AsyncClient dùng chung của SimoService khi ứng dụng tắt
+router = APIRouter(on_shutdown=[simo_service.SimoService.close])
 
 @router.post("/convert/{simo_code}")
 async def convert_excel(
@@ -26,15 +29,15 @@ async def convert_excel(
 
         try:
             # 3. Đọc file Excel
-            data = await excel_service.ExcelService.read_excel_to_dict(temp_file)
+            data = await run_in_threadpool(excel_service.ExcelService.read_excel_to_dict, temp_file)
             
-            # 4. Chuyển đổi dữ liệu
-            converted_data = await excel_service.ExcelService.convert_to_simo_format(data, simo_code)
+            # 4. Chuyển đổi dữ liệu (song song với file lớn), không chặn event loop
+            converted_data = await run_in_threadpool(
+                excel_service.ExcelService.convert_to_simo_format_parallel, data, simo_code)
             
             # 5. Lưu file JSON nếu có yêu cầu
             if save_path:
-                with open(save_path, "w", encoding="utf-8") as f:
-                    json.dump(converted_data, f, ensure_ascii=False, indent=2)
+                await run_in_threadpool(SerializedPayload(converted_data).save, save_path)
             
             # 6. Trả về kết quả
             return {
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, List
 import logging
@@ -5,6 +6,8 @@ import os
 import queue
 import json
 from datetime import datetime
+from models.parallel_converter import ParallelConverter
+from utils.json_serializer import SerializedPayload
 
 # Cấu hình logging
 logging.basicConfig(
@@ -18,6 +21,12 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Các cột mã cần giữ nguyên dạng chuỗi khi đọc file
+ID_COLUMNS = ["Cif", "SoID", "SoDienThoaiDangKyDichVu"]
+
+# Chuỗi số nguyên (có thể có dấu và khoảng trắng), tách dấu và phần số sau khi bỏ số 0 ở đầu
+INTEGER_PATTERN = r"^\s*([+-]?)0*(\d+)\s*$"
+
 class ExcelService:
     def __init__(self):
         self.receive_queue = queue.Queue()
@@ -53,8 +62,7 @@ class ExcelService:
         """Lưu dữ liệu JSON vào file"""
         try:
             logger.info(f"Bắt đầu lưu JSON vào file: {file_path}")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            SerializedPayload(data).save(file_path)
             logger.info(f"Lưu JSON vào file thành công: {file_path}")
         except Exception as e:
             logger.error(f"Lỗi khi lưu file JSON: {str(e)}")
@@ -118,42 +126,78 @@ class ExcelService:
     def read_file_to_dict(file_path: str) -> List[Dict[str, Any]]:
         """Đọc file Excel hoặc CSV và chuyển thành list of dict"""
         try:
-            # Kiểm tra định dạng file
-            file_extension = os.path.splitext(file_path)[1].lower()
-            
-            # Đọc file theo định dạng
-            if file_extension == '.xlsx' or file_extension == '.xls':
-                df = pd.read_excel(file_path)
-            elif file_extension == '.csv':
-                df = pd.read_csv(file_path, encoding='utf-8')
-            else:
-                raise Exception(f"Định dạng file không được hỗ trợ: {file_extension}")
-                
-            data = []
-            for _, row in df.iterrows():
-                row_dict = {}
-                for col in df.columns:
-                    value = row[col]
-                    # Xử lý giá trị null/nan/rỗng
-                    if pd.isna(value) or value == "":
-                        continue  # Bỏ qua trường rỗng
-                    else:
-                        # Xử lý đặc biệt cho các trường cần giữ số 0 ở đầu
-                        if col in ["Cif", "SoID", "SoDienThoaiDangKyDichVu"]:
-                            try:
-                                value = str(int(value)).zfill(len(str(int(value))))
-                            except:
-                                value = str(value)
-                        else:
-                            value = str(value)
-                        row_dict[col] = value
-                if row_dict:  # Chỉ thêm vào data nếu có dữ liệu
-                    data.append(row_dict)
-            return data
+            df = ExcelService.read_dataframe(file_path)
+            return ExcelService.dataframe_to_records(df)
         except Exception as e:
             logger.error(f"Lỗi khi đọc file: {str(e)}")
             raise Exception(f"Lỗi khi đọc file: {str(e)}")
 
+    @staticmethod
+    def read_dataframe(file_path: str) -> pd.DataFrame:
+        """Đọc file Excel hoặc CSV, các cột mã (Cif, SoID, số điện thoại) được đọc dạng chuỗi"""
+        # Kiểm tra định dạng file
+        file_extension = os.path.splitext(file_path)[1].lower()
+        
+        # Đọc cột mã dạng chuỗi để không mất số 0 ở đầu hay độ chính xác của số lớn
+        dtype = {col: str for col in ID_COLUMNS}
+        
+        # Đọc file theo định dạng
+        if file_extension == '.xlsx' or file_extension == '.xls':
+            return pd.read_excel(file_path, dtype=dtype)
+        elif file_extension == '.csv':
+            return pd.read_csv(file_path, encoding='utf-8', dtype=dtype)
+        else:
+            raise Exception(f"Định dạng file không được hỗ trợ: {file_extension}")
+
+    @staticmethod
+    def dataframe_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Chuyển DataFrame thành list of dict theo từng cột:
+        bỏ qua ô rỗng, mọi giá trị chuyển thành chuỗi, cột mã được chuẩn hóa như số nguyên
+        """
+        records = [{} for _ in range(len(df))]
+        for col in df.columns:
+            series = df[col]
+            
+            # Xử lý giá trị null/nan/rỗng
+            mask = series.notna().to_numpy()
+            if not pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_datetime64_any_dtype(series):
+                mask = mask & (series != "").to_numpy()
+            values = series[mask]
+            
+            if col in ID_COLUMNS:
+                values = ExcelService.normalize_id_column(values)
+            else:
+                values = values.astype(object).map(str)
+                
+            for position, value in zip(np.flatnonzero(mask).tolist(), values.tolist()):
+                records[position][col] = value
+                
+        # Chỉ giữ các dòng có dữ liệu
+        return [record for record in records if record]
+
+    @staticmethod
+    def normalize_id_column(values: pd.Series) -> pd.Series:
+        """
+        Chuẩn hóa cột mã: giá trị dạng số nguyên được viết lại như str(int(value))
+        (bỏ khoảng trắng, dấu + và số 0 ở đầu), các giá trị khác giữ nguyên dạng chuỗi
+        """
+        values = values.astype(object).map(str)
+        parts = values.str.extract(INTEGER_PATTERN)
+        is_integer = parts[1].notna()
+        if not is_integer.any():
+            return values
+            
+        sign = parts[0].where(parts[0] == "-", "")
+        sign = sign.where(parts[1] != "0", "")
+        normalized = (sign + parts[1]).where(is_integer, values)
+        return normalized.astype(object)
+
+    @staticmethod
+    def convert_to_simo_format_parallel(data: List[Dict[str, Any]], simo_code: str) -> List[Dict[str, Any]]:
+        """Chuyển đổi dữ liệu sang định dạng SIMO, chia phần chạy song song trên nhiều tiến trình khi dữ liệu lớn"""
+        return ParallelConverter().map_records(ExcelService.convert_to_simo_format, data, simo_code)
+
     @staticmethod
     def convert_to_simo_format(data: List[Dict[str, Any]], simo_code: str) -> List[Dict[str, Any]]:
         """Chuyển đổi dữ liệu sang định dạng SIMO"""
@@ -1,13 +1,41 @@
+import asyncio
 import pyodbc
-import requests
+import httpx
 import base64
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 import logging
+from utils.local_config import API_CONFIG
+from utils.compression import encode_json_body, normalize_encoding
 
 logger = logging.getLogger(__name__)
 
+# pyodbc chỉ có API đồng bộ: mọi truy vấn chạy trên pool luồng giới hạn để không chặn event loop
+_db_executor = ThreadPoolExecutor(max_workers=API_CONFIG.get('async_db_workers', 4),
+                                  thread_name_prefix='simo-db')
+
+
+async def run_db(func, *args):
+    """Chạy hàm truy vấn database đồng bộ trên pool luồng, chờ kết quả không chặn event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, func, *args)
+
+
 class SimoService:
+    # AsyncClient dùng chung (giữ kết nối keep-alive), gắn với event loop tạo ra nó
+    _client = None
+    _client_loop = None
+    # Token trong bộ nhớ: (access_token, hết hạn theo time.monotonic())
+    _token = None
+    _token_lock = None
+    _token_lock_loop = None
+    # (URL, kiểu nén) của endpoint đã đọc từ database
+    _endpoint_configs = {}
+    # Database cũ chưa có cột api_endpoint.content_encoding
+    _has_encoding_column = True
+
     @staticmethod
     def get_db_connection():
         """Kết nối đến database"""
@@ -29,21 +57,109 @@ class SimoService:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Lấy AsyncClient dùng chung cho event loop hiện tại"""
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client_loop is not loop or cls._client.is_closed:
+            pool_maxsize = API_CONFIG.get('pool_maxsize', 16)
+            cls._client = httpx.AsyncClient(
+                verify=False,
+                timeout=httpx.Timeout(API_CONFIG.get('timeout', 30), connect=10),
+                limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        """Đóng AsyncClient (gọi khi ứng dụng FastAPI tắt)"""
+        client, cls._client = cls._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    @classmethod
+    def _get_token_lock(cls) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if cls._token_lock is None or cls._token_lock_loop is not loop:
+            cls._token_lock = asyncio.Lock()
+            cls._token_lock_loop = loop
+        return cls._token_lock
+
     @staticmethod
-    async def get_token() -> Optional[Dict[str, Any]]:
-        """Lấy token hiện tại từ database"""
+    def _query_latest_token():
+        conn = SimoService.get_db_connection()
         try:
-            conn = SimoService.get_db_connection()
             cursor = conn.cursor()
             query = """
-                SELECT access_token, token_type, expires_in, created_at 
-                FROM api_tokens 
+                SELECT access_token, token_type, expires_in, created_at
+                FROM api_tokens
                 WHERE id = (SELECT MAX(id) FROM api_tokens)
             """
             cursor.execute(query)
+            return cursor.fetchone()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _query_token_request():
+        """Đọc thông tin xác thực và URL token"""
+        conn = SimoService.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username, password, consumer_key, consumer_secret FROM api_id WHERE id = 1")
+            api_info = cursor.fetchone()
+            cursor.execute("SELECT url FROM api_endpoint WHERE endpoint_name = 'token'")
+            token_url = cursor.fetchone()
+            return api_info, token_url[0] if token_url else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _insert_token(token_data, created_at):
+        conn = SimoService.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO api_tokens (
+                    access_token, token_type, expires_in, created_at
+                ) VALUES (?, ?, ?, ?)
+            """, (
+                token_data['access_token'],
+                token_data['token_type'],
+                token_data['expires_in'],
+                created_at
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _query_endpoint_config(endpoint_name):
+        conn = SimoService.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if SimoService._has_encoding_column:
+                try:
+                    cursor.execute(
+                        "SELECT url, content_encoding FROM api_endpoint WHERE endpoint_name = ?", endpoint_name)
+                    result = cursor.fetchone()
+                    return (result[0], result[1]) if result else None
+                except pyodbc.Error:
+                    logger.info("Bảng api_endpoint chưa có cột content_encoding, gửi không nén")
+                    SimoService._has_encoding_column = False
+            cursor.execute("SELECT url FROM api_endpoint WHERE endpoint_name = ?", endpoint_name)
             result = cursor.fetchone()
+            return (result[0], None) if result else None
+        finally:
             conn.close()
 
+    @staticmethod
+    async def get_token() -> Optional[Dict[str, Any]]:
+        """Lấy token hiện tại từ database"""
+        try:
+            result = await run_db(SimoService._query_latest_token)
+
             if not result:
                 return None
 
@@ -62,28 +178,21 @@ class SimoService:
     async def refresh_token() -> Dict[str, Any]:
         """Lấy token mới"""
         try:
-            # 1. Kết nối database
-            conn = SimoService.get_db_connection()
-            
-            # 2. Lấy thông tin API từ database
-            cursor = conn.cursor()
-            cursor.execute("SELECT username, password, consumer_key, consumer_secret FROM api_id WHERE id = 1")
-            api_info = cursor.fetchone()
-            
+            # 1. Lấy thông tin API và URL token từ database
+            api_info, token_url = await run_db(SimoService._query_token_request)
+
             if not api_info:
                 raise Exception("Không tìm thấy thông tin API")
-            
+            if not token_url:
+                raise Exception("Không tìm thấy URL token")
+
             username, password, consumer_key, consumer_secret = api_info
-            
-            # 3. Lấy URL token từ database
-            cursor.execute("SELECT url FROM api_endpoint WHERE endpoint_name = 'token'")
-            token_url = cursor.fetchone()[0]
-            
-            # 4. Tạo chuỗi xác thực Basic Auth
+
+            # 2. Tạo chuỗi xác thực Basic Auth
             auth_string = f"{consumer_key}:{consumer_secret}"
             auth_base64 = base64.b64encode(auth_string.encode("utf-8")).decode("utf-8")
-            
-            # 5. Gửi request lấy token
+
+            # 3. Gửi request lấy token
             headers = {
                 "Authorization": f"Basic {auth_base64}",
                 "Content-Type": "application/x-www-form-urlencoded"
@@ -93,26 +202,16 @@ class SimoService:
                 "username": username,
                 "password": password
             }
-            
-            response = requests.post(token_url, headers=headers, data=data, timeout=10, verify=False)
-            
-            # 6. Nếu thành công, lưu token vào database
+
+            response = await SimoService.get_client().post(token_url, headers=headers, data=data, timeout=10)
+
+            # 4. Nếu thành công, lưu token vào database
             if response.status_code == 200:
                 token_data = response.json()
                 if 'access_token' in token_data:
                     current_time = datetime.now()
-                    cursor.execute("""
-                        INSERT INTO api_tokens (
-                            access_token, token_type, expires_in, created_at
-                        ) VALUES (?, ?, ?, ?)
-                    """, (
-                        token_data['access_token'],
-                        token_data['token_type'],
-                        token_data['expires_in'],
-                        current_time
-                    ))
-                    conn.commit()
-                    
+                    await run_db(SimoService._insert_token, token_data, current_time)
+
                     return {
                         "access_token": token_data['access_token'],
                         "token_type": token_data['token_type'],
@@ -123,44 +222,90 @@ class SimoService:
                     raise Exception("Response không chứa access_token")
             else:
                 raise Exception(f"Lỗi khi lấy token: {response.text}")
-                
+
         except Exception as e:
             logger.error(f"Lỗi khi lấy token mới: {str(e)}")
             raise Exception(f"Lỗi khi lấy token mới: {str(e)}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
+
+    @staticmethod
+    def _remaining_seconds(token_response: Dict[str, Any]) -> float:
+        created_at = token_response["created_at"]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        expires_at = created_at + timedelta(seconds=int(token_response["expires_in"]))
+        return (expires_at - datetime.now()).total_seconds()
+
+    @classmethod
+    async def get_valid_token(cls) -> str:
+        """
+        Lấy access token còn hạn từ bộ nhớ; hết hạn thì đọc database hoặc lấy token mới.
+        Các request đồng thời chờ chung một lần làm mới.
+        """
+        margin = API_CONFIG.get('token_refresh_margin', 300)
+        token = cls._token
+        if token is not None and time.monotonic() < token[1]:
+            return token[0]
+
+        async with cls._get_token_lock():
+            # Request khác có thể đã làm mới token trong lúc chờ
+            token = cls._token
+            if token is not None and time.monotonic() < token[1]:
+                return token[0]
+
+            token_response = await cls.get_token()
+            remaining = cls._remaining_seconds(token_response) if token_response else 0
+            if remaining <= margin:
+                token_response = await cls.refresh_token()
+                remaining = int(token_response["expires_in"])
+
+            # Coi token hết hạn sớm refresh_margin giây (tối đa nửa thời hạn) để kịp làm mới
+            usable = remaining - min(margin, remaining / 2)
+            cls._token = (token_response["access_token"], time.monotonic() + usable)
+            return token_response["access_token"]
+
+    @classmethod
+    def invalidate_token(cls, access_token=None):
+        """Bỏ token trong bộ nhớ (ví dụ khi API trả 401)"""
+        if cls._token is not None and (access_token is None or cls._token[0] == access_token):
+            cls._token = None
+
+    @classmethod
+    async def get_endpoint_config(cls, endpoint_name: str):
+        """Lấy (URL, kiểu nén body) của endpoint, (None, None) nếu không có"""
+        config = cls._endpoint_configs.get(endpoint_name)
+        if config is None:
+            result = await run_db(cls._query_endpoint_config, endpoint_name)
+            if not result or not result[0]:
+                return None, None
+            config = (result[0], normalize_encoding(result[1]))
+            cls._endpoint_configs[endpoint_name] = config
+        return config
+
+    @classmethod
+    async def get_endpoint_url(cls, endpoint_name: str) -> Optional[str]:
+        return (await cls.get_endpoint_config(endpoint_name))[0]
 
     @staticmethod
     async def send_data(simo_code: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Gửi dữ liệu SIMO"""
         try:
             # 1. Lấy token
-            token_response = await SimoService.get_token()
-            if not token_response:
-                token_response = await SimoService.refresh_token()
-            
-            token = token_response["access_token"]
-            
-            # 2. Lấy endpoint URL
-            conn = SimoService.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Lấy URL endpoint theo mã SIMO
-            cursor.execute("SELECT url FROM api_endpoint WHERE endpoint_name = ?", f"simo_{simo_code}")
-            endpoint_url = cursor.fetchone()
-            
+            token = await SimoService.get_valid_token()
+
+            # 2. Lấy endpoint URL và kiểu nén theo mã SIMO
+            endpoint_url, content_encoding = await SimoService.get_endpoint_config(f"simo_{simo_code}")
+
             if not endpoint_url:
                 raise Exception(f"Không tìm thấy endpoint cho mã SIMO {simo_code}")
-            
+
             # 3. Tạo mã yêu cầu
             current_time = datetime.now().strftime("%d%m%Y.%H%M%S")
             maYeuCau = f"{simo_code}_{current_time}"
-            
+
             # 4. Lấy kỳ báo cáo
             current_date = datetime.now()
             ky_bao_cao = f"{current_date.month:02d}/{current_date.year}"
-            
+
             # 5. Chuẩn bị headers
             headers = {
                 "Authorization": f"Bearer {token}",
@@ -168,27 +313,41 @@ class SimoService:
                 "maYeuCau": maYeuCau,
                 "kyBaoCao": ky_bao_cao
             }
-            
+
             # Log thông tin request
-            logger.info(f"Gửi request đến {endpoint_url[0]}")
+            logger.info(f"Gửi request đến {endpoint_url}")
             logger.info(f"Headers: {headers}")
             logger.info(f"Data: {data}")
-            
-            # 6. Gửi request
+
+            # 6. Gửi request (tạo và nén body ngoài event loop vì payload có thể tới hàng chục MB)
             try:
-                response = requests.post(
-                    endpoint_url[0],
+                loop = asyncio.get_running_loop()
+                body, applied_encoding = await loop.run_in_executor(
+                    None, encode_json_body, data, content_encoding)
+                if applied_encoding:
+                    headers["Content-Encoding"] = applied_encoding
+                response = await SimoService.get_client().post(
+                    endpoint_url,
                     headers=headers,
-                    json=data,
-                    timeout=30,
-                    verify=False
+                    content=body
                 )
-                
+                if response.status_code == 415 and applied_encoding:
+                    # Gateway không nhận body nén: tắt nén cho endpoint này và gửi lại không nén
+                    logger.warning(f"simo_{simo_code} không hỗ trợ Content-Encoding {applied_encoding}")
+                    SimoService._endpoint_configs[f"simo_{simo_code}"] = (endpoint_url, None)
+                    del headers["Content-Encoding"]
+                    body, _ = await loop.run_in_executor(None, encode_json_body, data, None)
+                    response = await SimoService.get_client().post(
+                        endpoint_url,
+                        headers=headers,
+                        content=body
+                    )
+
                 # Log thông tin response
                 logger.info(f"Response status: {response.status_code}")
                 logger.info(f"Response headers: {response.headers}")
                 logger.info(f"Response content: {response.text}")
-                
+
                 # Kiểm tra response
                 if response.status_code == 200:
                     response_data = response.json()
@@ -200,17 +359,17 @@ class SimoService:
                         "data": response_data
                     }
                 else:
+                    if response.status_code == 401:
+                        # Lần gửi sau sẽ lấy token mới
+                        SimoService.invalidate_token(token)
                     error_msg = f"Lỗi HTTP {response.status_code}: {response.text}"
                     logger.error(error_msg)
                     raise Exception(error_msg)
-                    
-            except requests.exceptions.RequestException as e:
+
+            except httpx.HTTPError as e:
                 logger.error(f"Lỗi kết nối: {str(e)}")
                 raise Exception(f"Lỗi kết nối: {str(e)}")
-                
+
         except Exception as e:
             logger.error(f"Lỗi khi gửi dữ liệu: {str(e)}")
             raise Exception(f"Lỗi khi gửi dữ liệu: {str(e)}")
-        finally:
-            if 'conn' in locals():
-                conn.close() 
\ No newline at end of file
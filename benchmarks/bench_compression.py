@@ -0,0 +1,119 @@
+"""
+Đo số byte gửi đi và độ trễ gửi payload SIMO khi nén body request (gzip/deflate, utils/compression.py)
+so với không nén, trên một server cục bộ mô phỏng gateway với băng thông giới hạn.
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_compression.py --rows 20000 --service simo_001 --mbps 20
+--mbps 0 để không giới hạn băng thông (chỉ thấy chi phí CPU của việc nén).
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.simo_converter import SimoConverter
+from utils.compression import encode_json_body
+from utils.http_session import create_session
+from benchmarks.bench_simo_converter import make_records
+
+DECODERS = {
+    None: lambda body: body,
+    "gzip": gzip.decompress,
+    "deflate": zlib.decompress
+}
+
+
+def make_handler(bytes_per_second):
+    class MockSimoHandler(BaseHTTPRequestHandler):
+        """Đọc body theo băng thông giới hạn, giải nén theo Content-Encoding và kiểm tra JSON"""
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = bytearray()
+            started = time.perf_counter()
+            while len(body) < length:
+                body += self.rfile.read(min(64 * 1024, length - len(body)))
+                if bytes_per_second:
+                    # Chờ tới thời điểm đường truyền giới hạn mới nhận xong số byte này
+                    delay = started + len(body) / bytes_per_second - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+            records = json.loads(DECODERS[self.headers.get("Content-Encoding")](bytes(body)))
+            response = json.dumps({"code": "00", "records": len(records)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockSimoHandler
+
+
+def measure(session, url, payload, encoding, repeat):
+    latencies = []
+    encode_times = []
+    wire_bytes = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body, applied = encode_json_body(payload, encoding)
+        encode_times.append((time.perf_counter() - started) * 1000)
+        headers = {"Content-Type": "application/json"}
+        if applied:
+            headers["Content-Encoding"] = applied
+        response = session.post(url, data=body, headers=headers, timeout=300, verify=False)
+        response.raise_for_status()
+        assert response.json()["records"] == len(payload)
+        latencies.append((time.perf_counter() - started) * 1000)
+        wire_bytes = len(body)
+    return wire_bytes, statistics.median(encode_times), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--service", default="simo_001", choices=SimoConverter.SERVICE_TYPES)
+    parser.add_argument("--mbps", type=float, default=20, help="Băng thông mô phỏng (Mbit/s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    payload = SimoConverter.convert_to_simo(make_records(args.rows), args.service)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.mbps * 125000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/simo/{args.service[-3:]}"
+    session = create_session()
+
+    print(f"{args.rows:,} bản ghi {args.service}, băng thông {args.mbps or 'không giới hạn'} Mbit/s")
+    baseline = None
+    for encoding in (None, "gzip", "deflate"):
+        wire_bytes, encode_ms, latency_ms = measure(session, url, payload, encoding, args.repeat)
+        baseline = baseline or (wire_bytes, latency_ms)
+        print(f"  {encoding or 'không nén':<10} {wire_bytes / 1e6:8.2f} MB "
+              f"({baseline[0] / wire_bytes:5.1f}x nhỏ hơn), tạo body {encode_ms:7.1f} ms, "
+              f"gửi xong {latency_ms:8.1f} ms ({baseline[1] / latency_ms:4.1f}x)")
+
+    session.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+So sánh độ trễ gửi request bằng requests.post (mỗi lần một kết nối mới) với session dùng chung
+(utils/http_session.py) trên một mock server cục bộ mô phỏng SIMO gateway.
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_http_session.py --requests 300 --tls
+--tls cần lệnh openssl để tạo chứng chỉ tự ký tạm thời.
+"""
+import argparse
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import urllib3
+from utils.http_session import create_session
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class MockSimoHandler(BaseHTTPRequestHandler):
+    """Trả về 200 với JSON nhỏ, giữ kết nối như gateway thật (HTTP/1.1)"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Gửi header và body ngay, tránh trễ 40ms do Nagle + delayed ACK trên kết nối giữ lại
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({"code": "00", "message": "OK"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(use_tls, tmp_dir):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockSimoHandler)
+    scheme = "http"
+    if use_tls:
+        cert = os.path.join(tmp_dir, "cert.pem")
+        key = os.path.join(tmp_dir, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+            check=True, capture_output=True
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/api/simo/002"
+
+
+def measure(post, url, count, payload):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = post(url, json=payload, timeout=30)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {name:<22} trung bình {statistics.mean(latencies):7.2f} ms, "
+          f"p50 {statistics.median(latencies):7.2f} ms, p95 {p95:7.2f} ms")
+    return statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--tls", action="store_true")
+    args = parser.parse_args()
+
+    payload = [{"Cif": str(i), "SoTaiKhoan": str(10 ** 9 + i), "NghiNgo": 0} for i in range(50)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, url = start_server(args.tls, tmp_dir)
+        print(f"{args.requests} request tới {url}")
+
+        bare = report("requests.post", measure(
+            lambda *a, **kw: requests.post(*a, verify=False, **kw), url, args.requests, payload))
+        session = create_session()
+        pooled = report("session dùng chung", measure(
+            lambda *a, **kw: session.post(*a, verify=False, **kw), url, args.requests, payload))
+        print(f"  Giảm độ trễ trung bình: {bare / pooled:.1f}x")
+
+        session.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+So sánh serialize JSON bằng thư viện chuẩn và orjson (utils/json_serializer.py), và luồng
+hiển thị -> lưu file -> gửi cũ (json.dumps nhiều lần, parse lại chuỗi hiển thị) với luồng mới
+(serialize một lần bằng SerializedPayload).
+
+Chạy từ thư mục gốc của dự án (cần pip install orjson để so sánh hai thư viện):
+    python benchmarks/bench_json_serializer.py --rows 100000 --service simo_001
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.simo_converter import SimoConverter
+from utils import json_serializer
+from utils.submission_pipeline import split_payload
+from benchmarks.bench_simo_converter import make_records
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def legacy_workflow(data, file_path, chunk_size):
+    # ExcelTab/PreviewDialog cũ: dumps để hiển thị, dumps lại khi lưu, loads chuỗi hiển thị khi gửi,
+    # requests serialize từng phần bằng json.dumps
+    json_str = json.dumps(data, ensure_ascii=False, indent=2)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    payload = json.loads(json_str)
+    return [json.dumps(chunk).encode("utf-8") for chunk in split_payload(payload, chunk_size)]
+
+
+def serializer_workflow(data, file_path, chunk_size):
+    serialized = json_serializer.SerializedPayload(data)
+    serialized.text
+    serialized.save(file_path)
+    return [json_serializer.dumps(chunk) for chunk in split_payload(serialized.data, chunk_size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--service", default="simo_001", choices=SimoConverter.SERVICE_TYPES)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    data = SimoConverter.convert_to_simo(make_records(args.rows), args.service)
+    backends = ["json"] + (["orjson"] if json_serializer.orjson is not None else [])
+    print(f"{args.rows:,} bản ghi {args.service}, thư viện: {', '.join(backends)}")
+
+    reference = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    for backend in backends:
+        json_serializer.BACKEND = backend
+        pretty, pretty_ms = timed(lambda: json_serializer.dumps(data, indent=True), args.repeat)
+        compact, compact_ms = timed(lambda: json_serializer.dumps(data), args.repeat)
+        parsed, loads_ms = timed(lambda: json_serializer.loads(pretty), args.repeat)
+        print(f"  {backend:<7} dumps thụt lề {pretty_ms:7.1f} ms ({len(pretty) / 1e6:.1f} MB), "
+              f"dumps gọn {compact_ms:7.1f} ms ({len(compact) / 1e6:.1f} MB), loads {loads_ms:7.1f} ms, "
+              f"giống json chuẩn: {pretty == reference}, parse lại đúng: {parsed == data}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "payload.json")
+        _, legacy_ms = timed(lambda: legacy_workflow(data, file_path, args.chunk_size), args.repeat)
+        print(f"  Hiển thị + lưu file + body gửi, cách cũ          : {legacy_ms:8.1f} ms")
+        for backend in backends:
+            json_serializer.BACKEND = backend
+            _, new_ms = timed(lambda: serializer_workflow(data, file_path, args.chunk_size), args.repeat)
+            print(f"  Hiển thị + lưu file + body gửi, SerializedPayload ({backend:<6}): {new_ms:8.1f} ms "
+                  f"({legacy_ms / new_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
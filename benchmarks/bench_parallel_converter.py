@@ -0,0 +1,55 @@
+"""
+Đo khả năng mở rộng của ParallelConverter theo số tiến trình và kiểm tra kết quả
+giống hệt chuyển đổi tuần tự.
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_parallel_converter.py --rows 200000 --service simo_011
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.parallel_converter import ParallelConverter
+from models.simo_converter import SimoConverter
+from benchmarks.bench_simo_converter import make_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--service", default="simo_011", choices=SimoConverter.SERVICE_TYPES)
+    parser.add_argument("--workers", type=int, nargs="*",
+                        default=sorted({1, 2, 4, 8, 16, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    records = make_records(args.rows)
+
+    SimoConverter.clear_date_cache()
+    started = time.perf_counter()
+    expected = SimoConverter.convert_to_simo(records, args.service)
+    baseline = time.perf_counter() - started
+    print(f"{args.rows:,} bản ghi {args.service}, CPU: {os.cpu_count()}")
+    print(f"  tuần tự          : {baseline:.2f}s ({args.rows / baseline:,.0f} bản ghi/s)")
+
+    for workers in args.workers:
+        if workers < 2:
+            continue
+        converter = ParallelConverter(max_workers=workers, min_parallel_records=0)
+        # Lượt đầu để khởi động tiến trình con, không tính thời gian
+        converter.convert(records[:workers * 1000], args.service)
+        started = time.perf_counter()
+        result = converter.convert(records, args.service)
+        elapsed = time.perf_counter() - started
+        print(f"  {workers:>2} tiến trình    : {elapsed:.2f}s ({args.rows / elapsed:,.0f} bản ghi/s, "
+              f"{baseline / elapsed:.1f}x) giống nhau: {result == expected}")
+
+    ParallelConverter.shutdown_all()
+
+
+if __name__ == "__main__":
+    main()
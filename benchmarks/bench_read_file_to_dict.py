@@ -0,0 +1,112 @@
+"""
+So sánh ExcelService.read_file_to_dict (xử lý theo cột) với cách cũ dùng df.iterrows().
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_read_file_to_dict.py --rows 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from app.services.excel_service import ExcelService
+
+
+def legacy_read_file_to_dict(file_path):
+    """Cài đặt cũ, đọc từng dòng bằng iterrows()"""
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension == '.xlsx' or file_extension == '.xls':
+        df = pd.read_excel(file_path)
+    else:
+        df = pd.read_csv(file_path, encoding='utf-8')
+
+    data = []
+    for _, row in df.iterrows():
+        row_dict = {}
+        for col in df.columns:
+            value = row[col]
+            if pd.isna(value) or value == "":
+                continue
+            if col in ["Cif", "SoID", "SoDienThoaiDangKyDichVu"]:
+                try:
+                    value = str(int(value)).zfill(len(str(int(value))))
+                except:
+                    value = str(value)
+            else:
+                value = str(value)
+            row_dict[col] = value
+        if row_dict:
+            data.append(row_dict)
+    return data
+
+
+def make_frame(rows, seed=42):
+    """Sinh dữ liệu giống file TKTT thực tế, có ô rỗng và mã có số 0 ở đầu"""
+    rng = random.Random(seed)
+    start = datetime(1960, 1, 1)
+
+    def maybe(value, blank_rate=0.05):
+        return None if rng.random() < blank_rate else value
+
+    data = {
+        "Cif": [maybe(str(rng.randint(1, 10 ** 9))) for _ in range(rows)],
+        "SoID": [maybe(f"0{rng.randint(10 ** 10, 10 ** 11 - 1)}") for _ in range(rows)],
+        "LoaiID": [maybe(rng.choice([1, 2, 3])) for _ in range(rows)],
+        "TenKhachHang": [maybe(f"Nguyễn Văn {rng.randint(1, 99999)}") for _ in range(rows)],
+        "NgaySinh": [maybe(start + timedelta(days=rng.randint(0, 20000))) for _ in range(rows)],
+        "GioiTinh": [maybe(rng.choice([0, 1])) for _ in range(rows)],
+        "SoDienThoaiDangKyDichVu": [maybe(f"09{rng.randint(10 ** 7, 10 ** 8 - 1)}") for _ in range(rows)],
+        "DiaChi": [maybe(f"Số {rng.randint(1, 500)} đường {rng.randint(1, 50)}, Hà Nội", 0.2) for _ in range(rows)],
+        "SoTaiKhoan": [maybe(str(rng.randint(10 ** 9, 10 ** 12))) for _ in range(rows)],
+        "TrangThaiHoatDongTaiKhoan": [maybe(rng.choice([1, 2, 3])) for _ in range(rows)],
+        "GhiChu": [maybe("Nghi ngờ gian lận", 0.8) for _ in range(rows)],
+    }
+    return pd.DataFrame(data)
+
+
+def timed(func, file_path, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(file_path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", choices=["csv", "xlsx", "all"], default="all")
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    formats = ["csv", "xlsx"] if args.format == "all" else [args.format]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_format in formats:
+            file_path = os.path.join(tmp_dir, f"tktt.{file_format}")
+            if file_format == "csv":
+                frame.to_csv(file_path, index=False, encoding="utf-8")
+            else:
+                frame.to_excel(file_path, index=False)
+
+            legacy_time, legacy_result = timed(legacy_read_file_to_dict, file_path, args.repeat)
+            new_time, new_result = timed(ExcelService.read_file_to_dict, file_path, args.repeat)
+
+            print(f"[{file_format}] {args.rows:,} dòng")
+            print(f"  iterrows   : {legacy_time:.3f}s")
+            print(f"  theo cột   : {new_time:.3f}s ({legacy_time / new_time:.1f}x)")
+            print(f"  kết quả giống nhau: {legacy_result == new_result}")
+
+
+if __name__ == "__main__":
+    main()
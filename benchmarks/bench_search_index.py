@@ -0,0 +1,109 @@
+"""
+So sánh tìm kiếm theo Cif/Soid/tên khách hàng bằng LIKE '%...%' quét toàn bảng (giống câu truy vấn
+cũ trên TKTT) với chỉ mục FTS5 trigram của models/search_index.py, trên dữ liệu giả lập trong SQLite.
+Đo thời gian đếm số kết quả và lấy trang đầu (50 khóa theo thứ tự phân trang keyset).
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_search_index.py --rows 1000000
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.search_index import TKTTSearchIndex
+
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Hồ", "Ngô"]
+DEM = ["Văn", "Thị", "Hữu", "Minh", "Thanh", "Quốc", "Ngọc", "Đức", "Xuân", "Thu"]
+TEN = ["An", "Bình", "Cường", "Dũng", "Giang", "Hải", "Hạnh", "Khánh", "Linh", "Long", "Mai", "Nam",
+       "Nhung", "Phúc", "Quân", "Sơn", "Thảo", "Trang", "Tuấn", "Uyên", "Việt", "Yến"]
+
+# (điều kiện tìm kiếm, từ khóa LIKE trên dữ liệu gốc tương ứng)
+QUERIES = [
+    ({'customer_name': 'nguyen van'}, {'customer_name': 'Nguyễn Văn'}),
+    ({'customer_name': 'tuan'}, {'customer_name': 'Tuấn'}),
+    ({'cif_soid': '1234'}, {'cif_soid': '1234'}),
+    ({'cif_soid': '0795'}, {'cif_soid': '0795'}),
+]
+
+
+def make_rows(count):
+    random.seed(42)
+    for i in range(count):
+        update_date = f"20{random.randint(18, 24)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}T" \
+                      f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:00.000"
+        name = f"{random.choice(HO)} {random.choice(DEM)} {random.choice(TEN)}"
+        yield (f"{10000000 + i}", f"{random.randint(10 ** 11, 10 ** 12 - 1)}", update_date,
+               f"0{random.randint(10 ** 10, 10 ** 11 - 1)}", name)
+
+
+def build_like_table(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE tktt (Cif TEXT, SoTaiKhoan TEXT, UpdateDate TEXT, Soid TEXT, TenKhachHang TEXT)")
+    conn.executemany("INSERT INTO tktt VALUES (?, ?, ?, ?, ?)", rows)
+    conn.execute("CREATE INDEX idx_tktt_order ON tktt (UpdateDate DESC, Cif DESC, SoTaiKhoan DESC)")
+    conn.commit()
+    return conn
+
+
+def like_search(conn, conditions, limit):
+    clauses = []
+    params = []
+    if conditions.get('cif_soid'):
+        clauses.append("(Cif LIKE ? OR Soid LIKE ?)")
+        params.extend([f"%{conditions['cif_soid']}%"] * 2)
+    if conditions.get('customer_name'):
+        clauses.append("TenKhachHang LIKE ?")
+        params.append(f"%{conditions['customer_name']}%")
+    where_clause = " AND ".join(clauses)
+    count = conn.execute(f"SELECT COUNT(*) FROM tktt WHERE {where_clause}", params).fetchone()[0]
+    keys = conn.execute(f"SELECT UpdateDate, Cif, SoTaiKhoan FROM tktt WHERE {where_clause} "
+                        f"ORDER BY UpdateDate DESC, Cif DESC, SoTaiKhoan DESC LIMIT ?", params + [limit]).fetchall()
+    return count, keys
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rows = list(make_rows(args.rows))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        like_conn, build_like_ms = timed(lambda: build_like_table(os.path.join(tmp_dir, "like.db"), rows), 1)
+        index = TKTTSearchIndex(db_path=os.path.join(tmp_dir, "search_index.db"))
+        _, build_index_ms = timed(lambda: index.rebuild(rows), 1)
+        print(f"{args.rows:,} bản ghi, tạo bảng LIKE {build_like_ms / 1000:.1f}s, "
+              f"dựng chỉ mục trigram {build_index_ms / 1000:.1f}s")
+
+        for conditions, like_conditions in QUERIES:
+            (like_count, like_keys), like_ms = timed(lambda: like_search(like_conn, like_conditions, args.limit),
+                                                     args.repeat)
+            (index_count, index_keys), index_ms = timed(
+                lambda: (index.count(conditions), index.search_keys(conditions, args.limit)), args.repeat)
+            print(f"  {str(conditions):<32} LIKE {like_ms:8.1f} ms ({like_count:,} kết quả), "
+                  f"trigram {index_ms:8.1f} ms ({index_count:,} kết quả), "
+                  f"trang đầu giống nhau: {like_keys == index_keys}")
+        like_conn.close()
+
+
+if __name__ == "__main__":
+    main()
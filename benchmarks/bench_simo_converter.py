@@ -0,0 +1,125 @@
+"""
+So sánh SimoConverter (plan chuyển đổi dựng sẵn từ schema) với các hàm convert_to_simo_00X viết tay cũ.
+
+Chạy từ thư mục gốc của dự án:
+    python benchmarks/bench_simo_converter.py --rows 50000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.simo_converter import SimoConverter
+from benchmarks.legacy_simo_converter import LegacySimoConverter
+
+LEGACY_CONVERTERS = {
+    "simo_001": LegacySimoConverter.convert_to_simo_001,
+    "simo_002": LegacySimoConverter.convert_to_simo_002,
+    "simo_003": LegacySimoConverter.convert_to_simo_003,
+    "simo_004": LegacySimoConverter.convert_to_simo_004,
+    "simo_011": LegacySimoConverter.convert_to_simo_011,
+    "simo_012": LegacySimoConverter.convert_to_simo_012
+}
+
+
+def make_records(rows, seed=42):
+    """Sinh bản ghi lẫn các kiểu giá trị thường gặp từ Excel và database"""
+    rng = random.Random(seed)
+    start = datetime(1960, 1, 1)
+    date_pool = [start + timedelta(days=rng.randint(0, 20000)) for _ in range(3000)]
+
+    def date_value():
+        value = rng.choice(date_pool)
+        return rng.choice([
+            value,
+            value.strftime("%d/%m/%Y"),
+            value.strftime("%Y-%m-%d"),
+            str((value - datetime(1899, 12, 30)).days),
+            "",
+            None
+        ])
+
+    def int_value(choices):
+        return rng.choice(list(choices) + [str(rng.choice(choices)), "", None, "x", 1.0])
+
+    records = []
+    for _ in range(rows):
+        cif = str(rng.randint(1, 10 ** 9))
+        record = {
+            "Cif": cif,
+            "SoID": rng.choice([str(rng.randint(10 ** 7, 10 ** 12)), "B1234567", " 0123-456-789 ", None]),
+            "Soid": str(rng.randint(10 ** 7, 10 ** 12)),
+            "LoaiID": int_value([1, 2, 3]),
+            "LoaiD": int_value([1, 2, 3]),
+            "TenKhachHang": rng.choice(["Nguyễn Văn A", "  Trần Thị B  ", "", None]),
+            "NgaySinh": date_value(),
+            "GioiTinh": int_value([0, 1]),
+            "MaSoThue": rng.choice([str(rng.randint(10 ** 9, 10 ** 10)), "", None]),
+            "SoDienThoaiDangKyDichVu": rng.choice(["0912345678", "+84912345678", "912345678", None]),
+            "DiaChi": rng.choice(["Số 1 Hà Nội" * 40, "", None]),
+            "SoTaiKhoan": str(rng.randint(10 ** 9, 10 ** 12)),
+            "LoaiTaiKhoan": int_value([1, 2]),
+            "TrangThaiHoatDongTaiKhoan": int_value([1, 2, 3]),
+            "NgayMoTaiKhoan": date_value(),
+            "PhuongThucMoTaiKhoan": int_value([1, 2]),
+            "NgayXacThucTaiQuay": date_value(),
+            "NghiNgo": int_value([0, 1, 2]),
+            "GhiChu": rng.choice(["Nghi ngờ", "", "None", None]),
+            "QuocTich": "VN"
+        }
+        # Một phần bản ghi thiếu trường như file Excel không đủ cột
+        for field in rng.sample(list(record), rng.randint(0, 3)):
+            del record[field]
+        records.append(record)
+    return records
+
+
+def timed(funcs, records, repeat, setups=None):
+    """Chạy xen kẽ các hàm trong mỗi lần lặp để chúng chịu cùng điều kiện máy, trả về thời gian tốt nhất"""
+    setups = setups or [None] * len(funcs)
+    best = [None] * len(funcs)
+    results = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, (func, setup) in enumerate(zip(funcs, setups)):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            results[i] = func(records)
+            elapsed = time.perf_counter() - started
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Tắt log để không đo thời gian ghi log cảnh báo chuẩn hóa số ID/điện thoại
+    logging.disable(logging.CRITICAL)
+    records = make_records(args.rows)
+    print(f"{args.rows:,} bản ghi, lấy thời gian tốt nhất sau {args.repeat} lần chạy")
+    print(f"{'Loại':<10}{'viết tay (bản ghi/s)':>24}{'plan (bản ghi/s)':>20}{'tăng tốc':>10}  giống nhau")
+    for service_type, legacy in LEGACY_CONVERTERS.items():
+        (legacy_time, plan_time), (legacy_result, plan_result) = timed(
+            [legacy, lambda data: SimoConverter.convert_to_simo(data, service_type)], records, args.repeat,
+            setups=[None, SimoConverter.clear_date_cache])
+        print(f"{service_type:<10}{args.rows / legacy_time:>24,.0f}{args.rows / plan_time:>20,.0f}"
+              f"{legacy_time / plan_time:>9.1f}x  {legacy_result == plan_result}")
+
+    # Thống kê cache ngày trên một lượt simo_011 bắt đầu với cache rỗng
+    SimoConverter.clear_date_cache()
+    SimoConverter.convert_to_simo(records, "simo_011")
+    stats = SimoConverter.get_date_cache_stats()
+    print(f"Cache ngày (simo_011, cache rỗng ban đầu): hit {stats['hits']:,}, miss {stats['misses']:,} "
+          f"({stats['hit_rate']:.1%}), nhận dạng nhanh {stats['fast_path']:,}, strptime {stats['strptime']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,37 @@ class TKTTController:
     def __init__(self):
         self.model = TKTTModel()
         
-    def get_paginated_data(self, page, rows_per_page, search_conditions=None):
-        """Lấy dữ liệu có phân trang"""
+    def get_paginated_data(self, page, rows_per_page, search_conditions=None,
+                           cursor=None, direction='next', keyset=False):
+        """
+        Lấy dữ liệu có phân trang
+        :param keyset: True để dùng phân trang keyset (seek) thay cho OFFSET, khi đó
+                       cursor/direction xác định trang cần lấy và kết quả có thêm
+                       next_cursor/prev_cursor cho lần gọi tiếp theo
+        """
         try:
+            total_records = self.model.get_total_records(search_conditions)
+            total_pages = (total_records + rows_per_page - 1) // rows_per_page
+            
+            if keyset or cursor:
+                page_data = self.model.get_records_keyset(rows_per_page, search_conditions,
+                                                          cursor=cursor, direction=direction)
+                return {
+                    'records': page_data['rows'],
+                    'columns': page_data['columns'],
+                    'next_cursor': page_data['next_cursor'],
+                    'prev_cursor': page_data['prev_cursor'],
+                    'total_records': total_records,
+                    'total_pages': total_pages
+                }
+            
             offset = (page - 1) * rows_per_page
-            total_records = self.model.get_total_records()
             records = self.model.get_records(offset, rows_per_page, search_conditions)
             
             return {
                 'records': records,
                 'total_records': total_records,
-                'total_pages': (total_records + rows_per_page - 1) // rows_per_page
+                'total_pages': total_pages
             }
         except Exception as e:
             logger.error(f"Lỗi khi lấy dữ liệu phân trang: {str(e)}")
@@ -1,16 +1,21 @@
 import tkinter as tk
 from tkinter import ttk
 import os
+import multiprocessing
 from datetime import datetime
 from utils.logger import Logger
 from utils.api_handler import APIHandler
 from utils.db_handler import DatabaseHandler
+from utils.outbox import OutboxWorker
+from utils.local_config import API_CONFIG
+from models.search_index import TKTTSearchIndex, SearchIndexSyncWorker
 from models.simo_converter import SimoConverter
 from controllers.tktt_controller import TKTTController
 from views.excel_tab import ExcelTab
 from views.tktt_tab import TKTTTab
 from views.json_converter_tab import JSONConverterTab
 from views.fraud_detection_tab import FraudDetectionTab
+from views.outbox_tab import OutboxTab
 
 logger = Logger('main')
 
@@ -47,6 +52,19 @@ class SimoGUI:
         self.simo_converter = SimoConverter()
         self.tktt_controller = TKTTController()
         
+        # Luồng nền gửi lại các phần còn trong outbox (kể cả từ lần chạy trước)
+        self.outbox_worker = None
+        if self.api_handler.outbox is not None:
+            self.outbox_worker = OutboxWorker(self.api_handler, self.api_handler.outbox)
+            self.outbox_worker.start()
+
+        # Luồng nền dựng và cập nhật chỉ mục tìm kiếm TKTT (tìm kiếm dùng LIKE cho tới khi dựng xong)
+        self.search_index_worker = None
+        if API_CONFIG.get('search_index_enabled', True):
+            self.search_index_worker = SearchIndexSyncWorker(TKTTSearchIndex.shared(self.db_handler))
+            self.search_index_worker.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Thiết lập style
         self.setup_ui_style()
         
@@ -130,6 +148,19 @@ class SimoGUI:
         self.json_converter_tab = JSONConverterTab(self.tab_control, self.api_handler)
         self.tab_control.add(self.json_converter_tab.get_tab_frame(), text="JSON Converter")
 
+        # Tab theo dõi outbox gửi dữ liệu
+        if self.api_handler.outbox is not None:
+            self.outbox_tab = OutboxTab(self.tab_control, self.api_handler.outbox, self.outbox_worker)
+            self.tab_control.add(self.outbox_tab.get_tab_frame(), text="Outbox")
+
+    def on_close(self):
+        """Dừng luồng gửi outbox trước khi đóng cửa sổ; phần đang gửi dở sẽ được gửi lại ở lần chạy sau"""
+        if self.outbox_worker is not None:
+            self.outbox_worker.stop()
+        if self.search_index_worker is not None:
+            self.search_index_worker.stop()
+        self.root.destroy()
+
     def run(self):
         """Chạy ứng dụng"""
         self.root.mainloop()
@@ -147,6 +178,9 @@ def check_portable_mode():
         return False
 
 if __name__ == "__main__":
+    # Cần cho pool tiến trình chuyển đổi khi đóng gói bằng PyInstaller
+    multiprocessing.freeze_support()
+    
     # Kiểm tra chế độ portable
     is_portable = check_portable_mode()
     
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from utils.logger import Logger
+from models.record_count_service import RecordCountService
+
+logger = Logger('page_cache')
+
+
+class PageCache:
+    """
+    Cache LRU có giới hạn cho các trang TKTT đã tải (phân trang keyset).
+    Khóa gồm điều kiện tìm kiếm, danh sách cột, số dòng mỗi trang, cursor và hướng, nên mỗi
+    trang của một bộ lọc chỉ được truy vấn một lần; trang đang được tải trước sẽ được dùng
+    lại thay vì truy vấn lần nữa. Cache dùng chung giữa các instance giống RecordCountService
+    để cập nhật trạng thái nghi ngờ ở tab này cũng xóa trang cũ ở các tab khác.
+    """
+    _cache = OrderedDict()
+    _pending = {}
+    _generation = 0
+    _cache_lock = Lock()
+
+    def __init__(self, max_pages=20, ttl=60):
+        """
+        :param max_pages: Số trang tối đa giữ trong cache
+        :param ttl: Thời gian (giây) một trang được coi là còn mới
+        """
+        self.max_pages = max_pages
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(search_conditions, select_columns, limit, cursor, direction):
+        return (RecordCountService.make_signature(search_conditions), select_columns, limit, cursor, direction)
+
+    def get(self, key):
+        """Lấy trang trong cache, None nếu chưa có hoặc đã hết hạn"""
+        with self._cache_lock:
+            return self._get_fresh(key)
+
+    def _get_fresh(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        page_data, cached_at = entry
+        if time.monotonic() - cached_at >= self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return page_data
+
+    def get_or_load(self, key, loader):
+        """
+        Lấy trang từ cache, hoặc gọi loader() để tải. Nếu trang đang được luồng khác tải
+        (ví dụ đang tải trước) thì chờ kết quả đó thay vì truy vấn lại.
+        """
+        with self._cache_lock:
+            page_data = self._get_fresh(key)
+            if page_data is not None:
+                return page_data
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+                generation = PageCache._generation
+        if not owner:
+            return future.result()
+
+        try:
+            page_data = loader()
+        except Exception as e:
+            with self._cache_lock:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._cache_lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            # Không lưu kết quả đã cũ nếu cache bị xóa trong lúc đang tải
+            if generation == PageCache._generation:
+                self._cache[key] = (page_data, time.monotonic())
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_pages:
+                    self._cache.popitem(last=False)
+        future.set_result(page_data)
+        return page_data
+
+    def invalidate(self, search_conditions=None):
+        """Xóa các trang của một điều kiện tìm kiếm, hoặc toàn bộ cache nếu không truyền"""
+        with self._cache_lock:
+            PageCache._generation += 1
+            # Lần tải sau phải truy vấn mới, không chờ các lần tải đang chạy từ trước
+            self._pending.clear()
+            if search_conditions is None:
+                self._cache.clear()
+            else:
+                signature = RecordCountService.make_signature(search_conditions)
+                for key in [key for key in self._cache if key[0] == signature]:
+                    del self._cache[key]
@@ -0,0 +1,159 @@
+import os
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from models.simo_converter import SimoConverter
+from utils.logger import Logger
+
+logger = Logger('parallel_converter')
+
+
+def convert_chunk(chunk, service_type, validate=False):
+    """
+    Chuyển đổi một phần dữ liệu sang định dạng SIMO (chạy trong tiến trình con)
+    :return: tuple (payload, errors) với errors là list (chỉ số trong payload, thông báo lỗi)
+    """
+    payload = SimoConverter.convert_to_simo(chunk, service_type)
+    errors = SimoConverter.collect_validation_errors(payload) if validate else []
+    return payload, errors
+
+
+class ParallelConverter:
+    """
+    Chuyển đổi dữ liệu SIMO song song bằng ProcessPoolExecutor.
+    Dữ liệu được chia thành các phần, kết quả được ghép lại theo đúng thứ tự đầu vào.
+    Dữ liệu nhỏ hơn min_parallel_records được xử lý ngay trong tiến trình hiện tại
+    vì chi phí gửi dữ liệu sang tiến trình con lớn hơn thời gian tiết kiệm được.
+    """
+    # Pool tiến trình dùng chung theo số worker, khởi tạo khi cần lần đầu
+    _executors = {}
+    _executors_lock = threading.Lock()
+
+    def __init__(self, max_workers=None, chunk_size=None, min_parallel_records=20000):
+        """
+        :param max_workers: Số tiến trình con, mặc định bằng số CPU
+        :param chunk_size: Số bản ghi mỗi phần; mặc định chia đều để mỗi worker nhận khoảng 4 phần
+        :param min_parallel_records: Số bản ghi tối thiểu để chạy song song
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel_records = min_parallel_records
+
+    def _get_executor(self):
+        with self._executors_lock:
+            executor = self._executors.get(self.max_workers)
+            if executor is None:
+                # spawn để tiến trình con không kế thừa trạng thái luồng của GUI/pool kết nối
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                self._executors[self.max_workers] = executor
+                logger.info(f"Khởi tạo pool chuyển đổi với {self.max_workers} tiến trình")
+            return executor
+
+    def _should_parallelize(self, total):
+        return self.max_workers > 1 and total >= self.min_parallel_records
+
+    def _get_chunk_size(self, total):
+        if self.chunk_size:
+            return self.chunk_size
+        return max(1000, -(-total // (self.max_workers * 4)))
+
+    def map_chunks(self, func, chunks, *args):
+        """
+        Chạy func(chunk, *args) cho từng phần trên pool tiến trình, trả về generator kết quả
+        theo đúng thứ tự các phần. Số phần đang xử lý được giới hạn để không đọc trước
+        toàn bộ dữ liệu khi chunks là generator.
+        :param func: Hàm cấp module (pickle được)
+        """
+        executor = self._get_executor()
+        max_in_flight = self.max_workers * 2
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, *args))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def map_records(self, func, data, *args):
+        """
+        Chạy func(chunk, *args) -> list trên từng phần của data và ghép kết quả theo thứ tự.
+        Dữ liệu nhỏ được xử lý trong tiến trình hiện tại.
+        """
+        if not self._should_parallelize(len(data)):
+            return func(data, *args)
+        size = self._get_chunk_size(len(data))
+        chunks = (data[start:start + size] for start in range(0, len(data), size))
+        result = []
+        for part in self.map_chunks(func, chunks, *args):
+            result.extend(part)
+        return result
+
+    def convert(self, data, service_type):
+        """Chuyển đổi danh sách bản ghi sang định dạng SIMO"""
+        payload, _ = self._convert(data, service_type, validate=False)
+        return payload
+
+    def convert_and_validate(self, data, service_type):
+        """
+        Chuyển đổi và kiểm tra dữ liệu trong cùng một lượt
+        :return: tuple (payload, is_valid, warnings) như validate_data_before_export
+        """
+        payload, errors = self._convert(data, service_type, validate=True)
+        warnings = [f"Bản ghi #{index + 1}: {error}" for index, error in errors]
+        return payload, not errors, warnings
+
+    def convert_iter(self, rows, service_type, batch_size=1000):
+        """
+        Chuyển đổi một luồng bản ghi (ví dụ đọc từ Excel), trả về generator bản ghi SIMO.
+        Đọc trước tối đa min_parallel_records dòng; nếu luồng kết thúc trước đó thì xử lý tại chỗ.
+        """
+        rows = iter(rows)
+        head = list(islice(rows, self.min_parallel_records))
+        if not self._should_parallelize(len(head)):
+            for start in range(0, len(head), batch_size):
+                yield from SimoConverter.convert_to_simo(head[start:start + batch_size], service_type)
+            return
+
+        size = self.chunk_size or max(batch_size, 1000)
+
+        def chunks():
+            for start in range(0, len(head), size):
+                yield head[start:start + size]
+            while True:
+                chunk = list(islice(rows, size))
+                if not chunk:
+                    return
+                yield chunk
+
+        for payload, _ in self.map_chunks(convert_chunk, chunks(), service_type):
+            yield from payload
+
+    def _convert(self, data, service_type, validate):
+        if service_type not in SimoConverter.SERVICE_TYPES:
+            raise ValueError(f"Không hỗ trợ định dạng SIMO: {service_type}")
+        if not self._should_parallelize(len(data)):
+            return convert_chunk(data, service_type, validate)
+
+        size = self._get_chunk_size(len(data))
+        chunks = (data[start:start + size] for start in range(0, len(data), size))
+        payload = []
+        errors = []
+        for part, part_errors in self.map_chunks(convert_chunk, chunks, service_type, validate):
+            # Chỉ số lỗi trong từng phần được dời theo số bản ghi đã chuyển đổi trước đó
+            errors.extend((len(payload) + index, error) for index, error in part_errors)
+            payload.extend(part)
+        return payload, errors
+
+    @classmethod
+    def shutdown_all(cls):
+        """Đóng tất cả pool tiến trình"""
+        with cls._executors_lock:
+            executors = list(cls._executors.values())
+            cls._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
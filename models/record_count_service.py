@@ -0,0 +1,118 @@
+import time
+from threading import Lock
+from utils.logger import Logger
+
+logger = Logger('record_count_service')
+
+
+class RecordCountService:
+    """
+    Đếm số bản ghi TKTT Cá nhân có cache theo điều kiện tìm kiếm.
+    Cache được dùng chung giữa các instance để một thao tác ghi ở tab này
+    cũng làm mới số liệu ở các tab khác.
+    """
+    _cache = {}
+    _cache_lock = Lock()
+
+    def __init__(self, db_handler, ttl=60, search_index=None):
+        """
+        :param db_handler: DatabaseHandler dùng để truy vấn
+        :param ttl: Thời gian (giây) một kết quả đếm chính xác được coi là còn mới
+        :param search_index: TKTTSearchIndex dùng để đếm khi có điều kiện tìm kiếm (tùy chọn)
+        """
+        self.db_handler = db_handler
+        self.ttl = ttl
+        self.search_index = search_index
+
+    @staticmethod
+    def make_signature(search_conditions=None):
+        """Tạo khóa cache từ điều kiện tìm kiếm"""
+        if not search_conditions:
+            return ()
+        return tuple(sorted((key, str(value).strip())
+                            for key, value in search_conditions.items() if value))
+
+    def get_cached_count(self, search_conditions=None, allow_stale=False):
+        """Lấy số bản ghi trong cache, None nếu chưa có hoặc đã hết hạn"""
+        signature = self.make_signature(search_conditions)
+        with self._cache_lock:
+            entry = self._cache.get(signature)
+        if not entry:
+            return None
+        count, cached_at = entry
+        if allow_stale or time.monotonic() - cached_at < self.ttl:
+            return count
+        return None
+
+    def get_exact_count(self, search_conditions=None, force=False):
+        """Đếm chính xác bằng COUNT(*), dùng cache nếu kết quả còn mới"""
+        if not force:
+            cached = self.get_cached_count(search_conditions)
+            if cached is not None:
+                return cached
+
+        if self.search_index is not None and self.make_signature(search_conditions) and \
+                self.search_index.is_ready():
+            count = self.search_index.count(search_conditions)
+            self.set_count(search_conditions, count)
+            return count
+
+        # Import tại chỗ để tránh vòng import với tktt_model
+        from models.tktt_model import TKTTModel
+        where_clause, params = TKTTModel.build_search_clause(search_conditions)
+        query = f"SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}"
+        result = self.db_handler.execute_query(query, params=params, fetchall=False)
+        count = result[0] if result else 0
+        self.set_count(search_conditions, count)
+        return count
+
+    def set_count(self, search_conditions, count):
+        """Lưu số bản ghi chính xác đã biết (ví dụ từ kết quả tìm kiếm đầy đủ trong bộ nhớ)"""
+        with self._cache_lock:
+            self._cache[self.make_signature(search_conditions)] = (count, time.monotonic())
+
+    def get_approximate_count(self):
+        """
+        Ước lượng số bản ghi từ metadata phân vùng (sys.dm_db_partition_stats),
+        không quét bảng. Đây là tổng số dòng của cả bảng TKTT nên chỉ là cận trên.
+        """
+        query = """
+            SELECT SUM(row_count)
+            FROM sys.dm_db_partition_stats
+            WHERE object_id = OBJECT_ID('TKTT') AND index_id IN (0, 1)
+        """
+        try:
+            result = self.db_handler.execute_query(query, fetchall=False)
+            return int(result[0]) if result and result[0] is not None else None
+        except Exception as e:
+            logger.warning(f"Không thể lấy số bản ghi ước lượng: {str(e)}")
+            return None
+
+    def get_count_for_display(self, search_conditions=None):
+        """
+        Lấy số bản ghi để hiển thị ngay trên thanh phân trang
+        :return: tuple (count, is_exact). Khi is_exact là False, gọi get_exact_count
+                 sau khi đã hiển thị để cập nhật con số chính xác.
+        """
+        cached = self.get_cached_count(search_conditions)
+        if cached is not None:
+            return cached, True
+
+        if not self.make_signature(search_conditions):
+            # Ưu tiên kết quả cũ trong cache, sau đó tới metadata
+            stale = self.get_cached_count(search_conditions, allow_stale=True)
+            if stale is not None:
+                return stale, False
+            approximate = self.get_approximate_count()
+            if approximate is not None:
+                return approximate, False
+
+        return self.get_exact_count(search_conditions), True
+
+    def invalidate(self, search_conditions=None):
+        """Xóa cache của một điều kiện tìm kiếm, hoặc toàn bộ cache nếu không truyền"""
+        with self._cache_lock:
+            if search_conditions is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self.make_signature(search_conditions), None)
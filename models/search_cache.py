@@ -0,0 +1,160 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from utils.logger import Logger
+from models.record_count_service import RecordCountService
+from models.search_index import fold_text
+
+logger = Logger('search_cache')
+
+# Ký tự đại diện của LIKE trong SQL Server: từ khóa chứa các ký tự này không lọc lại trong bộ nhớ được
+LIKE_WILDCARDS = ('%', '_', '[')
+
+
+def normalize_term(value, folded=False):
+    """
+    Chuẩn hóa từ khóa để so khớp không phân biệt hoa thường (giống collation CI của SQL Server),
+    và bỏ dấu nếu folded (giống chỉ mục tìm kiếm)
+    """
+    if folded:
+        return fold_text(value)
+    return str(value).strip().casefold()
+
+
+def normalize_value(value, folded=False):
+    """Chuẩn hóa giá trị cột để so khớp, cùng cách với dữ liệu ở nơi tạo ra kết quả gốc"""
+    if folded:
+        return fold_text(value)
+    return str(value).casefold()
+
+
+def row_matches(columns, row, search_conditions, folded=False):
+    """
+    Dòng có thỏa điều kiện tìm kiếm hay không, theo cùng ngữ nghĩa với nơi tạo ra kết quả gốc:
+    LIKE '%term%' của build_search_clause, hoặc chỉ mục tìm kiếm (bỏ dấu) nếu folded
+    """
+    values = dict(zip(columns, row))
+    cif_soid = search_conditions.get('cif_soid')
+    if cif_soid:
+        term = normalize_term(cif_soid, folded)
+        if not any(values.get(column) is not None and term in normalize_value(values[column], folded)
+                   for column in ('Cif', 'Soid')):
+            return False
+    customer_name = search_conditions.get('customer_name')
+    if customer_name:
+        name = values.get('TenKhachHang')
+        if name is None or normalize_term(customer_name, folded) not in normalize_value(name, folded):
+            return False
+    return True
+
+
+class SearchResultCache:
+    """
+    Cache các kết quả tìm kiếm đầy đủ (mọi bản ghi thỏa điều kiện, theo thứ tự phân trang keyset).
+    Khi người dùng gõ thêm ký tự, kết quả của từ khóa mới là tập con của kết quả từ khóa cũ nên
+    có thể lọc lại trong bộ nhớ thay vì truy vấn server. Cache dùng chung giữa các instance.
+    """
+    _cache = OrderedDict()
+    _cache_lock = Lock()
+
+    # Các cột cần có trong kết quả để lọc lại trong bộ nhớ
+    REQUIRED_COLUMNS = ('Cif', 'Soid', 'TenKhachHang')
+
+    def __init__(self, max_entries=10, ttl=60):
+        """
+        :param max_entries: Số kết quả tìm kiếm tối đa giữ trong cache
+        :param ttl: Thời gian (giây) một kết quả được coi là còn mới
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(search_conditions, select_columns):
+        return (RecordCountService.make_signature(search_conditions), select_columns)
+
+    @staticmethod
+    def is_refinement(base_conditions, search_conditions, folded=False):
+        """
+        Điều kiện mới có chắc chắn thu hẹp kết quả của điều kiện cũ không: mọi từ khóa cũ đều
+        nằm trong từ khóa mới cùng loại (ví dụ 'nguyen' -> 'nguyen van')
+        """
+        for field, base_value in base_conditions.items():
+            value = search_conditions.get(field)
+            if not value:
+                return False
+            term = normalize_term(value, folded)
+            if any(wildcard in term for wildcard in LIKE_WILDCARDS):
+                return False
+            if normalize_term(base_value, folded) not in term:
+                return False
+        return True
+
+    def _get_fresh(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        result, cached_at = entry
+        if time.monotonic() - cached_at >= self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    def _put(self, key, result):
+        self._cache[key] = (result, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def store(self, search_conditions, select_columns, columns, rows, keys, folded=False):
+        """
+        Lưu kết quả đầy đủ của một điều kiện tìm kiếm
+        :param folded: Kết quả lấy từ chỉ mục tìm kiếm (so khớp không phân biệt dấu)
+        :return: dict gồm columns, rows, keys, folded
+        """
+        result = {'columns': list(columns), 'rows': list(rows), 'keys': list(keys), 'folded': folded}
+        with self._cache_lock:
+            self._put(self.make_key(search_conditions, select_columns), result)
+        return result
+
+    def lookup(self, search_conditions, select_columns):
+        """
+        Tìm kết quả đầy đủ cho điều kiện tìm kiếm: khớp đúng, hoặc lọc lại từ kết quả của một
+        từ khóa ngắn hơn. Kết quả lọc lại cũng được lưu để lần gõ tiếp theo dùng tiếp.
+        :return: dict gồm columns, rows, keys, folded hoặc None nếu phải truy vấn server
+        """
+        if not search_conditions:
+            return None
+        key = self.make_key(search_conditions, select_columns)
+        now = time.monotonic()
+        with self._cache_lock:
+            result = self._get_fresh(key)
+            if result is not None:
+                return result
+            # Ưu tiên kết quả gần nhất (nhỏ nhất) để lọc ít dòng hơn
+            base = None
+            for (signature, columns_key), (candidate, cached_at) in reversed(self._cache.items()):
+                if columns_key != select_columns or now - cached_at >= self.ttl:
+                    continue
+                if not all(column in candidate['columns'] for column in self.REQUIRED_COLUMNS):
+                    continue
+                if self.is_refinement(dict(signature), search_conditions, candidate['folded']):
+                    if base is None or len(candidate['rows']) < len(base['rows']):
+                        base = candidate
+            if base is None:
+                return None
+
+        columns = base['columns']
+        rows = []
+        keys = []
+        for row, row_key in zip(base['rows'], base['keys']):
+            if row_matches(columns, row, search_conditions, base['folded']):
+                rows.append(row)
+                keys.append(row_key)
+        logger.info(f"Lọc lại {len(base['rows'])} bản ghi trong bộ nhớ còn {len(rows)} bản ghi")
+        return self.store(search_conditions, select_columns, columns, rows, keys, base['folded'])
+
+    def invalidate(self):
+        """Xóa toàn bộ kết quả tìm kiếm (sau khi dữ liệu TKTT thay đổi)"""
+        with self._cache_lock:
+            self._cache.clear()
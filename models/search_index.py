@@ -0,0 +1,472 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from utils.local_config import API_CONFIG, APP_DIR
+from utils.logger import Logger
+
+logger = Logger('search_index')
+
+
+def _build_fold_table():
+    # Bảng chuyển chữ Latin có dấu (gồm toàn bộ chữ tiếng Việt) về chữ không dấu, dùng str.translate cho nhanh
+    table = {ord('đ'): 'd', ord('Đ'): 'D'}
+    for code in itertools.chain(range(0xC0, 0x250), range(0x1E00, 0x1F00)):
+        char = chr(code)
+        base = ''.join(c for c in unicodedata.normalize('NFD', char) if not unicodedata.combining(c))
+        if base and base != char:
+            table[code] = base
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold_text(value):
+    """Chuẩn hóa để tìm kiếm: bỏ dấu tiếng Việt và chữ hoa ('Nguyễn Văn Đức' -> 'nguyen van duc')"""
+    if value is None:
+        return ""
+    return unicodedata.normalize('NFC', str(value)).translate(_FOLD_TABLE).lower().strip()
+
+
+# Chỉ mục FTS5 trigram chỉ dùng được cho từ khóa từ 3 ký tự, ngắn hơn thì quét bảng cục bộ bằng LIKE
+TRIGRAM_MIN_LENGTH = 3
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tktt_projection (
+        id INTEGER PRIMARY KEY,
+        cif TEXT NOT NULL,
+        so_tai_khoan TEXT NOT NULL,
+        update_date TEXT,
+        search_cif TEXT,
+        search_soid TEXT,
+        search_ten TEXT,
+        UNIQUE (cif, so_tai_khoan)
+    );
+    CREATE INDEX IF NOT EXISTS idx_tktt_projection_order
+        ON tktt_projection (update_date DESC, cif DESC, so_tai_khoan DESC);
+    CREATE VIRTUAL TABLE IF NOT EXISTS tktt_search USING fts5(
+        search_cif, search_soid, search_ten,
+        content='tktt_projection', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TABLE IF NOT EXISTS search_index_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+# Giữ chỉ mục FTS đồng bộ với bảng tktt_projection khi cập nhật từng dòng
+TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS tktt_projection_ai AFTER INSERT ON tktt_projection BEGIN
+        INSERT INTO tktt_search (rowid, search_cif, search_soid, search_ten)
+        VALUES (new.id, new.search_cif, new.search_soid, new.search_ten);
+    END;
+    CREATE TRIGGER IF NOT EXISTS tktt_projection_ad AFTER DELETE ON tktt_projection BEGIN
+        INSERT INTO tktt_search (tktt_search, rowid, search_cif, search_soid, search_ten)
+        VALUES ('delete', old.id, old.search_cif, old.search_soid, old.search_ten);
+    END;
+    CREATE TRIGGER IF NOT EXISTS tktt_projection_au AFTER UPDATE ON tktt_projection BEGIN
+        INSERT INTO tktt_search (tktt_search, rowid, search_cif, search_soid, search_ten)
+        VALUES ('delete', old.id, old.search_cif, old.search_soid, old.search_ten);
+        INSERT INTO tktt_search (rowid, search_cif, search_soid, search_ten)
+        VALUES (new.id, new.search_cif, new.search_soid, new.search_ten);
+    END;
+"""
+TRIGGER_NAMES = ("tktt_projection_ai", "tktt_projection_ad", "tktt_projection_au")
+TRIGGER_STATEMENTS = [statement.strip() + " END;" for statement in TRIGGERS.split("END;") if statement.strip()]
+
+UPSERT_SQL = """
+    INSERT INTO tktt_projection (cif, so_tai_khoan, update_date, search_cif, search_soid, search_ten)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (cif, so_tai_khoan) DO UPDATE SET
+        update_date = excluded.update_date,
+        search_cif = excluded.search_cif,
+        search_soid = excluded.search_soid,
+        search_ten = excluded.search_ten
+"""
+
+# Cột lấy từ TKTT để đồng bộ; UpdateDate cùng định dạng với KEYSET_COLUMNS để cursor dùng chung được
+SYNC_SELECT = """
+    SELECT CAST(Cif AS VARCHAR(36)) AS Cif,
+           CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
+           CONVERT(VARCHAR(23), UpdateDate, 126) AS UpdateDate,
+           CAST(Soid AS VARCHAR(15)) AS Soid,
+           CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang
+    FROM TKTT
+    WHERE LoaiKhachHang = N'Ca Nhan'
+"""
+
+SERVER_COUNT_SQL = "SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'"
+SERVER_KEYS_SQL = """
+    SELECT CAST(Cif AS VARCHAR(36)) AS Cif, CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan
+    FROM TKTT
+    WHERE LoaiKhachHang = N'Ca Nhan'
+"""
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+class TKTTSearchIndex:
+    """
+    Chỉ mục tìm kiếm cục bộ (SQLite FTS5 trigram) cho Cif, Soid và TenKhachHang của TKTT Cá nhân.
+    Bảng tktt_projection chỉ giữ khóa (Cif, SoTaiKhoan), UpdateDate và các cột tìm kiếm đã bỏ dấu;
+    kết quả tìm kiếm là danh sách khóa theo thứ tự phân trang keyset, dữ liệu hiển thị vẫn lấy
+    từ SQL Server theo khóa (seek) thay cho LIKE '%...%' quét toàn bảng.
+    """
+    # Trạng thái sẵn sàng dùng chung giữa các instance cùng file chỉ mục
+    _ready_paths = set()
+    _sync_lock = threading.Lock()
+    # Instance dùng chung cho các tab và luồng đồng bộ
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_handler=None, db_path=None):
+        """
+        :param db_handler: DatabaseHandler (SQL Server) dùng khi đồng bộ
+        :param db_path: File SQLite chứa chỉ mục, mặc định API_CONFIG['search_index_path'];
+                        đường dẫn tương đối được tính từ thư mục ứng dụng
+        """
+        self.db_handler = db_handler
+        self.db_path = os.path.join(APP_DIR, db_path or API_CONFIG.get('search_index_path', 'search_index.db'))
+        self.init_db()
+
+    @classmethod
+    def shared(cls, db_handler=None):
+        """Instance dùng chung (tạo ở lần gọi đầu tiên với db_handler truyền vào)"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(db_handler)
+        return cls._shared
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def init_db(self):
+        conn = self.connect()
+        try:
+            conn.executescript(SCHEMA + TRIGGERS)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_state(self, key):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT value FROM search_index_state WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def set_state(conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO search_index_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def is_ready(self):
+        """Chỉ mục đã được đồng bộ toàn bộ ít nhất một lần"""
+        if self.db_path in self._ready_paths:
+            return True
+        try:
+            ready = self.get_state('last_full_sync') is not None
+        except sqlite3.Error as e:
+            logger.warning(f"Không đọc được chỉ mục tìm kiếm: {str(e)}")
+            return False
+        if ready:
+            self._ready_paths.add(self.db_path)
+        return ready
+
+    # Đồng bộ
+
+    @staticmethod
+    def projection_row(cif, so_tai_khoan, update_date, soid, ten_khach_hang):
+        return (str(cif), str(so_tai_khoan), update_date,
+                fold_text(cif), fold_text(soid), fold_text(ten_khach_hang))
+
+    def rebuild(self, rows, batch_size=10000):
+        """
+        Dựng lại toàn bộ chỉ mục trong một transaction (trong lúc dựng, tìm kiếm vẫn đọc bản cũ)
+        :param rows: Iterable (Cif, SoTaiKhoan, UpdateDate, Soid, TenKhachHang)
+        :return: Số dòng đã ghi
+        """
+        conn = self.connect()
+        count = 0
+        watermark = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Nạp hàng loạt không qua trigger rồi dựng lại FTS một lần, nhanh hơn cập nhật từng dòng
+            for name in TRIGGER_NAMES:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute("DELETE FROM tktt_projection")
+            batch = []
+            for row in rows:
+                batch.append(self.projection_row(*row))
+                if row[2] is not None and (watermark is None or row[2] > watermark):
+                    watermark = row[2]
+                if len(batch) >= batch_size:
+                    conn.executemany(UPSERT_SQL, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(UPSERT_SQL, batch)
+                count += len(batch)
+            conn.execute("INSERT INTO tktt_search (tktt_search) VALUES ('rebuild')")
+            # executescript sẽ COMMIT transaction đang mở, nên tạo lại trigger bằng từng lệnh execute
+            for statement in TRIGGER_STATEMENTS:
+                conn.execute(statement)
+            self.set_state(conn, 'last_full_sync', time.time())
+            self.set_state(conn, 'watermark', watermark or "")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        self._ready_paths.add(self.db_path)
+        return count
+
+    def upsert(self, rows):
+        """
+        Cập nhật các dòng thay đổi (FTS được cập nhật qua trigger)
+        :param rows: Iterable (Cif, SoTaiKhoan, UpdateDate, Soid, TenKhachHang)
+        :return: Số dòng đã ghi
+        """
+        conn = self.connect()
+        try:
+            watermark = self.get_state('watermark') or ""
+            batch = []
+            for row in rows:
+                batch.append(self.projection_row(*row))
+                if row[2] is not None and row[2] > watermark:
+                    watermark = row[2]
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(UPSERT_SQL, batch)
+            self.set_state(conn, 'watermark', watermark)
+            conn.commit()
+            return len(batch)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def remove_keys(self, keys):
+        """
+        Xóa các khóa không còn trên server (đã xóa hoặc đổi loại khách hàng) khỏi chỉ mục
+        :param keys: Iterable khóa (UpdateDate, Cif, SoTaiKhoan)
+        :return: Số dòng đã xóa
+        """
+        conn = self.connect()
+        try:
+            cursor = conn.executemany(
+                "DELETE FROM tktt_projection WHERE cif = ? AND so_tai_khoan = ?",
+                [(str(cif), str(so_tai_khoan)) for _, cif, so_tai_khoan in keys]
+            )
+            conn.commit()
+            if cursor.rowcount:
+                logger.info(f"Đã xóa {cursor.rowcount} bản ghi không còn trên server khỏi chỉ mục tìm kiếm")
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def remove_missing(self, server_keys):
+        """
+        Xóa khỏi chỉ mục các dòng không có trong danh sách khóa hiện tại của server
+        :param server_keys: Iterable (Cif, SoTaiKhoan) của mọi bản ghi TKTT Cá nhân
+        :return: Số dòng đã xóa
+        """
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("CREATE TEMP TABLE server_keys (cif TEXT, so_tai_khoan TEXT, PRIMARY KEY (cif, so_tai_khoan))")
+            conn.executemany("INSERT OR IGNORE INTO server_keys VALUES (?, ?)",
+                             ((str(cif), str(so_tai_khoan)) for cif, so_tai_khoan in server_keys))
+            cursor = conn.execute("""
+                DELETE FROM tktt_projection
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM server_keys k
+                    WHERE k.cif = tktt_projection.cif AND k.so_tai_khoan = tktt_projection.so_tai_khoan
+                )
+            """)
+            removed = cursor.rowcount
+            conn.execute("DROP TABLE server_keys")
+            conn.commit()
+            if removed:
+                logger.info(f"Đã xóa {removed} bản ghi không còn trên server khỏi chỉ mục tìm kiếm")
+            return removed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def local_count(self):
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM tktt_projection").fetchone()[0]
+        finally:
+            conn.close()
+
+    def sync(self, full=False):
+        """
+        Đồng bộ từ SQL Server: toàn bộ khi chưa có chỉ mục, khi được yêu cầu hoặc đã quá
+        search_index_full_sync_hours; còn lại chỉ lấy các dòng có UpdateDate từ mốc lần đồng bộ trước.
+        Nếu sau đó chỉ mục có nhiều dòng hơn server (có bản ghi bị xóa hoặc đổi loại khách hàng)
+        thì đối chiếu danh sách khóa để xóa các dòng thừa.
+        :return: Số dòng đã ghi
+        """
+        with self._sync_lock:
+            last_full = self.get_state('last_full_sync')
+            max_age = API_CONFIG.get('search_index_full_sync_hours', 24) * 3600
+            if full or last_full is None or time.time() - float(last_full) > max_age:
+                started = time.monotonic()
+                rows = self.db_handler.stream_query(SYNC_SELECT)
+                count = self.rebuild(rows)
+                logger.info(f"Đã dựng lại chỉ mục tìm kiếm với {count:,} bản ghi "
+                            f"trong {time.monotonic() - started:.1f}s")
+                return count
+
+            watermark = self.get_state('watermark')
+            if not watermark:
+                return 0
+            query = SYNC_SELECT + " AND UpdateDate >= CONVERT(DATETIME, ?, 126)"
+            count = self.upsert(self.db_handler.execute_query(query, params=[watermark]))
+            if count:
+                logger.info(f"Đã cập nhật {count} bản ghi vào chỉ mục tìm kiếm")
+
+            result = self.db_handler.execute_query(SERVER_COUNT_SQL, fetchall=False)
+            server_count = result[0] if result else 0
+            if server_count < self.local_count():
+                self.remove_missing(self.db_handler.stream_query(SERVER_KEYS_SQL))
+            return count
+
+    # Tìm kiếm
+
+    @staticmethod
+    def build_match_clause(search_conditions):
+        """
+        Tạo điều kiện WHERE trên tktt_projection (alias p) từ điều kiện tìm kiếm.
+        Từ khóa được bỏ dấu giống dữ liệu trong chỉ mục nên 'nguyen van' tìm được 'Nguyễn Văn'.
+        """
+        fts_terms = []
+        clauses = []
+        params = []
+        fields = (('cif_soid', ('search_cif', 'search_soid')), ('customer_name', ('search_ten',)))
+        for field, columns in fields:
+            term = fold_text(search_conditions.get(field))
+            if not term:
+                continue
+            if len(term) >= TRIGRAM_MIN_LENGTH:
+                fts_terms.append("{" + " ".join(columns) + "} : " + fts_phrase(term))
+            else:
+                clauses.append("(" + " OR ".join(f"p.{column} LIKE ? ESCAPE '\\'" for column in columns) + ")")
+                params.extend([f"%{escape_like(term)}%"] * len(columns))
+
+        if fts_terms:
+            clauses.insert(0, "p.id IN (SELECT rowid FROM tktt_search WHERE tktt_search MATCH ?)")
+            params.insert(0, " AND ".join(fts_terms))
+        return " AND ".join(clauses) or "1 = 1", params
+
+    @staticmethod
+    def build_keyset_clause(key_values, direction):
+        """Điều kiện seek giống TKTTModel.build_keyset_clause, trên thứ tự của chỉ mục cục bộ"""
+        update_date, cif, so_tai_khoan = key_values
+        op = "<" if direction == "next" else ">"
+        tie_break = f"(p.cif {op} ? OR (p.cif = ? AND p.so_tai_khoan {op} ?))"
+        tie_params = [cif, cif, so_tai_khoan]
+
+        if update_date is None:
+            if direction == "next":
+                return f" AND (p.update_date IS NULL AND {tie_break})", tie_params
+            return f" AND (p.update_date IS NOT NULL OR (p.update_date IS NULL AND {tie_break}))", tie_params
+
+        if direction == "next":
+            clause = (f" AND (p.update_date < ? OR p.update_date IS NULL"
+                      f" OR (p.update_date = ? AND {tie_break}))")
+        else:
+            clause = f" AND (p.update_date > ? OR (p.update_date = ? AND {tie_break}))"
+        return clause, [update_date, update_date] + tie_params
+
+    def count(self, search_conditions):
+        """Số bản ghi thỏa điều kiện tìm kiếm"""
+        where_clause, params = self.build_match_clause(search_conditions)
+        conn = self.connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM tktt_projection p WHERE {where_clause}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def search_keys(self, search_conditions, limit, key_values=None, direction="next"):
+        """
+        Tìm khóa các bản ghi thỏa điều kiện theo thứ tự (UpdateDate DESC, Cif DESC, SoTaiKhoan DESC)
+        :param key_values: Khóa (UpdateDate, Cif, SoTaiKhoan) của cursor, None để lấy từ đầu
+        :param direction: 'next' lấy các khóa sau cursor, 'prev' lấy các khóa trước cursor (thứ tự ngược)
+        :return: Danh sách tuple (UpdateDate, Cif, SoTaiKhoan)
+        """
+        where_clause, params = self.build_match_clause(search_conditions)
+        if key_values:
+            key_clause, key_params = self.build_keyset_clause(key_values, direction)
+            where_clause += key_clause
+            params = params + key_params
+        sort = "DESC" if direction == "next" else "ASC"
+        query = f"""
+            SELECT p.update_date, p.cif, p.so_tai_khoan
+            FROM tktt_projection p
+            WHERE {where_clause}
+            ORDER BY p.update_date {sort}, p.cif {sort}, p.so_tai_khoan {sort}
+            LIMIT ?
+        """
+        conn = self.connect()
+        try:
+            return [tuple(row) for row in conn.execute(query, params + [limit]).fetchall()]
+        finally:
+            conn.close()
+
+
+class SearchIndexSyncWorker:
+    """Luồng nền dựng chỉ mục lần đầu rồi cập nhật định kỳ các bản ghi TKTT thay đổi"""
+
+    def __init__(self, search_index, interval=None):
+        self.search_index = search_index
+        self.interval = interval or API_CONFIG.get('search_index_sync_interval', 60)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='search-index-sync', daemon=True)
+        self._thread.start()
+        logger.info("Khởi động luồng đồng bộ chỉ mục tìm kiếm")
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Đồng bộ ngay (ví dụ sau khi cập nhật dữ liệu TKTT)"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.search_index.sync()
+            except Exception as e:
+                logger.error(f"Lỗi khi đồng bộ chỉ mục tìm kiếm: {str(e)}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -1,9 +1,292 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from utils.logger import Logger
 
 logger = Logger('simo_converter')
 
+# Số giá trị ngày khác nhau tối đa được giữ trong cache chuẩn hóa ngày
+DATE_CACHE_SIZE = 8192
+
+# Mốc ngày của số ngày kiểu Excel
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Số ngày kiểu Excel tối đa có thể nhận dạng nhanh (31/12/9999 là 2958465)
+EXCEL_SERIAL_MAX_DIGITS = 7
+
+# Schema chuyển đổi cho từng loại SIMO: (trường nguồn, trường SIMO, cách xử lý, tham số)
+#   padding      - chuẩn hóa theo format_number_with_padding
+#   int_strict   - int(value), bỏ qua nếu lỗi
+#   strip        - str(value).strip()
+#   flag         - int, mặc định 0 khi rỗng (None, "", "None") hoặc lỗi (NghiNgo)
+#   nullable_int - int, None khi rỗng (None, "", "None"), bỏ qua nếu lỗi
+#   raw          - giữ nguyên giá trị nếu không rỗng (None, "", "None")
+#   str/int/date - như get_default_value, tham số là độ dài tối đa
+SIMO_SCHEMAS = {
+    "simo_001": [
+        ("Cif", "Cif", "padding", None),
+        ("Soid", "SoID", "padding", None),
+        ("LoaiD", "LoaiID", "int_strict", None),
+        ("TenKhachHang", "TenKhachHang", "strip", None),
+        ("NgaySinh", "NgaySinh", "strip", None),
+        ("GioiTinh", "GioiTinh", "int_strict", None),
+        ("MaSoThue", "MaSoThue", "strip", None),
+        ("SoDienThoaiDangKyDichVu", "SoDienThoaiDangKyDichVu", "padding", None),
+        ("DiaChi", "DiaChi", "strip", None),
+        ("DiaChiKiemSoatTruyCap", "DiaChiKiemSoatTruyCap", "strip", None),
+        ("MaSoNhanDangThietBiDong", "MaSoNhanDangThietBiDiDong", "strip", None),
+        ("SoTaiKhoan", "SoTaiKhoan", "padding", None),
+        ("LoaiTaiKhoan", "LoaiTaiKhoan", "int_strict", None),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "int_strict", None),
+        ("NgayMoTaiKhoan", "NgayMoTaiKhoan", "strip", None),
+        ("PhuongThucMoTaiKhoan", "PhuongThucMoTaiKhoan", "int_strict", None),
+        ("NgayXacThucTaiQuay", "NgayXacThucTaiQuay", "strip", None),
+        ("QuocTich", "QuocTich", "strip", None)
+    ],
+    "simo_002": [
+        ("Cif", "Cif", "raw", None),
+        ("SoTaiKhoan", "SoTaiKhoan", "raw", None),
+        ("TenKhachHang", "TenKhachHang", "raw", None),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "nullable_int", None),
+        ("NghiNgo", "NghiNgo", "flag", None),
+        ("GhiChu", "GhiChu", "raw", None)
+    ],
+    "simo_003": [
+        ("Cif", "Cif", "raw", None),
+        ("SoTaiKhoan", "SoTaiKhoan", "raw", None),
+        ("TenKhachHang", "TenKhachHang", "raw", None),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "nullable_int", None),
+        ("NghiNgo", "NghiNgo", "flag", None)
+    ],
+    "simo_004": [
+        ("Cif", "Cif", "padding", None),
+        ("SoID", "SoID", "padding", None),
+        ("LoaiID", "LoaiID", "int", None),
+        ("TenKhachHang", "TenKhachHang", "str", 150),
+        ("NgaySinh", "NgaySinh", "date", None),
+        ("GioiTinh", "GioiTinh", "int", None),
+        ("MaSoThue", "MaSoThue", "str", None),
+        ("SoDienThoaiDangKyDichVu", "SoDienThoaiDangKyDichVu", "padding", None),
+        ("DiaChi", "DiaChi", "str", 300),
+        ("DiaChiKiemSoatTruyCap", "DiaChiKiemSoatTruyCap", "str", 60),
+        ("MaSoNhanDangThietBiDiDong", "MaSoNhanDangThietBiDiDong", "str", 36),
+        ("SoTaiKhoan", "SoTaiKhoan", "padding", None),
+        ("LoaiTaiKhoan", "LoaiTaiKhoan", "int", None),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "int", None),
+        ("NgayMoTaiKhoan", "NgayMoTaiKhoan", "date", None),
+        ("PhuongThucMoTaiKhoan", "PhuongThucMoTaiKhoan", "int", None),
+        ("NgayXacThucTaiQuay", "NgayXacThucTaiQuay", "date", None),
+        ("GhiChu", "GhiChu", "str", 500),
+        ("QuocTich", "QuocTich", "str", 36)
+    ],
+    "simo_011": [
+        ("Cif", "Cif", "str", 36),
+        ("SoID", "SoID", "str", 15),
+        ("LoaiID", "LoaiID", "int", None),
+        ("TenKhachHang", "TenKhachHang", "str", 150),
+        ("NgaySinh", "NgaySinh", "date", None),
+        ("GioiTinh", "GioiTinh", "int", None),
+        ("MaSoThue", "MaSoThue", "str", None),
+        ("SoDienThoaiDangKyDichVu", "SoDienThoaiDangKyDichVu", "str", 15),
+        ("DiaChi", "DiaChi", "str", 300),
+        ("DiaChiKiemSoatTruyCap", "DiaChiKiemSoatTruyCap", "str", 60),
+        ("MaSoNhanDangThietBiDiDong", "MaSoNhanDangThietBiDiDong", "str", 36),
+        ("SoTaiKhoan", "SoTaiKhoan", "str", None),
+        ("LoaiTaiKhoan", "LoaiTaiKhoan", "int", None),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "int", None),
+        ("NgayMoTaiKhoan", "NgayMoTaiKhoan", "date", None),
+        ("PhuongThucMoTaiKhoan", "PhuongThucMoTaiKhoan", "int", None),
+        ("NgayXacThucTaiQuay", "NgayXacThucTaiQuay", "date", None),
+        ("QuocTich", "QuocTich", "str", 36)
+    ],
+    "simo_012": [
+        ("Cif", "Cif", "str", 36),
+        ("SoTaiKhoan", "SoTaiKhoan", "str", None),
+        ("TenKhachHang", "TenKhachHang", "str", 150),
+        ("TrangThaiHoatDongTaiKhoan", "TrangThaiHoatDongTaiKhoan", "int", None),
+        ("NghiNgo", "NghiNgo", "int", None),
+        ("GhiChu", "GhiChu", "str", 500)
+    ]
+}
+
+
+def _convert_date(value):
+    """Xử lý trường 'date' giống get_default_value, trả về None nếu bỏ qua"""
+    if isinstance(value, str) and not value.strip():
+        return None
+    try:
+        return SimoConverter.normalize_date(value)
+    except Exception as e:
+        logger.warning(f"Lỗi xử lý giá trị {value}: {str(e)}")
+        return None
+
+
+def _warn_value(value, e):
+    logger.warning(f"Lỗi xử lý giá trị {value}: {str(e)}")
+
+
+# Chuẩn hóa theo từng trường của format_number_with_padding, nhận giá trị đã làm sạch
+def _pad_phone(clean_value):
+    """Xử lý số điện thoại theo chuẩn VN"""
+    # Loại bỏ mã quốc gia +84 nếu có
+    if clean_value.startswith("+84"):
+        clean_value = "0" + clean_value[3:]
+    # Loại bỏ mã quốc gia 84 nếu có
+    elif clean_value.startswith("84") and len(clean_value) >= 10:
+        clean_value = "0" + clean_value[2:]
+
+    # Đảm bảo số điện thoại bắt đầu bằng số 0
+    if not clean_value.startswith("0"):
+        clean_value = "0" + clean_value
+
+    # Kiểm tra đầu số hợp lệ (03x, 05x, 07x, 08x, 09x)
+    if len(clean_value) >= 2 and clean_value[:2] not in _VALID_PHONE_PREFIXES:
+        logger.warning(f"Số điện thoại {clean_value} không có đầu số hợp lệ theo chuẩn VN")
+
+    # Đảm bảo đúng 10 chữ số
+    if len(clean_value) > 10:
+        clean_value = clean_value[:10]
+        logger.warning(f"Số điện thoại đã được cắt ngắn thành 10 số: {clean_value}")
+    elif len(clean_value) < 10:
+        logger.warning(f"Số điện thoại {clean_value} có độ dài không đúng chuẩn 10 số")
+
+    return clean_value
+
+
+def _pad_id(clean_value):
+    """Xử lý số ID (CMND cũ: 9 số, CCCD mới: 12 số); có chữ (Hộ chiếu) thì giữ nguyên"""
+    # Chỉ chuẩn hóa độ dài khi toàn là số (chuỗi toàn số không chứa chữ cái)
+    if not clean_value.isdigit():
+        return clean_value
+
+    length = len(clean_value)
+    if length < 9:
+        # Nếu độ dài nhỏ hơn 9, thêm số 0 ở đầu
+        padded_value = clean_value.zfill(9)
+        logger.info(f"Số ID {clean_value} đã được chuẩn hóa thành {padded_value} (CMND 9 số)")
+        return padded_value
+    if 9 < length < 12:
+        # Nếu độ dài từ 10-11, thêm số 0 ở đầu để đủ 12 số (CCCD)
+        padded_value = clean_value.zfill(12)
+        logger.info(f"Số ID {clean_value} đã được chuẩn hóa thành {padded_value} (CCCD 12 số)")
+        return padded_value
+    if length > 12:
+        # Độ dài lớn hơn 12, ghi log cảnh báo
+        logger.warning(f"Số ID {clean_value} có độ dài {length} không đúng chuẩn CMND (9 số) hoặc CCCD (12 số) của VN")
+    return clean_value
+
+
+def _pad_account(clean_value):
+    """Số tài khoản giữ nguyên mọi số 0 ở đầu"""
+    if not clean_value:
+        return None
+    return clean_value
+
+
+def _pad_keep(clean_value):
+    """Cif (định dạng riêng của ngân hàng) và các trường khác giữ nguyên"""
+    return clean_value
+
+
+_VALID_PHONE_PREFIXES = ("03", "05", "07", "08", "09")
+
+_PADDING_FORMATTERS = {
+    "SoDienThoaiDangKyDichVu": _pad_phone,
+    "SoID": _pad_id,
+    "SoTaiKhoan": _pad_account
+}
+
+
+# Mã các loại trường trong plan: loại đơn giản xử lý ngay trong vòng lặp (không gọi hàm cho từng ô),
+# loại _APPLY gọi hàm đã gắn sẵn tên trường (padding, date)
+_RAW, _STR, _STRIP, _FLAG, _NULLABLE_INT, _INT, _INT_STRICT, _APPLY = range(8)
+
+_INLINE_KINDS = {
+    "raw": _RAW,
+    "str": _STR,
+    "strip": _STRIP,
+    "flag": _FLAG,
+    "nullable_int": _NULLABLE_INT,
+    "int": _INT,
+    "int_strict": _INT_STRICT
+}
+
+# Trường số thường chỉ có vài giá trị khác nhau: kết quả chuyển đổi được nhớ theo giá trị cho từng trường
+_NUMBER_KINDS = (_FLAG, _NULLABLE_INT, _INT, _INT_STRICT)
+
+# Số giá trị tối đa được nhớ cho mỗi trường số
+NUMBER_MEMO_SIZE = 1024
+
+# Kết quả chuyển đổi số khi không ghi trường vào bản ghi SIMO
+_NO_VALUE = object()
+
+
+def _convert_number(kind, value):
+    """Chuyển đổi giá trị của trường số theo loại, trả về _NO_VALUE nếu bỏ qua trường"""
+    if kind == _INT:
+        if value is None:
+            return _NO_VALUE
+        try:
+            return int(float(str(value).strip()))
+        except (ValueError, TypeError):
+            return _NO_VALUE
+        except Exception as e:
+            _warn_value(value, e)
+            return _NO_VALUE
+    if kind == _INT_STRICT:
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return _NO_VALUE
+    # flag và nullable_int: None, "" và "None" được coi là rỗng
+    empty = value is None or value == "" or value == "None"
+    try:
+        if kind == _FLAG:
+            return 0 if empty else int(value)
+        return None if empty else int(value)
+    except (ValueError, TypeError):
+        return 0 if kind == _FLAG else _NO_VALUE
+
+
+# Hàm tạo bước xử lý cho các loại trường phức tạp (mã _APPLY): nhận tên trường SIMO và tham số,
+# trả về hàm apply(value, converted_record) ghi giá trị đã chuẩn hóa (nếu có) vào bản ghi SIMO.
+def _padding_transform(field, arg):
+    # Chọn sẵn cách chuẩn hóa của trường thay vì so tên trường cho từng ô
+    pad = _PADDING_FORMATTERS.get(field, _pad_keep)
+
+    def apply(value, converted_record):
+        if value is not None:
+            value = str(value).strip()
+            if value:
+                value = pad(value.replace(" ", "").replace("-", ""))
+                if value:
+                    converted_record[field] = value
+    return apply
+
+
+def _date_transform(field, arg):
+    def apply(value, converted_record):
+        if value is not None:
+            value = _convert_date(value)
+            if value is not None:
+                converted_record[field] = value
+    return apply
+
+
+_FIELD_TRANSFORMS = {
+    "padding": _padding_transform,
+    "date": _date_transform
+}
+
+
 class SimoConverter:
+    SERVICE_TYPES = ["simo_001", "simo_002", "simo_003", "simo_004", "simo_011", "simo_012"]
+    
+    # Hàm chuyển đổi đã dựng sẵn cho mỗi loại SIMO
+    _plans = {}
+    
+    # Số lần chuẩn hóa ngày (khi cache miss) nhận dạng nhanh theo hình dạng chuỗi và số lần phải dùng strptime
+    _date_stats = {'fast_path': 0, 'strptime': 0}
+    
     @staticmethod
     def get_default_value(value, field_type, max_length=None):
         """
@@ -34,48 +317,7 @@ class SimoConverter:
                     return None
                     
             elif field_type == 'date':
-                # Nếu giá trị đã đúng định dạng dd/mm/yyyy, trả về luôn
-                if isinstance(value, str):
-                    value = value.strip()
-                    try:
-                        datetime.strptime(value, "%d/%m/%Y")
-                        return value
-                    except ValueError:
-                        pass
-                        
-                # Nếu là datetime object
-                if isinstance(value, datetime):
-                    return value.strftime("%d/%m/%Y")
-                
-                # Nếu là string, thử chuyển đổi từ các định dạng khác
-                if isinstance(value, str):
-                    date_formats = [
-                        ("%Y-%m-%d", "dd/mm/yyyy"),
-                        ("%d-%m-%Y", "dd/mm/yyyy"),
-                        ("%Y/%m/%d", "dd/mm/yyyy"),
-                        ("%d.%m.%Y", "dd/mm/yyyy"),
-                        ("%Y.%m.%d", "dd/mm/yyyy"),
-                        ("%d-%m-%y", "dd/mm/yyyy"),
-                        ("%d/%m/%y", "dd/mm/yyyy")
-                    ]
-                    
-                    for input_format, _ in date_formats:
-                        try:
-                            date_obj = datetime.strptime(value, input_format)
-                            return date_obj.strftime("%d/%m/%Y")
-                        except ValueError:
-                            continue
-                            
-                    # Nếu là số từ Excel (số ngày kể từ 1900)
-                    try:
-                        if float(value) > 0:
-                            excel_epoch = datetime(1899, 12, 30)
-                            date_obj = excel_epoch + timedelta(days=float(value))
-                            return date_obj.strftime("%d/%m/%Y")
-                    except (ValueError, TypeError):
-                        pass
-                        
-                return None
+                return SimoConverter.normalize_date(value)
                         
             return value
             
@@ -84,375 +326,302 @@ class SimoConverter:
             return None
 
     @staticmethod
-    def format_number_with_padding(value, field):
-        """Format số với độ dài chuẩn theo quy định VN"""
-        if value is None or str(value).strip() == "":
+    def normalize_date(value):
+        """
+        Chuẩn hóa giá trị ngày về dạng dd/mm/yyyy
+        :param value: datetime, chuỗi ngày hoặc chuỗi số ngày kiểu Excel
+        :return: Chuỗi dd/mm/yyyy hoặc None nếu không nhận dạng được
+        """
+        if isinstance(value, str):
+            value = value.strip()
+        elif not isinstance(value, datetime):
             return None
+        return SimoConverter._normalize_date_cached(value)
 
-        # Làm sạch giá trị đầu vào - loại bỏ khoảng trắng và dấu gạch ngang
-        clean_value = str(value).strip().replace(" ", "").replace("-", "")
-        
-        # Xử lý theo từng loại trường
-        if field == "SoDienThoaiDangKyDichVu":
-            # Xử lý số điện thoại theo chuẩn VN
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE, typed=True)
+    def _normalize_date_cached(value):
+        """Chuẩn hóa một giá trị ngày (chuỗi đã strip hoặc datetime), kết quả được cache LRU"""
+        # Nếu là datetime object
+        if isinstance(value, datetime):
+            return value.strftime("%d/%m/%Y")
             
-            # Loại bỏ mã quốc gia +84 nếu có
-            if clean_value.startswith("+84"):
-                clean_value = "0" + clean_value[3:]
-            # Loại bỏ mã quốc gia 84 nếu có
-            elif clean_value.startswith("84") and len(clean_value) >= 10:
-                clean_value = "0" + clean_value[2:]
-                
-            # Đảm bảo số điện thoại bắt đầu bằng số 0
-            if not clean_value.startswith("0"):
-                clean_value = "0" + clean_value
-                
-            # Kiểm tra đầu số hợp lệ (03x, 05x, 07x, 08x, 09x)
-            valid_prefixes = ["03", "05", "07", "08", "09"]
-            if len(clean_value) >= 2 and clean_value[:2] not in valid_prefixes:
-                logger.warning(f"Số điện thoại {clean_value} không có đầu số hợp lệ theo chuẩn VN")
+        # Nhận dạng nhanh các dạng phổ biến trước khi thử strptime
+        result = SimoConverter._normalize_date_by_shape(value)
+        if result is not None:
+            SimoConverter._date_stats['fast_path'] += 1
+            return result
+        SimoConverter._date_stats['strptime'] += 1
+        
+        # Nếu giá trị đã đúng định dạng dd/mm/yyyy, trả về luôn
+        try:
+            datetime.strptime(value, "%d/%m/%Y")
+            return value
+        except ValueError:
+            pass
             
-            # Đảm bảo đúng 10 chữ số
-            if len(clean_value) > 10:
-                clean_value = clean_value[:10]
-                logger.warning(f"Số điện thoại đã được cắt ngắn thành 10 số: {clean_value}")
-            elif len(clean_value) < 10:
-                logger.warning(f"Số điện thoại {clean_value} có độ dài không đúng chuẩn 10 số")
+        # Thử chuyển đổi từ các định dạng khác
+        date_formats = [
+            ("%Y-%m-%d", "dd/mm/yyyy"),
+            ("%d-%m-%Y", "dd/mm/yyyy"),
+            ("%Y/%m/%d", "dd/mm/yyyy"),
+            ("%d.%m.%Y", "dd/mm/yyyy"),
+            ("%Y.%m.%d", "dd/mm/yyyy"),
+            ("%d-%m-%y", "dd/mm/yyyy"),
+            ("%d/%m/%y", "dd/mm/yyyy")
+        ]
+        
+        for input_format, _ in date_formats:
+            try:
+                date_obj = datetime.strptime(value, input_format)
+                return date_obj.strftime("%d/%m/%Y")
+            except ValueError:
+                continue
                 
-            return clean_value
-            
-        elif field == "SoID":
-            # Xử lý số ID (CMND/CCCD) theo chuẩn VN
-            # CMND cũ: 9 số, CCCD mới: 12 số
-            
-            # Nếu là ký tự chữ + số (Hộ chiếu) thì giữ nguyên
-            if any(c.isalpha() for c in clean_value):
-                return clean_value
-            
-            # Nếu là số, thì đảm bảo đúng độ dài theo chuẩn
-            if clean_value.isdigit():
-                # Xử lý CMND (9 số)
-                if len(clean_value) < 9:
-                    # Nếu độ dài nhỏ hơn 9, thêm số 0 ở đầu
-                    padded_value = clean_value.zfill(9)
-                    logger.info(f"Số ID {clean_value} đã được chuẩn hóa thành {padded_value} (CMND 9 số)")
-                    return padded_value
-                elif len(clean_value) == 9:
-                    # Đúng độ dài CMND
-                    return clean_value
-                # Xử lý CCCD (12 số)
-                elif len(clean_value) < 12 and len(clean_value) > 9:
-                    # Nếu độ dài từ 10-11, thêm số 0 ở đầu để đủ 12 số (CCCD)
-                    padded_value = clean_value.zfill(12)
-                    logger.info(f"Số ID {clean_value} đã được chuẩn hóa thành {padded_value} (CCCD 12 số)")
-                    return padded_value
-                elif len(clean_value) == 12:
-                    # Đúng độ dài CCCD
-                    return clean_value
-                else:
-                    # Độ dài lớn hơn 12, ghi log cảnh báo
-                    logger.warning(f"Số ID {clean_value} có độ dài {len(clean_value)} không đúng chuẩn CMND (9 số) hoặc CCCD (12 số) của VN")
-                    return clean_value
-            
-            return clean_value
+        # Nếu là số từ Excel (số ngày kể từ 1900)
+        try:
+            if float(value) > 0:
+                date_obj = EXCEL_EPOCH + timedelta(days=float(value))
+                return date_obj.strftime("%d/%m/%Y")
+        except (ValueError, TypeError):
+            pass
             
-        elif field == "Cif":
-            # Giữ nguyên giá trị CIF, thường là định dạng đặc biệt của ngân hàng
-            return clean_value
+        return None
+
+    @staticmethod
+    def _normalize_date_by_shape(value):
+        """
+        Nhận dạng dd/mm/yyyy, yyyy-mm-dd và số ngày kiểu Excel bằng cách kiểm tra vị trí ký tự,
+        không dùng strptime. Trả về None nếu không nhận dạng được để xử lý theo cách đầy đủ.
+        """
+        if not value.isascii():
+            return None
             
-        elif field == "SoTaiKhoan":
-            # Số tài khoản thường có độ dài cố định (thường 13-16 số)
-            # Cần giữ nguyên mọi số 0 ở đầu
-            if not clean_value:
+        if len(value) == 10:
+            try:
+                # dd/mm/yyyy: đã đúng định dạng, chỉ cần kiểm tra ngày hợp lệ
+                if value[2] == "/" and value[5] == "/" and value[:2].isdigit() and value[3:5].isdigit() and value[6:].isdigit():
+                    datetime(int(value[6:]), int(value[3:5]), int(value[:2]))
+                    return value
+                # yyyy-mm-dd
+                if value[4] == "-" and value[7] == "-" and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit():
+                    return datetime(int(value[:4]), int(value[5:7]), int(value[8:])).strftime("%d/%m/%Y")
+            except ValueError:
                 return None
-                
-            return clean_value
+            return None
             
-        else:
-            # Các trường khác giữ nguyên
-            return clean_value
+        # Số ngày kiểu Excel
+        if value.isdigit() and len(value) <= EXCEL_SERIAL_MAX_DIGITS:
+            days = int(value)
+            if days > 0:
+                return (EXCEL_EPOCH + timedelta(days=days)).strftime("%d/%m/%Y")
+        return None
 
     @staticmethod
-    def convert_to_simo_001(data):
-        """Chuyển đổi dữ liệu sang định dạng SIMO_001"""
-        payload = []
-        field_mapping = {
-            "Cif": "Cif",
-            "Soid": "SoID",
-            "LoaiD": "LoaiID",
-            "TenKhachHang": "TenKhachHang",
-            "NgaySinh": "NgaySinh",
-            "GioiTinh": "GioiTinh",
-            "MaSoThue": "MaSoThue",
-            "SoDienThoaiDangKyDichVu": "SoDienThoaiDangKyDichVu",
-            "DiaChi": "DiaChi",
-            "DiaChiKiemSoatTruyCap": "DiaChiKiemSoatTruyCap",
-            "MaSoNhanDangThietBiDong": "MaSoNhanDangThietBiDiDong",
-            "SoTaiKhoan": "SoTaiKhoan",
-            "LoaiTaiKhoan": "LoaiTaiKhoan",
-            "TrangThaiHoatDongTaiKhoan": "TrangThaiHoatDongTaiKhoan",
-            "NgayMoTaiKhoan": "NgayMoTaiKhoan",
-            "PhuongThucMoTaiKhoan": "PhuongThucMoTaiKhoan",
-            "NgayXacThucTaiQuay": "NgayXacThucTaiQuay",
-            "QuocTich": "QuocTich"
+    def get_date_cache_stats():
+        """
+        Thống kê cache chuẩn hóa ngày
+        :return: dict gồm hits, misses, hit_rate, size, maxsize, fast_path, strptime
+        """
+        info = SimoConverter._normalize_date_cached.cache_info()
+        lookups = info.hits + info.misses
+        stats = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': info.hits / lookups if lookups else 0.0,
+            'size': info.currsize,
+            'maxsize': info.maxsize
         }
+        stats.update(SimoConverter._date_stats)
+        return stats
 
-        for record in data:
-            converted_record = {}
-            for db_field, simo_field in field_mapping.items():
-                if db_field in record and record[db_field] is not None:
-                    value = record[db_field]
-                    
-                    # Xử lý các trường số
-                    if db_field in ["LoaiD", "GioiTinh", "LoaiTaiKhoan", 
-                                  "TrangThaiHoatDongTaiKhoan", "PhuongThucMoTaiKhoan"]:
-                        try:
-                            converted_record[simo_field] = int(value)
-                        except (ValueError, TypeError):
-                            continue
-                    
-                    # Xử lý các trường cần padding
-                    elif db_field in ["Cif", "Soid", "SoDienThoaiDangKyDichVu", "SoTaiKhoan"]:
-                        formatted_value = SimoConverter.format_number_with_padding(value, simo_field)
-                        if formatted_value:
-                            converted_record[simo_field] = formatted_value
-                    
-                    # Các trường khác
+    @staticmethod
+    def clear_date_cache():
+        """Xóa cache chuẩn hóa ngày và đặt lại bộ đếm"""
+        SimoConverter._normalize_date_cached.cache_clear()
+        for key in SimoConverter._date_stats:
+            SimoConverter._date_stats[key] = 0
+
+    @staticmethod
+    def format_number_with_padding(value, field):
+        """Format số với độ dài chuẩn theo quy định VN"""
+        if value is None:
+            return None
+        value = str(value).strip()
+        if value == "":
+            return None
+
+        # Làm sạch giá trị đầu vào - loại bỏ khoảng trắng và dấu gạch ngang
+        clean_value = value.replace(" ", "").replace("-", "")
+
+        # Xử lý theo từng loại trường
+        return _PADDING_FORMATTERS.get(field, _pad_keep)(clean_value)
+
+    @staticmethod
+    def compile_plan(service_type):
+        """
+        Dựng sẵn danh sách bước chuyển đổi từ schema của một loại SIMO. Các loại trường đơn giản
+        được xử lý ngay trong vòng lặp theo mã loại, chỉ padding và date gọi hàm đã gắn sẵn tên trường;
+        kết quả của trường số được nhớ theo giá trị. Plan được cache, mỗi loại chỉ dựng một lần.
+        :return: Hàm nhận list bản ghi và trả về list bản ghi SIMO
+        """
+        plan = SimoConverter._plans.get(service_type)
+        if plan is not None:
+            return plan
+        if service_type not in SIMO_SCHEMAS:
+            raise ValueError(f"Không hỗ trợ định dạng SIMO: {service_type}")
+
+        # Mỗi bước: (trường nguồn, trường SIMO, mã loại, tham số). Tham số của trường số là dict nhớ
+        # kết quả theo giá trị, của loại _APPLY là hàm xử lý đã gắn sẵn tên trường
+        steps = []
+        for source_field, simo_field, kind, arg in SIMO_SCHEMAS[service_type]:
+            if kind in _FIELD_TRANSFORMS:
+                steps.append((source_field, simo_field, _APPLY, _FIELD_TRANSFORMS[kind](simo_field, arg)))
+            elif _INLINE_KINDS[kind] in _NUMBER_KINDS:
+                steps.append((source_field, simo_field, _INLINE_KINDS[kind], {}))
+            else:
+                steps.append((source_field, simo_field, _INLINE_KINDS[kind], arg))
+        steps = tuple(steps)
+
+        def convert(data):
+            payload = []
+            append = payload.append
+            for record in data:
+                converted_record = {}
+                for source_field, field, kind, arg in steps:
+                    if source_field not in record:
+                        continue
+                    value = record[source_field]
+                    if kind == _RAW:
+                        if value is not None and value != "" and value != "None":
+                            converted_record[field] = value
+                    elif kind in _NUMBER_KINDS:
+                        # bool bằng 1/0 khi làm khóa dict nhưng chuyển đổi khác (str(True) là "True")
+                        if value.__class__ is bool:
+                            result = _convert_number(kind, value)
+                        else:
+                            try:
+                                result = arg[value]
+                            except KeyError:
+                                result = _convert_number(kind, value)
+                                if len(arg) < NUMBER_MEMO_SIZE:
+                                    arg[value] = result
+                            except TypeError:
+                                # Giá trị không hash được
+                                result = _convert_number(kind, value)
+                        if result is not _NO_VALUE:
+                            converted_record[field] = result
+                    elif kind == _STR:
+                        if value is not None:
+                            try:
+                                value = str(value).strip()
+                            except Exception as e:
+                                _warn_value(value, e)
+                                continue
+                            if value:
+                                converted_record[field] = value[:arg] if arg else value
+                    elif kind == _STRIP:
+                        if value is not None:
+                            converted_record[field] = str(value).strip()
                     else:
-                        converted_record[simo_field] = str(value).strip()
-            
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+                        arg(value, converted_record)
+                if converted_record:
+                    append(converted_record)
+            return payload
+
+        SimoConverter._plans[service_type] = convert
+        return convert
+
+    @staticmethod
+    def convert_to_simo_001(data):
+        """Chuyển đổi dữ liệu sang định dạng SIMO_001"""
+        return SimoConverter.convert_to_simo(data, "simo_001")
 
     @staticmethod
     def convert_to_simo_002(data):
         """Chuyển đổi dữ liệu sang định dạng SIMO_002"""
-        payload = []
-        field_mapping = {
-            "Cif": "Cif",
-            "SoTaiKhoan": "SoTaiKhoan",
-            "TenKhachHang": "TenKhachHang",
-            "TrangThaiHoatDongTaiKhoan": "TrangThaiHoatDongTaiKhoan",
-            "NghiNgo": "NghiNgo",
-            "GhiChu": "GhiChu"
-        }
-
-        for record in data:
-            converted_record = {}
-            for db_field, simo_field in field_mapping.items():
-                if db_field in record:
-                    value = record[db_field]
-                    # Chắc chắn xuất NghiNgo dưới dạng int, mặc định là 0 nếu không có giá trị
-                    if db_field == "NghiNgo":
-                        try:
-                            converted_record[simo_field] = int(value) if value not in [None, "", "None"] else 0
-                        except (ValueError, TypeError):
-                            converted_record[simo_field] = 0
-                    # Xử lý các trường số nguyên khác
-                    elif db_field == "TrangThaiHoatDongTaiKhoan":
-                        try:
-                            converted_record[simo_field] = int(value) if value not in [None, "", "None"] else None
-                        except (ValueError, TypeError):
-                            continue
-                    # Xử lý các trường khác
-                    elif value not in [None, "", "None"]:
-                        converted_record[simo_field] = value
-                    
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+        return SimoConverter.convert_to_simo(data, "simo_002")
 
     @staticmethod
     def convert_to_simo_003(data):
         """Chuyển đổi dữ liệu sang định dạng SIMO_003"""
-        payload = []
-        field_mapping = {
-            "Cif": "Cif",
-            "SoTaiKhoan": "SoTaiKhoan",
-            "TenKhachHang": "TenKhachHang",
-            "TrangThaiHoatDongTaiKhoan": "TrangThaiHoatDongTaiKhoan",
-            "NghiNgo": "NghiNgo"  # Thêm trường NghiNgo vào mapping
-        }
-
-        for record in data:
-            converted_record = {}
-            for db_field, simo_field in field_mapping.items():
-                if db_field in record:
-                    value = record[db_field]
-                    # Chắc chắn xuất NghiNgo dưới dạng int, mặc định là 0 nếu không có giá trị
-                    if db_field == "NghiNgo":
-                        try:
-                            converted_record[simo_field] = int(value) if value not in [None, "", "None"] else 0
-                        except (ValueError, TypeError):
-                            converted_record[simo_field] = 0
-                    # Xử lý trường số nguyên khác
-                    elif db_field == "TrangThaiHoatDongTaiKhoan":
-                        try:
-                            converted_record[simo_field] = int(value) if value not in [None, "", "None"] else None
-                        except (ValueError, TypeError):
-                            continue
-                    # Xử lý các trường khác
-                    elif value not in [None, "", "None"]:
-                        converted_record[simo_field] = value
-                    
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+        return SimoConverter.convert_to_simo(data, "simo_003")
 
     @staticmethod
     def convert_to_simo_004(data):
         """Chuyển đổi dữ liệu sang định dạng SIMO_004"""
-        payload = []
-        fields = {
-            "Cif": ('str', 36),
-            "SoID": ('str', 15),
-            "LoaiID": ('int', None),
-            "TenKhachHang": ('str', 150),
-            "NgaySinh": ('date', None),
-            "GioiTinh": ('int', None),
-            "MaSoThue": ('str', None),
-            "SoDienThoaiDangKyDichVu": ('str', 15),
-            "DiaChi": ('str', 300),
-            "DiaChiKiemSoatTruyCap": ('str', 60),
-            "MaSoNhanDangThietBiDiDong": ('str', 36),
-            "SoTaiKhoan": ('str', None),
-            "LoaiTaiKhoan": ('int', None),
-            "TrangThaiHoatDongTaiKhoan": ('int', None),
-            "NgayMoTaiKhoan": ('date', None),
-            "PhuongThucMoTaiKhoan": ('int', None),
-            "NgayXacThucTaiQuay": ('date', None),
-            "GhiChu": ('str', 500),
-            "QuocTich": ('str', 36)
-        }
-        
-        for record in data:
-            converted_record = {}
-            for field, (field_type, max_length) in fields.items():
-                # Xử lý các trường đặc biệt cần định dạng theo chuẩn VN
-                if field in ["SoID", "SoDienThoaiDangKyDichVu", "Cif", "SoTaiKhoan"]:
-                    value = record.get(field)
-                    if value is not None:
-                        formatted_value = SimoConverter.format_number_with_padding(value, field)
-                        if formatted_value:
-                            converted_record[field] = formatted_value
-                else:
-                    # Các trường khác xử lý như cũ
-                    value = SimoConverter.get_default_value(record.get(field), field_type, max_length)
-                    if value is not None:
-                        converted_record[field] = value
-                    
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+        return SimoConverter.convert_to_simo(data, "simo_004")
 
     @staticmethod
     def convert_to_simo_011(data):
         """Chuyển đổi dữ liệu sang định dạng SIMO_011"""
-        payload = []
-        fields = {
-            "Cif": ('str', 36),
-            "SoID": ('str', 15),
-            "LoaiID": ('int', None),
-            "TenKhachHang": ('str', 150),
-            "NgaySinh": ('date', None),
-            "GioiTinh": ('int', None),
-            "MaSoThue": ('str', None),
-            "SoDienThoaiDangKyDichVu": ('str', 15),
-            "DiaChi": ('str', 300),
-            "DiaChiKiemSoatTruyCap": ('str', 60),
-            "MaSoNhanDangThietBiDiDong": ('str', 36),
-            "SoTaiKhoan": ('str', None),
-            "LoaiTaiKhoan": ('int', None),
-            "TrangThaiHoatDongTaiKhoan": ('int', None),
-            "NgayMoTaiKhoan": ('date', None),
-            "PhuongThucMoTaiKhoan": ('int', None),
-            "NgayXacThucTaiQuay": ('date', None),
-            "QuocTich": ('str', 36)
-        }
-        
-        for record in data:
-            converted_record = {}
-            for field, (field_type, max_length) in fields.items():
-                value = SimoConverter.get_default_value(record.get(field), field_type, max_length)
-                if value is not None:
-                    converted_record[field] = value
-                    
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+        return SimoConverter.convert_to_simo(data, "simo_011")
 
     @staticmethod
     def convert_to_simo_012(data):
         """Chuyển đổi dữ liệu sang định dạng SIMO_012"""
-        payload = []
-        fields = {
-            "Cif": ('str', 36),
-            "SoTaiKhoan": ('str', None),
-            "TenKhachHang": ('str', 150),
-            "TrangThaiHoatDongTaiKhoan": ('int', None),
-            "NghiNgo": ('int', None),
-            "GhiChu": ('str', 500)
-        }
-        
-        for record in data:
-            converted_record = {}
-            for field, (field_type, max_length) in fields.items():
-                value = SimoConverter.get_default_value(record.get(field), field_type, max_length)
-                if value is not None:
-                    converted_record[field] = value
-                    
-            if converted_record:
-                payload.append(converted_record)
-                
-        return payload
+        return SimoConverter.convert_to_simo(data, "simo_012")
 
     @staticmethod
     def convert_to_simo(data, service_type):
         """Chuyển đổi dữ liệu thành định dạng SIMO theo loại dịch vụ"""
-        if service_type == "simo_001":
-            return SimoConverter.convert_to_simo_001(data)
-        elif service_type == "simo_002":
-            return SimoConverter.convert_to_simo_002(data)
-        elif service_type == "simo_003":
-            return SimoConverter.convert_to_simo_003(data)
-        elif service_type == "simo_004":
-            return SimoConverter.convert_to_simo_004(data)
-        elif service_type == "simo_011":
-            return SimoConverter.convert_to_simo_011(data)
-        elif service_type == "simo_012":
-            return SimoConverter.convert_to_simo_012(data)
-        else:
-            raise ValueError(f"Không hỗ trợ định dạng SIMO: {service_type}")
+        return SimoConverter.compile_plan(service_type)(data)
             
     @staticmethod
-    def convert_excel_to_json(file_path, service_type):
-        """Chuyển đổi dữ liệu Excel sang định dạng JSON"""
+    def iter_excel_rows(file_path):
+        """
+        Đọc file Excel ở chế độ read-only và trả về từng dòng dưới dạng dict {header: value}.
+        Bộ nhớ sử dụng không phụ thuộc kích thước file.
+        """
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(file_path, read_only=True, data_only=True)
         try:
-            from openpyxl import load_workbook
-            
-            wb = load_workbook(file_path, data_only=True)
             ws = wb.active
+            rows = ws.iter_rows(values_only=True)
             
             # Lấy headers từ dòng đầu tiên
-            headers = [str(cell.value).strip() for cell in ws[1]]
+            first_row = next(rows, None)
+            if first_row is None:
+                return
+            headers = [str(value).strip() for value in first_row]
             
             # Đọc dữ liệu từ dòng thứ 2
-            raw_data = []
-            for row in ws.iter_rows(min_row=2):
-                row_dict = {}
-                for header, cell in zip(headers, row):
-                    value = cell.value if cell.value is not None else ""
-                    row_dict[header] = value
-                raw_data.append(row_dict)
-
-            # Chuyển đổi dữ liệu theo định dạng tương ứng
-            return SimoConverter.convert_to_simo(raw_data, service_type)
+            for row in rows:
+                yield {header: (value if value is not None else "")
+                       for header, value in zip(headers, row)}
+        finally:
+            wb.close()
+            
+    @staticmethod
+    def iter_convert_excel(file_path, service_type, batch_size=1000):
+        """
+        Chuyển đổi dữ liệu Excel sang định dạng SIMO theo từng lô,
+        trả về generator các bản ghi đã chuyển đổi
+        """
+        batch = []
+        for row_dict in SimoConverter.iter_excel_rows(file_path):
+            batch.append(row_dict)
+            if len(batch) >= batch_size:
+                yield from SimoConverter.convert_to_simo(batch, service_type)
+                batch = []
+        if batch:
+            yield from SimoConverter.convert_to_simo(batch, service_type)
+            
+    @staticmethod
+    def convert_excel_to_json(file_path, service_type):
+        """Chuyển đổi dữ liệu Excel sang định dạng JSON"""
+        try:
+            # Kiểm tra loại dịch vụ trước khi đọc file
+            if service_type not in SimoConverter.SERVICE_TYPES:
+                raise ValueError(f"Không hỗ trợ định dạng SIMO: {service_type}")
+                
+            # Import tại chỗ để tránh vòng import với parallel_converter
+            from models.parallel_converter import ParallelConverter
+            
+            # Chuyển đổi dữ liệu theo định dạng tương ứng, file lớn được chuyển đổi song song
+            rows = SimoConverter.iter_excel_rows(file_path)
+            return list(ParallelConverter().convert_iter(rows, service_type))
                 
         except Exception as e:
             logger.error(f"Lỗi khi chuyển đổi Excel sang JSON: {str(e)}")
@@ -497,15 +666,24 @@ class SimoConverter:
         Kiểm tra dữ liệu trước khi xuất JSON
         Trả về tuple (is_valid, warning_messages)
         """
-        is_valid = True
-        warnings = []
+        errors = SimoConverter.collect_validation_errors(data)
+        warnings = [f"Bản ghi #{i+1}: {error}" for i, error in errors]
+        
+        return not errors, warnings
+        
+    @staticmethod
+    def collect_validation_errors(data):
+        """
+        Kiểm tra từng bản ghi đã chuyển đổi
+        Trả về list (chỉ số bản ghi, thông báo lỗi)
+        """
+        errors = []
         
         for i, record in enumerate(data):
             # Kiểm tra số điện thoại
             if "SoDienThoaiDangKyDichVu" in record:
                 phone_valid, phone_error = SimoConverter.validate_vietnam_phone_number(record["SoDienThoaiDangKyDichVu"])
                 if not phone_valid:
-                    warnings.append(f"Bản ghi #{i+1}: {phone_error}")
-                    is_valid = False
+                    errors.append((i, phone_error))
         
-        return is_valid, warnings
\ No newline at end of file
+        return errors
\ No newline at end of file
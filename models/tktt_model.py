@@ -1,23 +1,17 @@
 from utils.db_handler import DatabaseHandler
 from utils.logger import Logger
+from models.record_count_service import RecordCountService
+from models.page_cache import PageCache
+from models.search_cache import SearchResultCache
+from models.search_index import TKTTSearchIndex
+from utils.local_config import API_CONFIG
 import json
+import base64
 
 logger = Logger('tktt_model')
 
-class TKTTModel:
-    def __init__(self):
-        self.db_handler = DatabaseHandler()
-        
-    def get_total_records(self):
-        """Lấy tổng số bản ghi"""
-        query = "SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'"
-        result = self.db_handler.execute_query(query, fetchall=False)
-        return result[0] if result else 0
-        
-    def get_records(self, offset, limit, search_conditions=None):
-        """Lấy danh sách bản ghi có phân trang và tìm kiếm"""
-        base_query = """
-            SELECT 
+# Danh sách cột hiển thị ở tab TKTT Cá nhân
+TKTT_SELECT_COLUMNS = """
                 CAST(Cif AS VARCHAR(36)) AS Cif,
                 CAST(Soid AS VARCHAR(15)) AS Soid,
                 CAST(LoaiD AS INT) AS LoaiD,
@@ -40,70 +34,501 @@ class TKTTModel:
                 CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
                 CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate,
                 CAST(NghiNgo AS INT) AS NghiNgo
-            FROM TKTT 
-            WHERE LoaiKhachHang = N'Ca Nhan'
+"""
+
+# Danh sách cột hiển thị ở tab Phát hiện gian lận
+FRAUD_SELECT_COLUMNS = """
+                CAST(Cif AS VARCHAR(36)) AS Cif,
+                CAST(Soid AS VARCHAR(15)) AS Soid,
+                CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang,
+                CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
+                CAST(TrangThaiHoatDongTaiKhoan AS INT) AS TrangThaiHoatDongTaiKhoan,
+                CAST(NghiNgo AS INT) AS NghiNgo,
+                CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
+                CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate
+"""
+
+# Các cột khóa dùng cho phân trang keyset, luôn nằm cuối danh sách cột trả về
+KEYSET_COLUMNS = """
+                CONVERT(VARCHAR(23), UpdateDate, 126) AS _KeyUpdateDate,
+                Cif AS _KeyCif,
+                SoTaiKhoan AS _KeySoTaiKhoan
+"""
+KEYSET_COLUMN_COUNT = 3
+
+# Các cột trả về khi xác thực dữ liệu trước khi chuyển đổi SIMO
+VERIFY_SELECT_COLUMNS = """
+                    t.Cif, t.Soid, t.LoaiD, t.TenKhachHang,
+                    CONVERT(VARCHAR(10), t.NgaySinh, 103) AS NgaySinh,
+                    t.GioiTinh, t.MaSoThue, t.SoDienThoaiDangKyDichVu, t.DiaChi,
+                    t.DiaChiKiemSoatTruyCap, t.MaSoNhanDangThietBiDong,
+                    t.SoTaiKhoan, t.LoaiTaiKhoan, t.TrangThaiHoatDongTaiKhoan,
+                    CONVERT(VARCHAR(10), t.NgayMoTaiKhoan, 103) AS NgayMoTaiKhoan,
+                    t.PhuongThucMoTaiKhoan,
+                    CONVERT(VARCHAR(10), t.NgayXacThucTaiQuay, 103) AS NgayXacThucTaiQuay,
+                    t.QuocTich, t.LoaiKhachHang, t.GhiChu,
+                    CONVERT(VARCHAR(10), t.UpdateDate, 103) AS UpdateDate,
+                    t.NghiNgo
+"""
+VERIFY_INT_FIELDS = ["LoaiD", "GioiTinh", "LoaiTaiKhoan",
+                     "TrangThaiHoatDongTaiKhoan", "PhuongThucMoTaiKhoan", "NghiNgo"]
+# SQL Server giới hạn 2100 tham số mỗi câu lệnh, mỗi bản ghi dùng 3 tham số
+VERIFY_BATCH_SIZE = 500
+
+# Số khóa mỗi lần lấy dữ liệu theo khóa từ chỉ mục tìm kiếm (mỗi khóa dùng 3 tham số)
+KEY_LOOKUP_BATCH_SIZE = 500
+
+# Kiểu dữ liệu của bảng tạm khi cập nhật trạng thái nghi ngờ hàng loạt
+SUSPICION_STAGE_TYPES = {
+    "Cif": "VARCHAR(36)",
+    "SoTaiKhoan": "VARCHAR(50)",
+    "NghiNgo": "INT",
+    "GhiChu": "NVARCHAR(500)"
+}
+
+
+class TKTTModel:
+    def __init__(self, db_handler=None):
+        self.db_handler = db_handler or DatabaseHandler()
+        # Chỉ mục tìm kiếm cục bộ thay cho LIKE '%...%' quét toàn bảng khi tìm theo Cif/Soid/tên
+        self.search_index = None
+        if API_CONFIG.get('search_index_enabled', True):
+            self.search_index = TKTTSearchIndex.shared(self.db_handler)
+        self.count_service = RecordCountService(self.db_handler, search_index=self.search_index)
+        self.page_cache = PageCache(max_pages=API_CONFIG.get('page_cache_pages', 20))
+        self.search_cache = SearchResultCache(max_entries=API_CONFIG.get('search_cache_entries', 10))
+        # Kết quả tìm kiếm có tối đa chừng này bản ghi được tải đủ vào bộ nhớ để phân trang và lọc lại
+        self.search_cache_max_rows = API_CONFIG.get('search_cache_max_rows', 5000)
+        
+    def get_total_records(self, search_conditions=None):
+        """Lấy tổng số bản ghi (có cache theo điều kiện tìm kiếm)"""
+        return self.count_service.get_exact_count(search_conditions)
+        
+    def update_suspicion(self, cif, so_tai_khoan, suspicion_type, note):
+        """Cập nhật trạng thái nghi ngờ cho một tài khoản"""
+        return self.update_suspicion_bulk([(cif, so_tai_khoan)], suspicion_type, note)[0]
+        
+    def update_suspicion_bulk(self, account_keys, suspicion_type, note):
         """
+        Cập nhật trạng thái nghi ngờ cho nhiều tài khoản trong một transaction
+        :param account_keys: Danh sách tuple (Cif, SoTaiKhoan)
+        :return: Danh sách bool theo thứ tự account_keys, True nếu tài khoản đã được cập nhật
+        """
+        rows = [(str(cif), str(so_tai_khoan), suspicion_type, note) for cif, so_tai_khoan in account_keys]
+        try:
+            return self.db_handler.bulk_update(
+                "TKTT",
+                key_columns=["Cif", "SoTaiKhoan"],
+                update_columns=["NghiNgo", "GhiChu"],
+                rows=rows,
+                column_types=SUSPICION_STAGE_TYPES,
+                extra_set="UpdateDate = GETDATE()"
+            )
+        finally:
+            self.count_service.invalidate()
+            self.page_cache.invalidate()
+            self.search_cache.invalidate()
         
+    @staticmethod
+    def build_search_clause(search_conditions=None):
+        """Tạo điều kiện WHERE bổ sung và tham số từ điều kiện tìm kiếm"""
         params = []
         where_clause = ""
-        
+
         if search_conditions:
             conditions = []
             if search_conditions.get('cif_soid'):
                 search_term = search_conditions['cif_soid']
                 conditions.append("(CAST(Cif AS VARCHAR(36)) LIKE ? OR CAST(Soid AS VARCHAR(15)) LIKE ?)")
                 params.extend([f"%{search_term}%", f"%{search_term}%"])
-                
+
             if search_conditions.get('customer_name'):
                 conditions.append("TenKhachHang LIKE ?")
                 params.append(f"%{search_conditions['customer_name']}%")
-                
+
             if conditions:
                 where_clause = " AND " + " AND ".join(conditions)
-        
+
+        return where_clause, params
+
+    def get_records(self, offset, limit, search_conditions=None):
+        """Lấy danh sách bản ghi có phân trang và tìm kiếm"""
+        base_query = f"""
+            SELECT {TKTT_SELECT_COLUMNS}
+            FROM TKTT
+            WHERE LoaiKhachHang = N'Ca Nhan'
+        """
+
+        where_clause, params = self.build_search_clause(search_conditions)
+
         query = f"{base_query}{where_clause} ORDER BY UpdateDate DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
         params.extend([offset, limit])
-        
+
         return self.db_handler.execute_query(query, params=params)
-        
+
+    def stream_records(self, search_conditions=None, select_columns=TKTT_SELECT_COLUMNS, batch_size=5000):
+        """
+        Duyệt toàn bộ bản ghi thỏa điều kiện tìm kiếm theo từng lô, không tải hết vào bộ nhớ
+        :return: Generator các dòng kết quả (pyodbc Row, có cursor_description)
+        """
+        where_clause, params = self.build_search_clause(search_conditions)
+        query = f"""
+            SELECT {select_columns}
+            FROM TKTT
+            WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}
+            ORDER BY UpdateDate DESC, Cif DESC, SoTaiKhoan DESC
+        """
+        return self.db_handler.stream_query(query, params=params, batch_size=batch_size)
+
+    @staticmethod
+    def encode_cursor(key_values):
+        """Mã hóa bộ khóa (UpdateDate, Cif, SoTaiKhoan) thành cursor token"""
+        update_date, cif, so_tai_khoan = key_values
+        raw = json.dumps([update_date, None if cif is None else str(cif),
+                          None if so_tai_khoan is None else str(so_tai_khoan)])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(token):
+        """Giải mã cursor token thành bộ khóa (UpdateDate, Cif, SoTaiKhoan)"""
+        try:
+            raw = base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8")
+            update_date, cif, so_tai_khoan = json.loads(raw)
+            return update_date, cif, so_tai_khoan
+        except Exception as e:
+            raise ValueError(f"Cursor phân trang không hợp lệ: {str(e)}")
+
+    @staticmethod
+    def build_keyset_clause(key_values, direction):
+        """
+        Tạo điều kiện seek theo thứ tự (UpdateDate DESC, Cif DESC, SoTaiKhoan DESC).
+        UpdateDate NULL được xếp cuối cùng giống ORDER BY UpdateDate DESC của SQL Server.
+        """
+        update_date, cif, so_tai_khoan = key_values
+        # 'next' đi về phía giá trị nhỏ hơn, 'prev' đi ngược lại
+        op = "<" if direction == "next" else ">"
+        tie_break = f"(Cif {op} ? OR (Cif = ? AND SoTaiKhoan {op} ?))"
+        tie_params = [cif, cif, so_tai_khoan]
+
+        if update_date is None:
+            if direction == "next":
+                clause = f" AND (UpdateDate IS NULL AND {tie_break})"
+            else:
+                clause = f" AND (UpdateDate IS NOT NULL OR (UpdateDate IS NULL AND {tie_break}))"
+            return clause, tie_params
+
+        key_date = "CONVERT(DATETIME, ?, 126)"
+        if direction == "next":
+            clause = (f" AND (UpdateDate < {key_date} OR UpdateDate IS NULL"
+                      f" OR (UpdateDate = {key_date} AND {tie_break}))")
+        else:
+            clause = (f" AND (UpdateDate > {key_date}"
+                      f" OR (UpdateDate = {key_date} AND {tie_break}))")
+        return clause, [update_date, update_date] + tie_params
+
+    def get_records_keyset(self, limit, search_conditions=None, cursor=None, direction="next",
+                           select_columns=TKTT_SELECT_COLUMNS):
+        """
+        Lấy một trang bản ghi bằng phân trang keyset (seek) thay cho OFFSET.
+        :param limit: Số bản ghi mỗi trang
+        :param search_conditions: Điều kiện tìm kiếm (giống get_records)
+        :param cursor: Token trả về từ lần gọi trước, None để lấy trang đầu
+        :param direction: 'next' lấy các bản ghi sau cursor, 'prev' lấy các bản ghi trước cursor
+        :param select_columns: Danh sách cột cần lấy
+        :return: dict gồm columns, rows, next_cursor, prev_cursor
+        """
+        if direction not in ("next", "prev"):
+            raise ValueError(f"Hướng phân trang không hợp lệ: {direction}")
+
+        if self.use_search_index(search_conditions):
+            key_values = self.decode_cursor(cursor) if cursor else None
+            columns, data_rows, keys = self.search_by_index(search_conditions, limit + 1, select_columns,
+                                                            key_values, direction)
+            has_more = len(keys) > limit
+            data_rows, keys = data_rows[:limit], keys[:limit]
+            if direction == "prev":
+                data_rows, keys = data_rows[::-1], keys[::-1]
+            return self.build_page(columns, data_rows, keys, has_more, cursor, direction)
+
+        where_clause, params = self.build_search_clause(search_conditions)
+
+        if cursor:
+            key_clause, key_params = self.build_keyset_clause(self.decode_cursor(cursor), direction)
+            where_clause += key_clause
+            params.extend(key_params)
+
+        sort = "DESC" if direction == "next" else "ASC"
+        # Lấy thêm 1 bản ghi để biết còn trang tiếp theo hay không
+        query = f"""
+            SELECT TOP (?) {select_columns.rstrip().rstrip(',')},
+            {KEYSET_COLUMNS}
+            FROM TKTT
+            WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}
+            ORDER BY UpdateDate {sort}, Cif {sort}, SoTaiKhoan {sort}
+        """
+        rows = self.db_handler.execute_query(query, params=[limit + 1] + params)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == "prev":
+            rows = list(reversed(rows))
+
+        columns = []
+        if rows:
+            columns = [column[0] for column in rows[0].cursor_description][:-KEYSET_COLUMN_COUNT]
+
+        keys = [tuple(row[-KEYSET_COLUMN_COUNT:]) for row in rows]
+        data_rows = [tuple(row[:-KEYSET_COLUMN_COUNT]) for row in rows]
+        return self.build_page(columns, data_rows, keys, has_more, cursor, direction)
+
+    def use_search_index(self, search_conditions):
+        """Điều kiện tìm kiếm có được xử lý bằng chỉ mục tìm kiếm cục bộ không"""
+        return (self.search_index is not None
+                and bool(RecordCountService.make_signature(search_conditions))
+                and self.search_index.is_ready())
+
+    def search_by_index(self, search_conditions, limit, select_columns, key_values=None, direction="next"):
+        """
+        Tìm bằng chỉ mục rồi lấy dữ liệu theo khóa từ server. Khóa không còn trên server bị xóa khỏi
+        chỉ mục và được thay bằng các khóa tiếp theo, nên kết quả luôn đủ limit dòng nếu còn dữ liệu.
+        :return: tuple (columns, rows, keys) theo thứ tự của chỉ mục (ngược lại nếu direction là 'prev')
+        """
+        while True:
+            keys = self.search_index.search_keys(search_conditions, limit, key_values, direction)
+            columns, data_rows, found = self.get_rows_by_keys(keys, select_columns)
+            if len(found) == len(keys):
+                return columns, data_rows, found
+            found_keys = set(found)
+            self.search_index.remove_keys([key for key in keys if tuple(key) not in found_keys])
+            # Số bản ghi đếm từ chỉ mục trước đó đã tính cả các khóa vừa xóa
+            self.count_service.invalidate()
+
+    def get_rows_by_keys(self, keys, select_columns=TKTT_SELECT_COLUMNS):
+        """
+        Lấy dữ liệu các bản ghi theo khóa (Cif, SoTaiKhoan) từ chỉ mục tìm kiếm, giữ đúng thứ tự khóa.
+        Khóa không còn trên server (đã xóa hoặc đổi loại khách hàng sau lần đồng bộ) bị bỏ qua.
+        :param keys: Danh sách khóa (UpdateDate, Cif, SoTaiKhoan)
+        :return: tuple (columns, rows, keys) của các bản ghi tìm thấy
+        """
+        columns = []
+        found = {}
+        for start in range(0, len(keys), KEY_LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + KEY_LOOKUP_BATCH_SIZE]
+            values = ", ".join(["(?, ?, ?)"] * len(batch))
+            params = []
+            for index, (_, cif, so_tai_khoan) in enumerate(batch, start):
+                params.extend([index, cif, so_tai_khoan])
+            query = f"""
+                SELECT k.RowIdx, {select_columns.rstrip().rstrip(',')}
+                FROM (VALUES {values}) AS k(RowIdx, KeyCif, KeySoTaiKhoan)
+                JOIN TKTT ON TKTT.Cif = k.KeyCif AND TKTT.SoTaiKhoan = k.KeySoTaiKhoan
+                WHERE TKTT.LoaiKhachHang = N'Ca Nhan'
+            """
+            rows = self.db_handler.execute_query(query, params=params)
+            if rows and not columns:
+                columns = [column[0] for column in rows[0].cursor_description][1:]
+            for row in rows:
+                found[row[0]] = tuple(row[1:])
+
+        order = [index for index in range(len(keys)) if index in found]
+        return columns, [found[index] for index in order], [tuple(keys[index]) for index in order]
+
+    def build_page(self, columns, data_rows, keys, has_more, cursor, direction):
+        """Tạo kết quả một trang (columns, rows, next_cursor, prev_cursor) từ các dòng theo thứ tự hiển thị"""
+        next_cursor = None
+        prev_cursor = None
+        if keys:
+            # Trang hiện tại có trang sau nếu: đi tới và còn dữ liệu, hoặc đi lùi từ một cursor
+            if (direction == "next" and has_more) or (direction == "prev" and cursor):
+                next_cursor = self.encode_cursor(keys[-1])
+            # Trang hiện tại có trang trước nếu: đi lùi và còn dữ liệu, hoặc đi tới từ một cursor
+            if (direction == "prev" and has_more) or (direction == "next" and cursor):
+                prev_cursor = self.encode_cursor(keys[0])
+
+        return {
+            'columns': columns,
+            'rows': data_rows,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+
+    def fetch_search_result(self, search_conditions, select_columns, max_rows):
+        """
+        Tải toàn bộ bản ghi thỏa điều kiện tìm kiếm (kèm khóa keyset) nếu không quá max_rows
+        :return: tuple (columns, rows, keys) hoặc None nếu kết quả lớn hơn max_rows
+        """
+        if self.use_search_index(search_conditions):
+            result = self.search_by_index(search_conditions, max_rows + 1, select_columns)
+            if len(result[2]) > max_rows:
+                return None
+            return result
+
+        where_clause, params = self.build_search_clause(search_conditions)
+        query = f"""
+            SELECT TOP (?) {select_columns.rstrip().rstrip(',')},
+            {KEYSET_COLUMNS}
+            FROM TKTT
+            WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}
+            ORDER BY UpdateDate DESC, Cif DESC, SoTaiKhoan DESC
+        """
+        rows = self.db_handler.execute_query(query, params=[max_rows + 1] + params)
+        if len(rows) > max_rows:
+            return None
+        columns = []
+        if rows:
+            columns = [column[0] for column in rows[0].cursor_description][:-KEYSET_COLUMN_COUNT]
+        keys = [tuple(row[-KEYSET_COLUMN_COUNT:]) for row in rows]
+        data_rows = [tuple(row[:-KEYSET_COLUMN_COUNT]) for row in rows]
+        return columns, data_rows, keys
+
+    def get_search_result(self, search_conditions, select_columns, fetch=True):
+        """
+        Lấy kết quả tìm kiếm đầy đủ trong bộ nhớ: từ cache, lọc lại từ kết quả của từ khóa ngắn hơn,
+        hoặc tải từ server khi số bản ghi (đã đếm) không vượt quá search_cache_max_rows
+        :param fetch: False để chỉ dùng bộ nhớ, không truy vấn server
+        :return: dict gồm columns, rows, keys hoặc None
+        """
+        if not search_conditions:
+            return None
+        result = self.search_cache.lookup(search_conditions, select_columns)
+        if result is None and fetch:
+            count = self.count_service.get_cached_count(search_conditions)
+            if count is None or count > self.search_cache_max_rows:
+                return None
+            # Kết quả từ chỉ mục so khớp không phân biệt dấu, từ LIKE thì theo collation của server
+            folded = self.use_search_index(search_conditions)
+            fetched = self.fetch_search_result(search_conditions, select_columns, self.search_cache_max_rows)
+            if fetched is None:
+                return None
+            result = self.search_cache.store(search_conditions, select_columns, *fetched, folded=folded)
+        if result is not None:
+            self.count_service.set_count(search_conditions, len(result['rows']))
+        return result
+
+    def page_from_result(self, result, limit, cursor=None, direction="next"):
+        """
+        Cắt một trang từ kết quả tìm kiếm trong bộ nhớ, cùng ngữ nghĩa với get_records_keyset
+        :return: dict như get_records_keyset, hoặc None nếu cursor không thuộc kết quả này
+        """
+        rows = result['rows']
+        keys = result['keys']
+        if cursor:
+            positions = result.get('positions')
+            if positions is None:
+                positions = {self.encode_cursor(key): position for position, key in enumerate(keys)}
+                result['positions'] = positions
+            position = positions.get(cursor)
+            if position is None:
+                return None
+            if direction == "next":
+                start, end = position + 1, position + 1 + limit
+                has_more = len(rows) > end
+            else:
+                start, end = max(0, position - limit), position
+                has_more = start > 0
+        elif direction == "next":
+            start, end = 0, limit
+            has_more = len(rows) > limit
+        else:
+            start, end = max(0, len(rows) - limit), len(rows)
+            has_more = start > 0
+        return self.build_page(result['columns'], rows[start:end], keys[start:end], has_more, cursor, direction)
+
+    def get_page(self, limit, search_conditions=None, cursor=None, direction="next",
+                 select_columns=TKTT_SELECT_COLUMNS):
+        """
+        Lấy một trang như get_records_keyset: cắt từ kết quả tìm kiếm đầy đủ trong bộ nhớ nếu có,
+        nếu không thì dùng lại trang đã tải hoặc đang được tải trước
+        """
+        result = self.get_search_result(search_conditions, select_columns)
+        if result is not None:
+            page_data = self.page_from_result(result, limit, cursor, direction)
+            if page_data is not None:
+                return page_data
+        key = PageCache.make_key(search_conditions, select_columns, limit, cursor, direction)
+        return self.page_cache.get_or_load(
+            key,
+            lambda: self.get_records_keyset(limit, search_conditions, cursor=cursor, direction=direction,
+                                            select_columns=select_columns)
+        )
+
+    def get_cached_page(self, limit, search_conditions=None, cursor=None, direction="next",
+                        select_columns=TKTT_SELECT_COLUMNS):
+        """Trang lấy được ngay từ bộ nhớ (không truy vấn server), None nếu phải truy vấn"""
+        result = self.get_search_result(search_conditions, select_columns, fetch=False)
+        if result is not None:
+            page_data = self.page_from_result(result, limit, cursor, direction)
+            if page_data is not None:
+                return page_data
+        return self.page_cache.get(PageCache.make_key(search_conditions, select_columns, limit, cursor, direction))
+
     def verify_data(self, selected_data):
-        """Xác thực dữ liệu với database"""
+        """
+        Xác thực dữ liệu với database theo lô.
+        Các cặp (Cif, SoTaiKhoan) được gửi thành từng nhóm trong một bảng VALUES
+        và JOIN với TKTT, thay vì một truy vấn cho mỗi bản ghi. Kết quả giữ nguyên
+        thứ tự và định dạng của verify_data_per_record.
+        """
+        keyed_records = [(idx, record) for idx, record in enumerate(selected_data)
+                         if "Cif" in record and "SoTaiKhoan" in record]
+        matched = {}
+        
+        for start in range(0, len(keyed_records), VERIFY_BATCH_SIZE):
+            chunk = keyed_records[start:start + VERIFY_BATCH_SIZE]
+            
+            values_clause = ", ".join(["(?, ?, ?)"] * len(chunk))
+            params = []
+            for idx, record in chunk:
+                params.extend([idx, str(record["Cif"]), str(record["SoTaiKhoan"])])
+            
+            query = f"""
+                SELECT k.RowIdx, {VERIFY_SELECT_COLUMNS}
+                FROM (VALUES {values_clause}) AS k(RowIdx, Cif, SoTaiKhoan)
+                JOIN TKTT t ON t.Cif = k.Cif AND t.SoTaiKhoan = k.SoTaiKhoan
+            """
+            
+            rows = self.db_handler.execute_query(query, params=params)
+            if not rows:
+                continue
+                
+            columns = [column[0] for column in rows[0].cursor_description][1:]
+            for row in rows:
+                # Giống fetchone() của cách cũ: chỉ lấy dòng đầu tiên khớp với mỗi bản ghi
+                if row[0] not in matched:
+                    matched[row[0]] = self.convert_verified_row(columns, row[1:])
+        
+        return [matched[idx] for idx, _ in keyed_records if idx in matched]
+
+    def verify_data_per_record(self, selected_data):
+        """Xác thực dữ liệu với database (mỗi bản ghi một truy vấn)"""
         verified_data = []
         
         for record in selected_data:
             if "Cif" not in record or "SoTaiKhoan" not in record:
                 continue
                 
-            query = """
-                SELECT 
-                    Cif, Soid, LoaiD, TenKhachHang,
-                    CONVERT(VARCHAR(10), NgaySinh, 103) AS NgaySinh,
-                    GioiTinh, MaSoThue, SoDienThoaiDangKyDichVu, DiaChi,
-                    DiaChiKiemSoatTruyCap, MaSoNhanDangThietBiDong,
-                    SoTaiKhoan, LoaiTaiKhoan, TrangThaiHoatDongTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayMoTaiKhoan, 103) AS NgayMoTaiKhoan,
-                    PhuongThucMoTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayXacThucTaiQuay, 103) AS NgayXacThucTaiQuay,
-                    QuocTich, LoaiKhachHang, GhiChu,
-                    CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate,
-                    NghiNgo
-                FROM TKTT 
-                WHERE Cif = ? AND SoTaiKhoan = ?
+            query = f"""
+                SELECT {VERIFY_SELECT_COLUMNS}
+                FROM TKTT t
+                WHERE t.Cif = ? AND t.SoTaiKhoan = ?
             """
             
             result = self.db_handler.execute_query(query, params=(record["Cif"], record["SoTaiKhoan"]), fetchall=False)
             
             if result:
-                verified_record = {}
                 columns = [column[0] for column in result.cursor_description]
-                for i, value in enumerate(result):
-                    if value is not None:
-                        if columns[i] in ["LoaiD", "GioiTinh", "LoaiTaiKhoan", 
-                                        "TrangThaiHoatDongTaiKhoan", "PhuongThucMoTaiKhoan", "NghiNgo"]:
-                            verified_record[columns[i]] = int(value)
-                        else:
-                            verified_record[columns[i]] = str(value).strip()
-                
-                verified_data.append(verified_record)
+                verified_data.append(self.convert_verified_row(columns, result))
         
-        return verified_data
\ No newline at end of file
+        return verified_data
+
+    @staticmethod
+    def convert_verified_row(columns, row):
+        """Chuyển một dòng kết quả xác thực thành dict, bỏ qua giá trị NULL"""
+        verified_record = {}
+        for i, value in enumerate(row):
+            if value is not None:
+                if columns[i] in VERIFY_INT_FIELDS:
+                    verified_record[columns[i]] = int(value)
+                else:
+                    verified_record[columns[i]] = str(value).strip()
+        return verified_record
\ No newline at end of file
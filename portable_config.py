@@ -44,7 +44,8 @@ def setup_portable_environment():
             CREATE TABLE IF NOT EXISTS api_endpoint (
                 id INTEGER PRIMARY KEY,
                 endpoint_name TEXT UNIQUE,
-                url TEXT
+                url TEXT,
+                content_encoding TEXT
             )
             ''')
             
@@ -1,10 +1,16 @@
-import requests
 import base64
 import os
+import threading
 from datetime import datetime, timedelta
 from .logger import Logger
-from .db_handler import DatabaseHandler
+from .local_db_handler import LocalDatabaseHandler
 from .local_config import API_CONFIG
+from .http_session import get_session
+from .token_manager import TokenManager
+from .submission_pipeline import SimoAPIError, SubmissionPipeline, make_request_id
+from .outbox import SubmissionOutbox
+from .rate_limiter import EndpointThrottle, OVERLOAD_STATUS, parse_retry_after
+from .compression import encode_json_body, normalize_encoding
 
 # Tắt cảnh báo SSL
 import urllib3
@@ -13,33 +19,72 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logger = Logger('api')
 
 class APIHandler:
+    # Token dùng chung cho mọi APIHandler trong tiến trình, khởi tạo khi cần lần đầu
+    _token_manager = None
+    _token_manager_lock = threading.Lock()
+    # (URL, kiểu nén) của endpoint đã đọc từ config.db, dùng chung giữa các luồng gửi dữ liệu
+    _endpoint_configs = {}
+    
     def __init__(self):
-        self.db = DatabaseHandler()
+        # Thông tin xác thực, endpoint và token nằm trong config.db
+        self.db = LocalDatabaseHandler()
         self.token = None
         self.api_config = API_CONFIG
+        # Session dùng chung để tái sử dụng kết nối TCP/TLS giữa các lần gửi
+        self.session = get_session()
+        self._outbox = None
+        
+    @property
+    def outbox(self):
+        """Outbox ghi lại các phần trước khi gửi (None nếu tắt trong API_CONFIG)"""
+        if self._outbox is None and self.api_config.get('outbox_enabled', True):
+            self._outbox = SubmissionOutbox()
+        return self._outbox
+        
+    @property
+    def token_manager(self):
+        if APIHandler._token_manager is None:
+            with APIHandler._token_manager_lock:
+                if APIHandler._token_manager is None:
+                    APIHandler._token_manager = TokenManager(
+                        self.request_new_token,
+                        load_token=self.load_saved_token,
+                        refresh_margin=self.api_config.get('token_refresh_margin', 300),
+                        default_lifetime=self.api_config.get('token_default_lifetime', 3600)
+                    )
+        return APIHandler._token_manager
         
     def get_token(self):
+        """Lấy token từ bộ nhớ; chỉ gọi API khi chưa có token hoặc token đã hết hạn"""
         try:
-            conn = self.db.connect()
-            if not conn:
-                return None
-                
-            # Kiểm tra token hiện tại
-            existing_token = self.check_token_validity()
-            if existing_token:
-                return existing_token
+            self.token = self.token_manager.get_token()
+            return self.token
+        except Exception as e:
+            logger.error(f"Lỗi không xác định khi lấy token: {str(e)}")
+            return None
+            
+    def request_new_token(self):
+        """
+        Gọi API lấy token mới và lưu vào database.
+        Có thể chạy ở luồng nền nên dùng kết nối SQLite riêng cho mỗi lần gọi.
+        :return: tuple (access_token, expires_in)
+        """
+        db = LocalDatabaseHandler()
+        try:
+            if not db.connect():
+                raise ValueError("Không thể kết nối local database")
                 
             logger.info("Bắt đầu lấy token mới...")
             
             # Lấy thông tin xác thực
-            auth_data = self.db.get_api_credentials()
+            auth_data = db.get_api_credentials()
             if not auth_data:
                 raise ValueError("Không thể lấy thông tin xác thực")
                 
             username, password, consumer_key, consumer_secret = auth_data
             
             # Lấy token URL
-            token_url = self.db.get_endpoint_url("token")
+            token_url = db.get_endpoint_url("token")
             if not token_url:
                 raise ValueError("Không thể lấy token URL")
             
@@ -60,14 +105,15 @@ class APIHandler:
             }
             
             logger.info(f"Gửi request lấy token đến {token_url}")
-            response = requests.post(token_url, headers=headers, data=data, timeout=10, verify=False)
+            response = self.session.post(token_url, headers=headers, data=data, timeout=10, verify=False)
             
             if response.status_code == 200:
                 token_data = response.json()
                 if 'access_token' in token_data:
-                    self.db.save_token(token_data)
+                    db.save_token(token_data)
                     logger.info("Lấy token thành công")
-                    return token_data['access_token']
+                    # Thiếu expires_in thì TokenManager dùng thời hạn mặc định
+                    return token_data['access_token'], token_data.get('expires_in')
                 else:
                     raise ValueError("Response không chứa access_token")
             else:
@@ -78,19 +124,20 @@ class APIHandler:
                     error_msg = "URL token không đúng"
                 logger.error(error_msg)
                 raise Exception(error_msg)
-                
-        except Exception as e:
-            logger.error(f"Lỗi không xác định khi lấy token: {str(e)}")
-            return None
         finally:
-            self.db.close()
+            db.close()
             
-    def check_token_validity(self):
+    def load_saved_token(self):
+        """
+        Đọc token mới nhất trong database (dùng khi khởi động để không phải lấy token mới)
+        :return: tuple (access_token, số giây còn lại) hoặc None
+        """
+        db = LocalDatabaseHandler()
         try:
-            if not self.db.conn:
-                self.db.connect()
+            if not db.connect():
+                return None
                 
-            cursor = self.db.conn.cursor()
+            cursor = db.conn.cursor()
             query = """
                 SELECT access_token, created_at, expires_in 
                 FROM api_tokens 
@@ -126,70 +173,159 @@ class APIHandler:
             
             if remaining_seconds > 0:
                 logger.info(f"Token hiện tại còn hạn sử dụng (còn {int(remaining_seconds)} giây)")
-                return access_token
+                return access_token, remaining_seconds
             else:
                 logger.info(f"Token đã hết hạn (quá hạn {abs(int(remaining_seconds))} giây)")
                 return None
-                
+        finally:
+            db.close()
+            
+    def check_token_validity(self):
+        """Trả về token đã lưu trong database nếu còn hạn, ngược lại None"""
+        try:
+            saved = self.load_saved_token()
+            return saved[0] if saved else None
         except Exception as e:
             logger.error(f"Lỗi khi kiểm tra token: {str(e)}")
             return None
             
+    def get_endpoint_config(self, service_type):
+        """
+        Lấy URL và kiểu nén body của endpoint (có cache), mỗi lần đọc database dùng kết nối riêng
+        để an toàn khi gọi từ nhiều luồng
+        :return: tuple (url, content_encoding) hoặc (None, None)
+        """
+        config = self._endpoint_configs.get(service_type)
+        if config:
+            return config
+        db = LocalDatabaseHandler()
+        try:
+            if not db.connect():
+                return None, None
+            result = db.get_endpoint_config(service_type)
+        finally:
+            db.close()
+        if not result or not result[0]:
+            return None, None
+        config = (result[0], normalize_encoding(result[1]))
+        APIHandler._endpoint_configs[service_type] = config
+        return config
+        
+    def get_endpoint_url(self, service_type):
+        """Lấy URL endpoint (có cache)"""
+        return self.get_endpoint_config(service_type)[0]
+        
+    @classmethod
+    def clear_endpoint_cache(cls):
+        """Xóa cache URL endpoint (gọi sau khi cấu hình lại endpoint)"""
+        cls._endpoint_configs.clear()
+        
     def send_data(self, service_type, payload):
+        """
+        Gửi dữ liệu tới SIMO qua SubmissionPipeline: ghi vào outbox rồi gửi theo từng phần.
+        Payload một phần trả về phản hồi của API như trước, nhiều phần trả về bảng tổng hợp các phần.
+        """
         try:
-            # Lấy token
-            token = self.get_token()
-            if not token:
-                raise Exception("Không lấy được token")
-                
-            # Lấy endpoint URL
-            conn = self.db.connect()
-            entrypoint_url = self.db.get_endpoint_url(service_type)
-            if not entrypoint_url:
-                raise Exception(f"Không tìm thấy URL cho {service_type}")
+            if not isinstance(payload, list):
+                return self.send_chunk(service_type, payload, make_request_id(service_type))
                 
-            # Tạo mã yêu cầu
-            current_time = datetime.now().strftime("%d%m%Y.%H%M%S")
-            maYeuCau = f"{service_type}_TKTT_{current_time}"
+            chunk_size = self.api_config.get('submit_chunk_size', 1000)
+            summary = SubmissionPipeline(self, chunk_size=chunk_size, outbox=self.outbox).submit(service_type, payload)
+            if not summary['success']:
+                message = (f"Gửi thành công {summary['sent_chunks']}/{summary['total_chunks']} phần "
+                           f"({summary['sent_records']}/{summary['total_records']} bản ghi)")
+                if summary['batch_id']:
+                    message += ". Các phần lỗi đã được lưu trong outbox để gửi lại"
+                raise Exception(message)
+            if summary['total_chunks'] == 1:
+                return summary['chunks'][0]['result']
+            return summary
             
-            # Lấy kỳ báo cáo
-            ky_bao_cao = datetime.now().strftime("%m/%Y")
+        except Exception as e:
+            logger.error(f"Lỗi trong quá trình gửi dữ liệu: {str(e)}")
+            raise
             
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-                "maYeuCau": maYeuCau,
-                "kyBaoCao": ky_bao_cao
-            }
+    def send_chunk(self, service_type, payload, ma_yeu_cau, ky_bao_cao=None):
+        """
+        Gửi một request tới endpoint của service_type (có thể gọi đồng thời từ nhiều luồng)
+        :param ma_yeu_cau: Mã yêu cầu của request
+        :param ky_bao_cao: Kỳ báo cáo (mm/YYYY), mặc định là tháng hiện tại
+        :return: JSON phản hồi của API
+        :raise SimoAPIError: khi không lấy được token/URL hoặc API trả lỗi
+        """
+        # Lấy token
+        token = self.get_token()
+        if not token:
+            raise SimoAPIError("Không lấy được token")
+            
+        # Lấy endpoint URL và kiểu nén
+        entrypoint_url, content_encoding = self.get_endpoint_config(service_type)
+        if not entrypoint_url:
+            raise SimoAPIError(f"Không tìm thấy URL cho {service_type}", 404)
+            
+        # Lấy kỳ báo cáo
+        ky_bao_cao = ky_bao_cao or datetime.now().strftime("%m/%Y")
+        
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "maYeuCau": ma_yeu_cau,
+            "kyBaoCao": ky_bao_cao
+        }
+        
+        logger.info(f"Gửi request đến {entrypoint_url}")
+        logger.info(f"Headers: {headers}")
+        
+        response = self._post_json(service_type, entrypoint_url, headers, payload, content_encoding, ma_yeu_cau)
+        if response.status_code == 415 and content_encoding:
+            # Gateway không nhận body nén: tắt nén cho endpoint này đến khi cấu hình lại và gửi lại ngay
+            logger.warning(f"{service_type} không hỗ trợ Content-Encoding {content_encoding}, gửi lại không nén")
+            APIHandler._endpoint_configs[service_type] = (entrypoint_url, None)
+            response = self._post_json(service_type, entrypoint_url, headers, payload, None, ma_yeu_cau)
             
-            logger.info(f"Gửi request đến {entrypoint_url}")
-            logger.info(f"Headers: {headers}")
+        if response.status_code == 200:
+            result = response.json()
+            logger.info(f"Request thành công: {result}")
+            return result
+        else:
+            error_msg = f"Lỗi từ API: HTTP {response.status_code} - {response.text}"
+            if response.status_code == 401:
+                error_msg = "Token không hợp lệ hoặc đã hết hạn"
+                # Bỏ token trong bộ nhớ để lần gửi sau lấy token mới
+                self.token_manager.invalidate(token)
+            elif response.status_code == 400:
+                error_msg = f"Dữ liệu gửi đi không hợp lệ: {response.text}"
+            elif response.status_code == 429:
+                error_msg = "Gửi quá nhiều request, gateway yêu cầu giảm tốc độ"
+            elif response.status_code == 504:
+                error_msg = "API không phản hồi (timeout)"
+            logger.error(error_msg)
+            raise SimoAPIError(error_msg, response.status_code)
             
-            response = requests.post(
-                entrypoint_url,
+    def _post_json(self, service_type, url, headers, payload, content_encoding, ma_yeu_cau):
+        """Gửi payload dạng JSON (nén nếu endpoint bật nén) qua throttle của endpoint"""
+        body, applied_encoding = encode_json_body(payload, content_encoding)
+        headers = dict(headers)
+        if applied_encoding:
+            headers["Content-Encoding"] = applied_encoding
+            
+        # Giới hạn tốc độ và số request đồng thời theo endpoint, tự giảm khi gateway quá tải
+        throttle = EndpointThrottle.get(service_type)
+        started = throttle.acquire()
+        status_code, retry_after = None, None
+        try:
+            response = self.session.post(
+                url,
                 headers=headers,
-                json=payload,
+                data=body,
                 timeout=30,
                 verify=False
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                logger.info(f"Request thành công: {result}")
-                return result
-            else:
-                error_msg = f"Lỗi từ API: HTTP {response.status_code} - {response.text}"
-                if response.status_code == 401:
-                    error_msg = "Token không hợp lệ hoặc đã hết hạn"
-                elif response.status_code == 400:
-                    error_msg = f"Dữ liệu gửi đi không hợp lệ: {response.text}"
-                elif response.status_code == 504:
-                    error_msg = "API không phản hồi (timeout)"
-                logger.error(error_msg)
-                raise Exception(error_msg)
-                
+            status_code = response.status_code
+            if status_code in OVERLOAD_STATUS:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            return response
         except Exception as e:
-            logger.error(f"Lỗi trong quá trình gửi dữ liệu: {str(e)}")
-            raise
+            raise SimoAPIError(f"Không gửi được request {ma_yeu_cau}: {str(e)}")
         finally:
-            self.db.close() 
\ No newline at end of file
+            throttle.release(started, status_code, retry_after)
@@ -0,0 +1,43 @@
+import gzip
+import zlib
+from .local_config import API_CONFIG
+from .json_serializer import dumps
+
+# Giá trị hợp lệ của cột api_endpoint.content_encoding (NULL/'identity' là không nén)
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+
+def normalize_encoding(value):
+    """Chuẩn hóa cấu hình nén của endpoint, trả về 'gzip', 'deflate' hoặc None"""
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    return value if value in SUPPORTED_ENCODINGS else None
+
+
+def compress_body(body, encoding, level=None):
+    """
+    Nén body request
+    :param body: bytes
+    :param encoding: 'gzip' hoặc 'deflate' (zlib, theo RFC 9110)
+    :param level: Mức nén 1-9, mặc định theo API_CONFIG['compression_level']
+    """
+    level = API_CONFIG.get('compression_level', 6) if level is None else level
+    if encoding == 'gzip':
+        # mtime=0 để cùng dữ liệu cho ra cùng body nén (gửi lại từ outbox giống hệt lần đầu)
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body, level)
+    raise ValueError(f"Không hỗ trợ nén {encoding}")
+
+
+def encode_json_body(payload, encoding=None, level=None):
+    """
+    Tạo body JSON UTF-8 dạng gọn và nén nếu endpoint bật nén và body đủ lớn
+    :return: tuple (body bytes, content_encoding hoặc None nếu không nén)
+    """
+    body = dumps(payload)
+    encoding = normalize_encoding(encoding)
+    if encoding is None or len(body) < API_CONFIG.get('compression_min_bytes', 1024):
+        return body, None
+    return compress_body(body, encoding, level), encoding
@@ -0,0 +1,223 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from .logger import Logger
+
+logger = Logger('connection_pool')
+
+
+class PoolTimeoutError(Exception):
+    """Không có kết nối nào rảnh trong thời gian chờ checkout_timeout"""
+    pass
+
+
+class PoolClosedError(Exception):
+    """Pool đã bị đóng bằng close_all, không cấp thêm kết nối"""
+    pass
+
+
+class ConnectionPool:
+    """
+    Pool kết nối có giới hạn:
+    - Tối đa max_size kết nối (rảnh + đang dùng); khi hết, người gọi chờ tối đa checkout_timeout giây.
+    - Giữ ít nhất min_size kết nối; kết nối rảnh quá idle_timeout giây thì được đóng.
+    - Chỉ kiểm tra kết nối còn sống khi nó đã rảnh quá liveness_interval giây.
+    """
+
+    def __init__(self, connect, min_size=2, max_size=10, checkout_timeout=30,
+                 idle_timeout=300, liveness_interval=30, liveness_query="SELECT 1"):
+        """
+        :param connect: Hàm mở một kết nối DB-API mới
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Kích thước pool không hợp lệ: min_size={min_size}, max_size={max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.liveness_interval = liveness_interval
+        self.liveness_query = liveness_query
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, last_used), kết nối dùng gần nhất ở bên phải
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'discarded': 0,
+            'in_use': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'liveness_checks': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+    def prefill(self):
+        """Mở kết nối cho đến khi pool có đủ min_size kết nối"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+                if not self._closed:
+                    self._idle.append((conn, time.monotonic()))
+                    self._cond.notify()
+                    continue
+            self._discard(conn)
+
+    def acquire(self, timeout=None):
+        """Lấy một kết nối, chờ tối đa timeout giây (mặc định checkout_timeout)"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            last_used = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError("Pool kết nối đã đóng")
+                    self._evict_idle_locked()
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Không có kết nối database rảnh sau {timeout}s "
+                            f"(max_size={self.max_size})")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif time.monotonic() - last_used > self.liveness_interval and not self._is_alive(conn):
+                self._discard(conn)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._cond:
+                self._stats['in_use'] += 1
+                self._stats['checkouts'] += 1
+                self._stats['total_wait_time'] += wait_time
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+                if waited:
+                    self._stats['waits'] += 1
+            return conn
+
+    def release(self, conn, discard=False):
+        """Trả kết nối về pool; discard=True hoặc pool đã đóng thì đóng kết nối thay vì dùng lại"""
+        with self._cond:
+            self._stats['in_use'] -= 1
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._evict_idle_locked()
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager lấy kết nối và luôn trả lại pool.
+        Nếu khối lệnh lỗi và không rollback được thì kết nối bị coi là hỏng và bị đóng.
+        """
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self):
+        """Ảnh chụp các bộ đếm của pool"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['size'] = self._size
+            snapshot['idle'] = len(self._idle)
+            snapshot['max_size'] = self.max_size
+            snapshot['min_size'] = self.min_size
+            snapshot['closed'] = self._closed
+        checkouts = snapshot['checkouts']
+        snapshot['avg_wait_time'] = snapshot['total_wait_time'] / checkouts if checkouts else 0.0
+        return snapshot
+
+    def close_all(self):
+        """
+        Đóng pool: đóng các kết nối rảnh, kết nối đang dùng sẽ bị đóng khi được trả về (release).
+        Sau đó acquire báo PoolClosedError và các luồng đang chờ kết nối được đánh thức.
+        """
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _is_alive(self, conn):
+        with self._cond:
+            self._stats['liveness_checks'] += 1
+        try:
+            conn.cursor().execute(self.liveness_query).fetchone()
+            return True
+        except Exception as e:
+            logger.warning(f"Bỏ kết nối đã chết trong pool: {str(e)}")
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def _evict_idle_locked(self):
+        """Đóng kết nối rảnh quá idle_timeout, giữ lại min_size (phải đang giữ lock)"""
+        now = time.monotonic()
+        # Kết nối lâu chưa dùng nhất ở bên trái
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['discarded'] += 1
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -2,14 +2,19 @@ import os
 import sqlite3
 import pyodbc
 from .logger import Logger
-from queue import Queue
+from .connection_pool import ConnectionPool
 from threading import Lock
 import threading
 
 logger = Logger('database')
 
 class DatabaseHandler:
-    def __init__(self):
+    # Pool dùng chung cho mọi instance có cùng chuỗi kết nối
+    _pools = {}
+    _pools_lock = Lock()
+
+    def __init__(self, min_size=3, max_size=10, checkout_timeout=30, idle_timeout=300,
+                 liveness_interval=30):
         self.conn = None
         self.conn_str = (
             "DRIVER={ODBC Driver 17 for SQL Server};"
@@ -18,53 +23,57 @@ class DatabaseHandler:
             "UID=sa;"
             "PWD=q;"
             "Connection Timeout=30;"
-            "Pooling=true;"  # Enable connection pooling
-            "Max Pool Size=10;"  # Maximum connections in pool
         )
         self._lock = Lock()
-        self._connection_pool = Queue(maxsize=10)
-        self._init_connection_pool()
+        self._connection_pool = self._get_shared_pool(
+            min_size=min_size,
+            max_size=max_size,
+            checkout_timeout=checkout_timeout,
+            idle_timeout=idle_timeout,
+            liveness_interval=liveness_interval
+        )
+
+    def _get_shared_pool(self, **pool_options):
+        """Get the pool for this connection string, creating and pre-filling it once"""
+        with self._pools_lock:
+            pool = self._pools.get(self.conn_str)
+            if pool is None:
+                pool = ConnectionPool(lambda: pyodbc.connect(self.conn_str), **pool_options)
+                self._pools[self.conn_str] = pool
+                self._init_connection_pool(pool)
+        return pool
 
-    def _init_connection_pool(self):
-        """Initialize connection pool with a few connections"""
+    def _init_connection_pool(self, pool):
+        """Initialize connection pool with min_size connections"""
         try:
-            for _ in range(3):  # Start with 3 connections
-                conn = pyodbc.connect(self.conn_str)
-                self._connection_pool.put(conn)
+            pool.prefill()
         except Exception as e:
             logger.error(f"Error initializing connection pool: {str(e)}")
 
     def get_connection(self):
-        """Get a connection from the pool or create new if needed"""
-        try:
-            # Try to get a connection from the pool
-            conn = self._connection_pool.get(block=True, timeout=5)
-            try:
-                # Test if connection is still alive
-                conn.execute("SELECT 1").fetchone()
-                return conn
-            except:
-                # Connection is dead, create new one
-                return pyodbc.connect(self.conn_str)
-        except:
-            # Pool is empty, create new connection
-            return pyodbc.connect(self.conn_str)
+        """Check out a connection from the pool, waiting up to the checkout timeout"""
+        return self._connection_pool.acquire()
 
-    def return_connection(self, conn):
+    def return_connection(self, conn, discard=False):
         """Return a connection to the pool"""
-        try:
-            self._connection_pool.put(conn, block=False)
-        except:
-            try:
-                conn.close()
-            except:
-                pass
+        self._connection_pool.release(conn, discard=discard)
+
+    def connection(self):
+        """
+        Context manager for a pooled connection:
+            with db_handler.connection() as conn:
+                ...
+        The connection is rolled back on error and always returned to the pool.
+        """
+        return self._connection_pool.connection()
+
+    def get_pool_stats(self):
+        """Pool counters: created, discarded, in_use, waits, timeouts, wait times, size, idle"""
+        return self._connection_pool.stats()
 
     def execute_query(self, query, params=None, fetchall=True):
         """Execute query with automatic connection management"""
-        conn = None
-        try:
-            conn = self.get_connection()
+        with self.connection() as conn:
             cursor = conn.cursor()
             
             if params:
@@ -79,25 +88,105 @@ class DatabaseHandler:
                 
             conn.commit()
             return result
-        except Exception as e:
-            if conn:
+    
+    def stream_query(self, query, params=None, batch_size=5000):
+        """
+        Generator that yields result rows one by one, fetching batch_size rows at a
+        time with fetchmany, so large result sets never sit in memory at once.
+        The connection stays checked out until the generator is exhausted or
+        closed, e.g. by breaking out of the loop:
+            for row in db_handler.stream_query(query, params):
+                ...
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            completed = False
+            try:
+                cursor.arraysize = batch_size
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                    
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+                completed = True
+            finally:
+                # Discard pending results so the connection can be reused
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
                 try:
-                    conn.rollback()
-                except:
+                    if completed:
+                        conn.commit()
+                    else:
+                        conn.rollback()
+                except Exception:
                     pass
-            raise e
-        finally:
-            if conn:
-                self.return_connection(conn)
     
+    def bulk_update(self, table, key_columns, update_columns, rows, column_types, extra_set=None):
+        """
+        Bulk update through a staged temp table in a single transaction
+        :param table: Table to update
+        :param key_columns: Key columns used to join the staged rows
+        :param update_columns: Columns assigned from the staged rows
+        :param rows: List of tuples (key values..., update values...)
+        :param column_types: dict column name -> SQL type for the temp table
+        :param extra_set: Additional SET expression, e.g. "UpdateDate = GETDATE()"
+        :return: List of bools in the order of rows, True if the row matched at least one record
+        """
+        if not rows:
+            return []
+            
+        stage_columns = list(key_columns) + list(update_columns)
+        column_defs = ", ".join(f"{col} {column_types[col]}" for col in stage_columns)
+        placeholders = ", ".join(["?"] * (len(stage_columns) + 1))
+        join_clause = " AND ".join(f"t.{col} = s.{col}" for col in key_columns)
+        set_clause = ", ".join([f"{col} = s.{col}" for col in update_columns] + ([extra_set] if extra_set else []))
+        
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("IF OBJECT_ID('tempdb..#bulk_stage') IS NOT NULL DROP TABLE #bulk_stage")
+            cursor.execute("IF OBJECT_ID('tempdb..#bulk_updated') IS NOT NULL DROP TABLE #bulk_updated")
+            cursor.execute(f"CREATE TABLE #bulk_stage (RowIdx INT PRIMARY KEY, {column_defs})")
+            cursor.execute("CREATE TABLE #bulk_updated (RowIdx INT)")
+            
+            # Load the staging table with parameter arrays
+            cursor.fast_executemany = True
+            cursor.executemany(
+                f"INSERT INTO #bulk_stage (RowIdx, {', '.join(stage_columns)}) VALUES ({placeholders})",
+                [(idx,) + tuple(row) for idx, row in enumerate(rows)]
+            )
+            cursor.fast_executemany = False
+            
+            cursor.execute(f"""
+                UPDATE t SET {set_clause}
+                OUTPUT s.RowIdx INTO #bulk_updated (RowIdx)
+                FROM {table} t
+                JOIN #bulk_stage s ON {join_clause}
+            """)
+            cursor.execute("SELECT DISTINCT RowIdx FROM #bulk_updated")
+            updated = {row[0] for row in cursor.fetchall()}
+            
+            cursor.execute("DROP TABLE #bulk_stage")
+            cursor.execute("DROP TABLE #bulk_updated")
+            conn.commit()
+            return [idx in updated for idx in range(len(rows))]
+
     def close_all(self):
-        """Close all connections in the pool"""
-        while not self._connection_pool.empty():
-            try:
-                conn = self._connection_pool.get_nowait()
-                conn.close()
-            except:
-                continue
+        """
+        Close the shared pool: idle connections now, checked-out ones when returned.
+        The pool is dropped from the registry so handlers created later open a new one.
+        """
+        with self._pools_lock:
+            if self._pools.get(self.conn_str) is self._connection_pool:
+                del self._pools[self.conn_str]
+        self._connection_pool.close_all()
 
     def close(self):
         if self.conn:
@@ -0,0 +1,153 @@
+import csv
+import os
+import time
+from .logger import Logger
+
+logger = Logger('export_engine')
+
+
+class StreamingExporter:
+    """
+    Ghi dữ liệu dạng luồng ra file XLSX hoặc CSV với bộ nhớ không đổi.
+    XLSX dùng xlsxwriter ở chế độ constant_memory (hoặc openpyxl write-only nếu
+    không có xlsxwriter), tự sang sheet mới khi vượt giới hạn số dòng của Excel.
+    """
+    XLSX_MAX_ROWS = 1048576
+    SUPPORTED_FORMATS = ("xlsx", "csv")
+
+    def __init__(self, progress_callback=None, cancel_event=None, progress_interval=5000):
+        """
+        :param progress_callback: Hàm nhận số dòng đã ghi, được gọi mỗi progress_interval dòng
+        :param cancel_event: threading.Event, khi được set thì dừng xuất và xóa file dở dang
+        """
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.progress_interval = progress_interval
+
+    def export(self, rows, file_path, columns=None, file_format=None):
+        """
+        Xuất dữ liệu ra file
+        :param rows: Iterable các dòng (tuple/list hoặc pyodbc Row)
+        :param columns: Tên cột; nếu None sẽ lấy từ cursor_description của dòng đầu tiên
+        :param file_format: 'xlsx' hoặc 'csv'; nếu None sẽ lấy theo phần mở rộng của file
+        :return: dict gồm rows, elapsed, rows_per_second, cancelled
+        """
+        file_format = (file_format or os.path.splitext(file_path)[1].lstrip(".")).lower()
+        if file_format not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Định dạng xuất không được hỗ trợ: {file_format}")
+
+        started = time.perf_counter()
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if columns is None:
+            columns = [column[0] for column in first_row.cursor_description] if first_row is not None else []
+
+        def all_rows():
+            if first_row is not None:
+                yield first_row
+            yield from rows
+
+        if file_format == "csv":
+            written, cancelled = self._write_csv(all_rows(), file_path, columns)
+        else:
+            written, cancelled = self._write_xlsx(all_rows(), file_path, columns)
+
+        if cancelled and os.path.exists(file_path):
+            os.remove(file_path)
+
+        elapsed = time.perf_counter() - started
+        result = {
+            'rows': written,
+            'elapsed': elapsed,
+            'rows_per_second': written / elapsed if elapsed > 0 else 0.0,
+            'cancelled': cancelled
+        }
+        if cancelled:
+            logger.info(f"Đã hủy xuất dữ liệu sau {written:,} dòng")
+        else:
+            logger.info(f"Đã xuất {written:,} dòng ra {file_path} trong {elapsed:.1f}s "
+                        f"({result['rows_per_second']:,.0f} dòng/giây)")
+        return result
+
+    def _is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _report(self, written):
+        if self.progress_callback and written % self.progress_interval == 0:
+            self.progress_callback(written)
+
+    def _write_csv(self, rows, file_path, columns):
+        written = 0
+        # utf-8-sig để Excel đọc đúng tiếng Việt
+        with open(file_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                if written % self.progress_interval == 0 and self._is_cancelled():
+                    return written, True
+                writer.writerow(["" if value is None else value for value in row])
+                written += 1
+                self._report(written)
+        if self.progress_callback:
+            self.progress_callback(written)
+        return written, False
+
+    def _write_xlsx(self, rows, file_path, columns):
+        try:
+            import xlsxwriter
+        except ImportError:
+            return self._write_xlsx_openpyxl(rows, file_path, columns)
+
+        workbook = xlsxwriter.Workbook(file_path, {
+            'constant_memory': True,
+            'strings_to_numbers': False,
+            'strings_to_formulas': False,
+            'strings_to_urls': False
+        })
+        written = 0
+        try:
+            worksheet = None
+            sheet_row = self.XLSX_MAX_ROWS
+            for row in rows:
+                if written % self.progress_interval == 0 and self._is_cancelled():
+                    return written, True
+                if sheet_row >= self.XLSX_MAX_ROWS:
+                    worksheet = workbook.add_worksheet(f"TKTT_{len(workbook.worksheets()) + 1}")
+                    worksheet.write_row(0, 0, columns)
+                    sheet_row = 1
+                worksheet.write_row(sheet_row, 0, row)
+                sheet_row += 1
+                written += 1
+                self._report(written)
+            if worksheet is None:
+                workbook.add_worksheet("TKTT_1").write_row(0, 0, columns)
+        finally:
+            workbook.close()
+        if self.progress_callback:
+            self.progress_callback(written)
+        return written, False
+
+    def _write_xlsx_openpyxl(self, rows, file_path, columns):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        written = 0
+        worksheet = None
+        sheet_row = self.XLSX_MAX_ROWS
+        for row in rows:
+            if written % self.progress_interval == 0 and self._is_cancelled():
+                return written, True
+            if sheet_row >= self.XLSX_MAX_ROWS:
+                worksheet = workbook.create_sheet(f"TKTT_{len(workbook.worksheets) + 1}")
+                worksheet.append(list(columns))
+                sheet_row = 1
+            worksheet.append(list(row))
+            sheet_row += 1
+            written += 1
+            self._report(written)
+        if worksheet is None:
+            workbook.create_sheet("TKTT_1").append(list(columns))
+        workbook.save(file_path)
+        if self.progress_callback:
+            self.progress_callback(written)
+        return written, False
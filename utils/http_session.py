@@ -0,0 +1,69 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .local_config import API_CONFIG
+from .logger import Logger
+
+logger = Logger('http_session')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=None, pool_maxsize=None, max_retries=None, backoff_factor=None):
+    """
+    Tạo requests.Session dùng lại kết nối (keep-alive) tới SIMO gateway
+    :param pool_connections: Số host được giữ pool kết nối
+    :param pool_maxsize: Số kết nối tối đa giữ lại cho mỗi host
+    :param max_retries: Số lần thử lại khi không kết nối được hoặc gateway trả 502/503
+    :param backoff_factor: Hệ số chờ giữa các lần thử lại (giây, tăng theo cấp số nhân)
+    """
+    pool_connections = pool_connections or API_CONFIG.get('pool_connections', 4)
+    pool_maxsize = pool_maxsize or API_CONFIG.get('pool_maxsize', 16)
+    max_retries = API_CONFIG.get('max_retries', 3) if max_retries is None else max_retries
+    backoff_factor = API_CONFIG.get('backoff_factor', 0.5) if backoff_factor is None else backoff_factor
+
+    # Chỉ thử lại khi chắc chắn request chưa được xử lý: lỗi kết nối và 502/503.
+    # Không thử lại lỗi đọc hay 504 vì gateway có thể đã nhận dữ liệu, gửi lại sẽ bị trùng.
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=max_retries,
+        status_forcelist=(502, 503),
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry, pool_block=False)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    # Không đặt session.verify: requests ưu tiên REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE hơn giá trị này,
+    # nên nơi gọi vẫn truyền verify=False cho từng request như trước
+    return session
+
+
+def get_session():
+    """Lấy session dùng chung cho mọi request tới SIMO (token và gửi dữ liệu)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+                logger.info("Khởi tạo HTTP session dùng chung")
+    return _session
+
+
+def close_session():
+    """Đóng session dùng chung và các kết nối đang giữ"""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
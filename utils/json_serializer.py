@@ -0,0 +1,70 @@
+import json
+import os
+from .local_config import API_CONFIG
+from .logger import Logger
+
+logger = Logger('json_serializer')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _select_backend():
+    # Cho phép ép dùng thư viện chuẩn (ví dụ để so sánh kết quả) qua SIMO_JSON_BACKEND hoặc API_CONFIG
+    preferred = os.environ.get('SIMO_JSON_BACKEND') or API_CONFIG.get('json_backend', 'auto')
+    if preferred in ('auto', 'orjson') and orjson is not None:
+        return 'orjson'
+    if preferred == 'orjson':
+        logger.warning("Chưa cài orjson, dùng thư viện json chuẩn")
+    return 'json'
+
+
+BACKEND = _select_backend()
+
+
+def dumps(data, indent=False):
+    """
+    Serialize sang JSON dạng bytes UTF-8 (giữ nguyên tiếng Việt như ensure_ascii=False)
+    :param indent: True để thụt lề 2 khoảng trắng (hiển thị, lưu file), False cho body HTTP
+    """
+    if BACKEND == 'orjson':
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def loads(raw):
+    """Parse JSON từ str hoặc bytes"""
+    if BACKEND == 'orjson':
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class SerializedPayload:
+    """
+    Payload đã serialize một lần (dạng thụt lề) để dùng lại cho hiển thị, lưu file và tải xuống.
+    Dữ liệu gốc được giữ lại để gửi đi mà không phải parse lại chuỗi JSON đang hiển thị.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.content = dumps(data, indent=True)
+        self._text = None
+
+    @property
+    def text(self):
+        """Chuỗi JSON để hiển thị (giải mã một lần)"""
+        if self._text is None:
+            self._text = self.content.decode('utf-8')
+        return self._text
+
+    def save(self, file_path):
+        """Ghi thẳng bytes đã serialize ra file"""
+        with open(file_path, "wb") as f:
+            f.write(self.content)
+
+    def __len__(self):
+        return len(self.data)
@@ -1,16 +1,76 @@
 import os
+import sys
 
 # Mặc định sử dụng SQL Server
 USE_LOCAL_DB = False
 
+# Thư mục ứng dụng (thư mục chứa file exe khi đóng gói bằng PyInstaller)
+if getattr(sys, 'frozen', False):
+    APP_DIR = os.path.dirname(sys.executable)
+else:
+    APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 # Đường dẫn đến file SQLite
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.db')
+DB_PATH = os.path.join(APP_DIR, 'config.db')
 
 # Cấu hình API
 API_CONFIG = {
     'token_url': 'https://example.com/api/token',
     'base_url': 'https://example.com/api',
-    'timeout': 30
+    'timeout': 30,
+    # Pool kết nối HTTP dùng chung (utils/http_session.py)
+    'pool_connections': 4,
+    'pool_maxsize': 16,
+    'max_retries': 3,
+    'backoff_factor': 0.5,
+    # Làm mới token trước khi hết hạn bao nhiêu giây (utils/token_manager.py)
+    'token_refresh_margin': 300,
+    # Thời hạn token (giây) khi API không trả expires_in hợp lệ
+    'token_default_lifetime': 3600,
+    # Gửi dữ liệu theo từng phần (utils/submission_pipeline.py)
+    'submit_chunk_size': 1000,
+    'submit_max_in_flight': 8,
+    'submit_max_attempts': 3,
+    'submit_retry_delay': 2,
+    # Outbox gửi lại trong config.db (utils/outbox.py)
+    'outbox_enabled': True,
+    'outbox_base_delay': 30,
+    'outbox_max_delay': 3600,
+    'outbox_max_attempts': 10,
+    'outbox_lease_seconds': 600,
+    'outbox_poll_interval': 5,
+    'outbox_retention_days': 30,
+    'outbox_prune_interval': 3600,
+    # Giới hạn tốc độ và số request đồng thời theo endpoint (utils/rate_limiter.py)
+    # Cấu hình riêng: 'rate_limits': {'simo_011': {'rate': 2, 'burst': 4, 'max_concurrency': 4}}
+    'rate_limit_per_second': 5,
+    'rate_limit_burst': 10,
+    'concurrency_initial': 4,
+    'concurrency_min': 1,
+    'concurrency_max': 8,
+    'latency_target': 10,
+    'rate_limits': {},
+    # Số luồng chạy truy vấn database cho SimoService (app/services/simo_service.py)
+    'async_db_workers': 4,
+    # Nén body request cho endpoint có api_endpoint.content_encoding (utils/compression.py)
+    'compression_level': 6,
+    'compression_min_bytes': 1024,
+    # Số luồng nền tải dữ liệu cho các tab giao diện (views/background_tasks.py)
+    'ui_task_workers': 4,
+    # Cache trang và tải trước trang liền kề ở tab TKTT/Phát hiện gian lận (models/page_cache.py)
+    'page_cache_pages': 20,
+    'prefetch_previous_page': True,
+    # Tìm kiếm khi đang gõ ở tab TKTT và cache kết quả tìm kiếm (models/search_cache.py)
+    'search_debounce_ms': 400,
+    'search_min_chars': 2,
+    'search_cache_max_rows': 5000,
+    'search_cache_entries': 10,
+    # Chỉ mục tìm kiếm cục bộ (SQLite FTS5 trigram) cho Cif/Soid/tên khách hàng (models/search_index.py)
+    'search_index_enabled': True,
+    # Đường dẫn tương đối được tính từ thư mục ứng dụng
+    'search_index_path': 'search_index.db',
+    'search_index_sync_interval': 60,
+    'search_index_full_sync_hours': 24
 }
 
 # Các endpoint mặc định
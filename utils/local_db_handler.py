@@ -6,10 +6,14 @@ from .logger import Logger
 logger = Logger('local_database')
 
 class LocalDatabaseHandler:
+    # Các file database đã được nâng cấp cấu trúc trong tiến trình này
+    _migrated = set()
+    
     def __init__(self):
         self.conn = None
         self.db_path = 'config.db'
         self.initialize_db()
+        self.migrate_db()
     
     def connect(self):
         try:
@@ -45,7 +49,8 @@ class LocalDatabaseHandler:
                     CREATE TABLE IF NOT EXISTS api_endpoint (
                         id INTEGER PRIMARY KEY,
                         endpoint_name TEXT UNIQUE,
-                        url TEXT
+                        url TEXT,
+                        content_encoding TEXT
                     )
                     ''')
                     
@@ -69,6 +74,24 @@ class LocalDatabaseHandler:
             finally:
                 self.close()
     
+    def migrate_db(self):
+        """Bổ sung các cột mới cho database tạo từ phiên bản trước"""
+        if self.db_path in self._migrated:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(api_endpoint)")]
+                if columns and 'content_encoding' not in columns:
+                    conn.execute("ALTER TABLE api_endpoint ADD COLUMN content_encoding TEXT")
+                    conn.commit()
+                    logger.info("Đã thêm cột content_encoding vào bảng api_endpoint")
+            finally:
+                conn.close()
+            LocalDatabaseHandler._migrated.add(self.db_path)
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi nâng cấp local database: {str(e)}")
+    
     def get_api_credentials(self):
         try:
             cursor = self.conn.cursor()
@@ -89,6 +112,22 @@ class LocalDatabaseHandler:
             logger.error(f"Lỗi database: {e}")
             return None
             
+    def get_endpoint_config(self, endpoint_name):
+        """
+        Lấy URL và cấu hình nén request của endpoint
+        :return: tuple (url, content_encoding) hoặc None
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT url, content_encoding FROM api_endpoint WHERE endpoint_name = ?", (endpoint_name,)
+            )
+            result = cursor.fetchone()
+            return result if result else None
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi database: {e}")
+            return None
+            
     def save_token(self, token_data):
         try:
             cursor = self.conn.cursor()
@@ -134,8 +173,12 @@ class LocalDatabaseHandler:
     def save_endpoint_url(self, endpoint_name, url):
         try:
             cursor = self.conn.cursor()
+            # Cập nhật tại chỗ để giữ cấu hình nén của endpoint
             cursor.execute(
-                "INSERT OR REPLACE INTO api_endpoint (endpoint_name, url) VALUES (?, ?)",
+                """
+                INSERT INTO api_endpoint (endpoint_name, url) VALUES (?, ?)
+                ON CONFLICT(endpoint_name) DO UPDATE SET url = excluded.url
+                """,
                 (endpoint_name, url)
             )
             self.conn.commit()
@@ -146,6 +189,25 @@ class LocalDatabaseHandler:
             self.conn.rollback()
             return False
             
+    def save_endpoint_encoding(self, endpoint_name, content_encoding):
+        """
+        Cấu hình nén body request cho endpoint
+        :param content_encoding: 'gzip', 'deflate' hoặc None/'identity' để không nén
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "UPDATE api_endpoint SET content_encoding = ? WHERE endpoint_name = ?",
+                (content_encoding, endpoint_name)
+            )
+            self.conn.commit()
+            logger.info(f"Đã lưu cấu hình nén {content_encoding} cho endpoint {endpoint_name}")
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi lưu cấu hình nén: {str(e)}")
+            self.conn.rollback()
+            return False
+            
     def close(self):
         if self.conn:
             self.conn.close()
\ No newline at end of file
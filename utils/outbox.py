@@ -0,0 +1,432 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from .local_config import API_CONFIG
+from .logger import Logger
+
+logger = Logger('outbox')
+
+# Trạng thái của một phần trong outbox
+STATUS_PENDING = 'pending'      # Đã ghi, chưa gửi
+STATUS_SENDING = 'sending'      # Đang được gửi (có hạn giữ claimed_at)
+STATUS_RETRY = 'retry'          # Gửi lỗi, chờ tới next_attempt_at để gửi lại
+STATUS_SENT = 'sent'            # Gateway đã nhận
+STATUS_FAILED = 'failed'        # Hết số lần thử, chờ người vận hành gửi lại
+STATUS_REJECTED = 'rejected'    # Gateway từ chối dữ liệu (400/404), không tự gửi lại
+
+STATUS_LABELS = {
+    STATUS_PENDING: "Chờ gửi",
+    STATUS_SENDING: "Đang gửi",
+    STATUS_RETRY: "Chờ gửi lại",
+    STATUS_SENT: "Đã gửi",
+    STATUS_FAILED: "Lỗi",
+    STATUS_REJECTED: "Bị từ chối"
+}
+
+
+class SubmissionOutbox:
+    """
+    Hàng đợi bền vững các phần dữ liệu SIMO trong bảng submission_outbox của config.db.
+    Mỗi phần được ghi lại (kèm maYeuCau) trước khi gửi, nên sau khi mất kết nối hay tắt
+    chương trình giữa chừng vẫn biết phần nào đã gửi và chỉ gửi lại phần còn thiếu với đúng maYeuCau cũ.
+    Mỗi thao tác mở kết nối SQLite riêng để dùng được từ luồng GUI và các luồng gửi.
+    """
+    _initialized = set()
+    _init_lock = threading.Lock()
+
+    def __init__(self, db_path='config.db', base_delay=None, max_delay=None, max_attempts=None, lease_seconds=None):
+        """
+        :param db_path: Đường dẫn database (cùng file với LocalDatabaseHandler)
+        :param base_delay: Thời gian chờ (giây) trước lần gửi lại đầu tiên, nhân đôi sau mỗi lần lỗi
+        :param max_delay: Thời gian chờ tối đa giữa hai lần gửi lại
+        :param max_attempts: Số lần gửi tối đa trước khi chuyển sang trạng thái lỗi
+        :param lease_seconds: Phần ở trạng thái đang gửi quá thời gian này được coi là bị bỏ dở
+        """
+        self.db_path = db_path
+        self.base_delay = base_delay or API_CONFIG.get('outbox_base_delay', 30)
+        self.max_delay = max_delay or API_CONFIG.get('outbox_max_delay', 3600)
+        self.max_attempts = max_attempts or API_CONFIG.get('outbox_max_attempts', 10)
+        self.lease_seconds = lease_seconds or API_CONFIG.get('outbox_lease_seconds', 600)
+        self.ensure_table()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_table(self):
+        """Tạo bảng outbox nếu chưa có"""
+        with self._init_lock:
+            if self.db_path in self._initialized:
+                return
+            conn = self._connect()
+            try:
+                # WAL để GUI đọc trạng thái trong khi luồng nền đang ghi
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS submission_outbox (
+                    id INTEGER PRIMARY KEY,
+                    batch_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    service_type TEXT NOT NULL,
+                    ma_yeu_cau TEXT NOT NULL UNIQUE,
+                    ky_bao_cao TEXT NOT NULL,
+                    records INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    result TEXT,
+                    created_at TIMESTAMP,
+                    updated_at TIMESTAMP
+                )
+                ''')
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_outbox_status ON submission_outbox (status, next_attempt_at)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_batch_chunk ON submission_outbox (batch_id, chunk_index)")
+                conn.commit()
+                self._initialized.add(self.db_path)
+            finally:
+                conn.close()
+
+    def enqueue(self, service_type, ky_bao_cao, chunks, request_ids, claimed_at=None, batch_id=None):
+        """
+        Ghi các phần của một lần gửi vào outbox
+        :param chunks: list các phần (list bản ghi)
+        :param request_ids: maYeuCau tương ứng từng phần
+        :param claimed_at: Thời điểm (time.time()) nơi gọi giữ các phần này để tự gửi; None thì để luồng nền gửi.
+                           Nơi gọi gia hạn bằng claim trước mỗi lần gửi, quá lease_seconds thì luồng nền lấy lại
+        :param batch_id: Mã lần gửi, mặc định tạo mới
+        :return: batch_id
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        status = STATUS_PENDING if claimed_at is None else STATUS_SENDING
+        rows = [
+            (batch_id, index, service_type, ma_yeu_cau, ky_bao_cao, len(chunk),
+             json.dumps(chunk, ensure_ascii=False), status, claimed_at, now, now)
+            for index, (chunk, ma_yeu_cau) in enumerate(zip(chunks, request_ids))
+        ]
+        conn = self._connect()
+        try:
+            # maYeuCau là duy nhất: trùng mã thì báo lỗi thay vì bỏ qua rồi gửi phần không được ghi lại
+            cursor = conn.executemany('''
+                INSERT INTO submission_outbox (
+                    batch_id, chunk_index, service_type, ma_yeu_cau, ky_bao_cao, records,
+                    payload, status, claimed_at, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            if cursor.rowcount != len(rows):
+                raise sqlite3.IntegrityError(
+                    f"Chỉ ghi được {cursor.rowcount}/{len(rows)} phần {service_type} vào outbox"
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        logger.info(f"Đã ghi {len(rows)} phần {service_type} vào outbox (batch {batch_id})")
+        return batch_id
+
+    def claim_due(self, limit):
+        """
+        Lấy tối đa limit phần đến hạn gửi và đánh dấu đang gửi
+        :return: list dict (batch_id, chunk_index, ma_yeu_cau, service_type, ky_bao_cao, payload, claimed_at)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE để hai tiến trình (GUI và web) không lấy cùng một phần
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute('''
+                SELECT id, batch_id, chunk_index, ma_yeu_cau, service_type, ky_bao_cao, payload
+                FROM submission_outbox
+                WHERE status IN (?, ?) AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            ''', (STATUS_PENDING, STATUS_RETRY, now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE submission_outbox SET status = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                [(STATUS_SENDING, now, datetime.now().isoformat(), row[0]) for row in rows]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return [
+            {'batch_id': row[1], 'chunk_index': row[2], 'ma_yeu_cau': row[3], 'service_type': row[4],
+             'ky_bao_cao': row[5], 'payload': row[6], 'claimed_at': now}
+            for row in rows
+        ]
+
+    def release_stale(self):
+        """Trả các phần bị bỏ dở khi đang gửi (chương trình bị tắt) về hàng đợi gửi lại"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE submission_outbox SET status = ?, next_attempt_at = 0, updated_at = ?
+                WHERE status = ? AND claimed_at < ?
+            ''', (STATUS_RETRY, datetime.now().isoformat(), STATUS_SENDING, time.time() - self.lease_seconds))
+            conn.commit()
+            if cursor.rowcount:
+                logger.info(f"Đưa {cursor.rowcount} phần bị gửi dở vào hàng đợi gửi lại")
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def claim(self, batch_id, chunk_index, claimed_at):
+        """
+        Gia hạn quyền gửi một phần ngay trước khi gửi
+        :param claimed_at: Thời điểm giữ hiện tại của nơi gọi
+        :return: Thời điểm giữ mới, None nếu phần này đã bị luồng nền lấy lại (nơi gọi không được gửi nữa)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE submission_outbox SET claimed_at = ?, updated_at = ?
+                WHERE batch_id = ? AND chunk_index = ? AND status = ? AND claimed_at = ?
+            ''', (now, datetime.now().isoformat(), batch_id, chunk_index, STATUS_SENDING, claimed_at))
+            conn.commit()
+            return now if cursor.rowcount else None
+        finally:
+            conn.close()
+
+    def mark_sent(self, batch_id, chunk_index, result, claimed_at):
+        """
+        Ghi nhận phần đã gửi thành công, chỉ khi nơi gọi vẫn đang giữ phần này
+        :param claimed_at: Thời điểm giữ của nơi gọi (từ enqueue, claim hoặc claim_due)
+        :return: False nếu phần đã bị lấy lại, kết quả không được ghi
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE submission_outbox
+                SET status = ?, attempts = attempts + 1, result = ?, last_error = NULL, claimed_at = NULL, updated_at = ?
+                WHERE batch_id = ? AND chunk_index = ? AND status = ? AND claimed_at = ?
+            ''', (STATUS_SENT, json.dumps(result, ensure_ascii=False), datetime.now().isoformat(),
+                  batch_id, chunk_index, STATUS_SENDING, claimed_at))
+            conn.commit()
+        finally:
+            conn.close()
+        if not cursor.rowcount:
+            logger.warning(f"Phần {chunk_index} của batch {batch_id} đã bị lấy lại, bỏ qua kết quả gửi")
+        return bool(cursor.rowcount)
+
+    def mark_failed(self, batch_id, chunk_index, error, claimed_at, retryable=True, release=True):
+        """
+        Ghi nhận một lần gửi lỗi, chỉ khi nơi gọi vẫn đang giữ phần này
+        :param claimed_at: Thời điểm giữ của nơi gọi (từ enqueue, claim hoặc claim_due)
+        :param retryable: False nếu gateway từ chối dữ liệu, phần này không được tự gửi lại
+        :param release: False nếu nơi gọi vẫn tiếp tục tự gửi lại (giữ trạng thái đang gửi)
+        :return: False nếu phần đã bị lấy lại, lỗi không được ghi
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT attempts FROM submission_outbox
+                WHERE batch_id = ? AND chunk_index = ? AND status = ? AND claimed_at = ?
+            ''', (batch_id, chunk_index, STATUS_SENDING, claimed_at)).fetchone()
+            if not row:
+                logger.warning(f"Phần {chunk_index} của batch {batch_id} đã bị lấy lại, bỏ qua lỗi gửi")
+                return False
+            attempts = row[0] + 1
+            now = time.time()
+            if not release:
+                # Giữ nguyên thời điểm giữ, nơi gọi gia hạn bằng claim trước lần gửi lại
+                status, next_attempt_at, new_claimed_at = STATUS_SENDING, 0, claimed_at
+            elif not retryable:
+                status, next_attempt_at, new_claimed_at = STATUS_REJECTED, 0, None
+            elif attempts >= self.max_attempts:
+                status, next_attempt_at, new_claimed_at = STATUS_FAILED, 0, None
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                status, next_attempt_at, new_claimed_at = STATUS_RETRY, now + delay, None
+            cursor = conn.execute('''
+                UPDATE submission_outbox
+                SET status = ?, attempts = ?, next_attempt_at = ?, claimed_at = ?, last_error = ?, updated_at = ?
+                WHERE batch_id = ? AND chunk_index = ? AND status = ? AND claimed_at = ?
+            ''', (status, attempts, next_attempt_at, new_claimed_at, str(error), datetime.now().isoformat(),
+                  batch_id, chunk_index, STATUS_SENDING, claimed_at))
+            conn.commit()
+            return bool(cursor.rowcount)
+        finally:
+            conn.close()
+
+    def requeue(self, batch_id=None):
+        """
+        Đưa các phần lỗi/bị từ chối về hàng đợi để gửi lại ngay (người vận hành chọn)
+        :param batch_id: Chỉ gửi lại phần của lần gửi này; None là tất cả
+        :return: Số phần được đưa lại hàng đợi
+        """
+        query = '''
+            UPDATE submission_outbox SET status = ?, attempts = 0, next_attempt_at = 0, updated_at = ?
+            WHERE status IN (?, ?)
+        '''
+        params = [STATUS_RETRY, datetime.now().isoformat(), STATUS_FAILED, STATUS_REJECTED]
+        if batch_id:
+            query += " AND batch_id = ?"
+            params.append(batch_id)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(query, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def list_batches(self, limit=200):
+        """
+        Tổng hợp trạng thái theo từng lần gửi, mới nhất trước
+        :return: list dict (batch_id, service_type, created_at, chunks, records, sent, waiting, failed)
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT batch_id, service_type, MIN(created_at), COUNT(*), SUM(records),
+                       SUM(status = ?), SUM(status IN (?, ?, ?)), SUM(status IN (?, ?)), MAX(updated_at)
+                FROM submission_outbox
+                GROUP BY batch_id
+                ORDER BY MIN(id) DESC
+                LIMIT ?
+            ''', (STATUS_SENT, STATUS_PENDING, STATUS_SENDING, STATUS_RETRY,
+                  STATUS_FAILED, STATUS_REJECTED, limit)).fetchall()
+        finally:
+            conn.close()
+        keys = ('batch_id', 'service_type', 'created_at', 'chunks', 'records', 'sent', 'waiting', 'failed', 'updated_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def list_chunks(self, batch_id):
+        """Trạng thái từng phần của một lần gửi (không kèm payload)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT chunk_index, ma_yeu_cau, records, status, attempts, next_attempt_at, last_error, updated_at
+                FROM submission_outbox
+                WHERE batch_id = ?
+                ORDER BY chunk_index
+            ''', (batch_id,)).fetchall()
+        finally:
+            conn.close()
+        keys = ('chunk_index', 'ma_yeu_cau', 'records', 'status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def prune(self, retention_days=None):
+        """
+        Xóa các phần đã gửi thành công quá retention_days ngày (payload chứa thông tin khách hàng,
+        không giữ lâu hơn cần thiết). Phần lỗi hoặc bị từ chối được giữ để người vận hành xử lý.
+        :return: Số phần đã xóa
+        """
+        retention_days = API_CONFIG.get('outbox_retention_days', 30) if retention_days is None else retention_days
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM submission_outbox WHERE status = ? AND updated_at < ?", (STATUS_SENT, cutoff)
+            )
+            conn.commit()
+            if cursor.rowcount:
+                logger.info(f"Đã xóa {cursor.rowcount} phần đã gửi quá {retention_days} ngày khỏi outbox")
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def count_by_status(self):
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM submission_outbox GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+
+class OutboxWorker:
+    """
+    Luồng nền gửi các phần đến hạn trong outbox (mới ghi, gửi lỗi chờ gửi lại, bị bỏ dở khi tắt chương trình).
+    Các phần được gửi song song tối đa max_in_flight request, lỗi được lùi lịch theo cấp số nhân.
+    Định kỳ xóa các phần đã gửi quá outbox_retention_days ngày.
+    """
+
+    def __init__(self, api_handler, outbox=None, poll_interval=None, max_in_flight=None):
+        self.api_handler = api_handler
+        self.outbox = outbox or SubmissionOutbox()
+        self.poll_interval = poll_interval or API_CONFIG.get('outbox_poll_interval', 5)
+        self.max_in_flight = max_in_flight or API_CONFIG.get('submit_max_in_flight', 8)
+        self.prune_interval = API_CONFIG.get('outbox_prune_interval', 3600)
+        self._last_prune = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+        self._thread.start()
+        logger.info("Khởi động luồng gửi outbox")
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Kiểm tra outbox ngay (ví dụ sau khi người vận hành chọn gửi lại)"""
+        self._wakeup.set()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while not self._stopped.is_set():
+                self._prune_if_due()
+                try:
+                    self.outbox.release_stale()
+                    items = self.outbox.claim_due(self.max_in_flight * 2)
+                except Exception as e:
+                    logger.error(f"Lỗi khi đọc outbox: {str(e)}")
+                    items = []
+                if items:
+                    logger.info(f"Gửi {len(items)} phần từ outbox")
+                    list(executor.map(self._send, items))
+                    continue
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _prune_if_due(self):
+        """Xóa các phần đã gửi quá hạn lưu giữ, tối đa một lần mỗi prune_interval giây"""
+        if self._last_prune is not None and time.monotonic() - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = time.monotonic()
+        try:
+            self.outbox.prune()
+        except Exception as e:
+            logger.error(f"Lỗi khi dọn outbox: {str(e)}")
+
+    def _send(self, item):
+        try:
+            # Gia hạn trước khi gửi: phần chờ lâu trong executor có thể đã bị nơi khác lấy lại
+            claimed_at = self.outbox.claim(item['batch_id'], item['chunk_index'], item['claimed_at'])
+            if claimed_at is None:
+                return
+            item['claimed_at'] = claimed_at
+        except Exception as e:
+            logger.error(f"Lỗi khi gia hạn phần {item['ma_yeu_cau']} trong outbox: {str(e)}")
+            return
+        try:
+            result = self.api_handler.send_chunk(
+                item['service_type'], json.loads(item['payload']), item['ma_yeu_cau'], item['ky_bao_cao']
+            )
+            self.outbox.mark_sent(item['batch_id'], item['chunk_index'], result, item['claimed_at'])
+        except Exception as e:
+            logger.error(f"Lỗi khi gửi phần {item['ma_yeu_cau']} từ outbox: {str(e)}")
+            try:
+                self.outbox.mark_failed(item['batch_id'], item['chunk_index'], e, item['claimed_at'],
+                                        getattr(e, 'retryable', True))
+            except Exception as db_error:
+                logger.error(f"Lỗi khi cập nhật outbox: {str(db_error)}")
@@ -0,0 +1,188 @@
+import threading
+import time
+from .local_config import API_CONFIG
+from .logger import Logger
+
+logger = Logger('rate_limiter')
+
+# Mã HTTP cho biết gateway đang quá tải, cần giảm tải
+OVERLOAD_STATUS = (429, 503, 504)
+
+
+class TokenBucket:
+    """Giới hạn tốc độ gửi: tối đa rate request/giây, cho phép dồn tối đa capacity request"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: Số request mỗi giây (<= 0 là không giới hạn)
+        :param capacity: Số request được gửi dồn khi bucket đầy, mặc định bằng rate
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Chờ tới khi được gửi một request
+        :return: True nếu lấy được lượt, False nếu quá timeout
+        """
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Tạm dừng cấp lượt trong seconds giây (gateway trả Retry-After)"""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Giới hạn số request đồng thời theo AIMD:
+    - Mỗi request thành công với độ trễ dưới latency_target tăng giới hạn thêm 1/limit
+      (tăng khoảng 1 sau mỗi lượt gửi đủ giới hạn hiện tại).
+    - Gateway quá tải (429/503/504, timeout) hoặc độ trễ vượt latency_target thì nhân giới hạn với backoff_ratio.
+      Các request bắt đầu trước lần giảm gần nhất không làm giảm thêm, nên một đợt lỗi chỉ giảm một lần.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=16, latency_target=10.0, backoff_ratio=0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.stats = {'requests': 0, 'overloads': 0, 'decreases': 0}
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self, timeout=None):
+        """
+        Chờ tới khi số request đang gửi nhỏ hơn giới hạn
+        :return: Thời điểm bắt đầu (truyền lại cho release)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Quá thời gian chờ lượt gửi")
+                self._condition.wait(remaining)
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started, overloaded=False):
+        """
+        Kết thúc một request và điều chỉnh giới hạn
+        :param started: Giá trị acquire() trả về
+        :param overloaded: True nếu gateway báo quá tải hoặc không phản hồi
+        """
+        now = time.monotonic()
+        congested = overloaded or now - started > self.latency_target
+        with self._condition:
+            self._in_flight -= 1
+            self.stats['requests'] += 1
+            if congested:
+                self.stats['overloads'] += 1
+                if started >= self._last_decrease:
+                    previous = self.limit
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+                    self.stats['decreases'] += 1
+                    logger.info(f"Gateway quá tải, giảm số request đồng thời {previous} -> {self.limit}")
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+
+
+class EndpointThrottle:
+    """
+    Giới hạn tốc độ (TokenBucket) và số request đồng thời (AdaptiveConcurrencyLimiter) cho một endpoint.
+    Mỗi endpoint (simo_001 ... simo_012) có một throttle dùng chung trong tiến trình.
+    """
+    _throttles = {}
+    _throttles_lock = threading.Lock()
+
+    def __init__(self, endpoint, rate, burst, initial_limit, min_limit, max_limit, latency_target):
+        self.endpoint = endpoint
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_limit, min_limit, max_limit, latency_target)
+
+    @classmethod
+    def get(cls, endpoint):
+        """Lấy throttle của endpoint, cấu hình theo API_CONFIG['rate_limits'][endpoint] nếu có"""
+        throttle = cls._throttles.get(endpoint)
+        if throttle is None:
+            with cls._throttles_lock:
+                throttle = cls._throttles.get(endpoint)
+                if throttle is None:
+                    overrides = API_CONFIG.get('rate_limits', {}).get(endpoint, {})
+                    throttle = cls(
+                        endpoint,
+                        rate=overrides.get('rate', API_CONFIG.get('rate_limit_per_second', 5)),
+                        burst=overrides.get('burst', API_CONFIG.get('rate_limit_burst', 10)),
+                        initial_limit=overrides.get('initial_concurrency', API_CONFIG.get('concurrency_initial', 4)),
+                        min_limit=overrides.get('min_concurrency', API_CONFIG.get('concurrency_min', 1)),
+                        max_limit=overrides.get('max_concurrency', API_CONFIG.get('concurrency_max', 8)),
+                        latency_target=overrides.get('latency_target', API_CONFIG.get('latency_target', 10))
+                    )
+                    cls._throttles[endpoint] = throttle
+        return throttle
+
+    @classmethod
+    def reset(cls):
+        """Bỏ các throttle hiện có (gọi sau khi đổi cấu hình)"""
+        with cls._throttles_lock:
+            cls._throttles.clear()
+
+    def acquire(self):
+        """Chờ lượt gửi theo tốc độ rồi theo số request đồng thời; trả về giá trị truyền cho release"""
+        self.bucket.acquire()
+        return self.concurrency.acquire()
+
+    def release(self, started, status_code=None, retry_after=None):
+        """
+        :param status_code: Mã HTTP nhận được, None nếu không nhận được phản hồi
+        :param retry_after: Số giây gateway yêu cầu chờ (header Retry-After)
+        """
+        overloaded = status_code is None or status_code in OVERLOAD_STATUS
+        if retry_after:
+            logger.info(f"{self.endpoint}: gateway yêu cầu chờ {retry_after} giây")
+            self.bucket.pause(retry_after)
+        self.concurrency.release(started, overloaded)
+
+
+def parse_retry_after(value):
+    """Đọc header Retry-After dạng số giây, bỏ qua dạng ngày giờ"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except (TypeError, ValueError):
+        return None
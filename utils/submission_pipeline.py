@@ -0,0 +1,210 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from .local_config import API_CONFIG
+from .logger import Logger
+
+logger = Logger('submission_pipeline')
+
+# Gateway đã từ chối dữ liệu của phần này, gửi lại cũng không thay đổi kết quả
+NON_RETRYABLE_STATUS = (400, 404)
+
+
+class SimoAPIError(Exception):
+    """Lỗi khi gửi dữ liệu tới SIMO, kèm mã HTTP (None nếu không nhận được phản hồi)"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self):
+        return self.status_code not in NON_RETRYABLE_STATUS
+
+
+class ChunkReclaimedError(Exception):
+    """Phần đã quá hạn giữ và được OutboxWorker lấy lại, pipeline không gửi phần này nữa"""
+    retryable = False
+
+
+def make_request_id(service_type, timestamp=None, index=None, batch_id=None):
+    """
+    Tạo mã yêu cầu (maYeuCau) theo định dạng {service_type}_TKTT_{ddmmYYYY.HHMMSS}_{mã lần gửi}
+    :param index: Số thứ tự phần (bắt đầu từ 0); có thì thêm hậu tố _0001, _0002, ...
+    :param batch_id: Mã lần gửi (uuid hex), mặc định tạo mới. Thời gian chỉ chính xác tới giây nên
+                     hai lần gửi trong cùng một giây được phân biệt bằng 8 ký tự đầu của mã này
+    """
+    current_time = (timestamp or datetime.now()).strftime("%d%m%Y.%H%M%S")
+    batch_id = batch_id or uuid.uuid4().hex
+    ma_yeu_cau = f"{service_type}_TKTT_{current_time}_{batch_id[:8]}"
+    if index is None:
+        return ma_yeu_cau
+    return f"{ma_yeu_cau}_{index + 1:04d}"
+
+
+def split_payload(payload, chunk_size):
+    """Chia danh sách bản ghi thành các phần tối đa chunk_size bản ghi"""
+    return [payload[start:start + chunk_size] for start in range(0, len(payload), chunk_size)]
+
+
+class SubmissionPipeline:
+    """
+    Gửi dữ liệu SIMO theo từng phần, nhiều phần song song (tối đa max_in_flight request cùng lúc).
+    - Mỗi phần có maYeuCau riêng; khi gửi lại vẫn giữ mã cũ để gateway nhận ra request trùng.
+    - Sau mỗi lượt chỉ gửi lại các phần bị lỗi, chờ tăng dần giữa các lượt.
+    - Kết quả trả về là tổng hợp trạng thái của từng phần.
+    - Nếu có outbox, các phần được ghi vào outbox trước khi gửi; phần còn lỗi sau các lượt gửi
+      được giao lại cho OutboxWorker gửi tiếp ở nền. Quyền gửi (claimed_at) được gia hạn ngay trước
+      mỗi lần gửi; phần chờ quá lâu đã bị OutboxWorker lấy lại thì pipeline bỏ qua, không gửi trùng.
+    """
+
+    def __init__(self, api_handler, chunk_size=None, max_in_flight=None, max_attempts=None, retry_delay=None,
+                 outbox=None):
+        """
+        :param api_handler: APIHandler dùng để gửi từng phần (send_chunk)
+        :param chunk_size: Số bản ghi mỗi phần
+        :param max_in_flight: Số luồng gửi tối đa; số request đồng thời thực tế do EndpointThrottle điều chỉnh
+        :param max_attempts: Số lần gửi tối đa cho mỗi phần
+        :param retry_delay: Thời gian chờ (giây) trước lượt gửi lại đầu tiên, nhân đôi sau mỗi lượt
+        :param outbox: SubmissionOutbox để ghi lại các phần trước khi gửi (None: không ghi)
+        """
+        self.api_handler = api_handler
+        self.chunk_size = chunk_size or API_CONFIG.get('submit_chunk_size', 1000)
+        self.max_in_flight = max_in_flight or API_CONFIG.get('submit_max_in_flight', 8)
+        self.max_attempts = max_attempts or API_CONFIG.get('submit_max_attempts', 3)
+        self.retry_delay = API_CONFIG.get('submit_retry_delay', 2) if retry_delay is None else retry_delay
+        self.outbox = outbox
+
+    def submit(self, service_type, payload, progress_callback=None):
+        """
+        Gửi toàn bộ payload
+        :param progress_callback: Hàm (số phần đã xong, tổng số phần) gọi sau mỗi phần hoàn tất
+        :return: dict tổng hợp kết quả, success=False nếu còn phần gửi không thành công
+        """
+        chunks = split_payload(payload, self.chunk_size)
+        now = datetime.now()
+        ky_bao_cao = now.strftime("%m/%Y")
+        batch_id = uuid.uuid4().hex
+        # Chỉ một phần thì giữ maYeuCau như khi gửi một request
+        states = [
+            {
+                'index': index,
+                'maYeuCau': make_request_id(service_type, now, index if len(chunks) > 1 else None, batch_id),
+                'records': len(chunk),
+                'status': 'pending',
+                'attempts': 0,
+                'result': None,
+                'error': None,
+                'retryable': True,
+                'claimed_at': None
+            }
+            for index, chunk in enumerate(chunks)
+        ]
+        outbox_batch_id = None
+        if self.outbox is not None:
+            claimed_at = time.time()
+            outbox_batch_id = self.outbox.enqueue(service_type, ky_bao_cao, chunks,
+                                                  [state['maYeuCau'] for state in states],
+                                                  claimed_at=claimed_at, batch_id=batch_id)
+            for state in states:
+                state['claimed_at'] = claimed_at
+        logger.info(f"Gửi {len(payload)} bản ghi {service_type} thành {len(chunks)} phần "
+                    f"(tối đa {self.max_in_flight} phần đồng thời)")
+
+        pending = list(range(len(chunks)))
+        done_count = [0]
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                delay = self.retry_delay * 2 ** (attempt - 2)
+                logger.info(f"Gửi lại {len(pending)} phần lỗi sau {delay} giây (lượt {attempt})")
+                time.sleep(delay)
+            self._run_round(service_type, chunks, states, pending, ky_bao_cao, batch_id, done_count,
+                            progress_callback)
+            pending = [i for i in pending if states[i]['status'] == 'failed' and states[i]['retryable']]
+            if not pending:
+                break
+
+        return self._summarize(service_type, now, states, batch_id, outbox_batch_id)
+
+    def _run_round(self, service_type, chunks, states, pending, ky_bao_cao, batch_id, done_count,
+                   progress_callback):
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(pending)) or 1) as executor:
+            futures = {
+                executor.submit(self._send, service_type, chunks[i], states[i], ky_bao_cao, batch_id): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                state = states[futures[future]]
+                state['attempts'] += 1
+                try:
+                    state['result'] = future.result()
+                    state['status'] = 'sent'
+                    state['error'] = None
+                    done_count[0] += 1
+                    self._record(self.outbox.mark_sent if self.outbox else None, batch_id, state['index'],
+                                 state['result'], state['claimed_at'])
+                except ChunkReclaimedError as e:
+                    state['status'] = 'failed'
+                    state['error'] = str(e)
+                    state['retryable'] = False
+                    done_count[0] += 1
+                    logger.warning(f"Phần {state['maYeuCau']} đã được outbox lấy lại để gửi ở nền")
+                except Exception as e:
+                    state['status'] = 'failed'
+                    state['error'] = str(e)
+                    state['retryable'] = getattr(e, 'retryable', True)
+                    logger.error(f"Lỗi khi gửi phần {state['maYeuCau']} (lần {state['attempts']}): {str(e)}")
+                    final = not state['retryable'] or state['attempts'] >= self.max_attempts
+                    if final:
+                        done_count[0] += 1
+                    # Lần lỗi cuối thì trả phần này cho outbox tự gửi lại ở nền
+                    self._record(self.outbox.mark_failed if self.outbox else None, batch_id, state['index'], e,
+                                 state['claimed_at'], state['retryable'], final)
+                if progress_callback:
+                    progress_callback(done_count[0], len(states))
+
+    def _send(self, service_type, chunk, state, ky_bao_cao, batch_id):
+        """Gửi một phần (chạy trong luồng gửi), gia hạn quyền gửi trong outbox ngay trước khi gửi"""
+        if self.outbox is not None:
+            try:
+                claimed_at = self.outbox.claim(batch_id, state['index'], state['claimed_at'])
+            except Exception as e:
+                # Lỗi đọc outbox không chặn việc gửi
+                logger.error(f"Lỗi khi gia hạn phần {state['maYeuCau']} trong outbox: {str(e)}")
+            else:
+                if claimed_at is None:
+                    raise ChunkReclaimedError(f"Phần {state['maYeuCau']} đã được chuyển cho outbox gửi ở nền")
+                state['claimed_at'] = claimed_at
+        return self.api_handler.send_chunk(service_type, chunk, state['maYeuCau'], ky_bao_cao)
+
+    def _record(self, method, *args):
+        if method is None:
+            return
+        try:
+            method(*args)
+        except Exception as e:
+            # Lỗi ghi outbox không làm thay đổi kết quả gửi
+            logger.error(f"Lỗi khi cập nhật outbox: {str(e)}")
+
+    def _summarize(self, service_type, timestamp, states, batch_id, outbox_batch_id=None):
+        failed = [state for state in states if state['status'] != 'sent']
+        summary = {
+            'maYeuCau': make_request_id(service_type, timestamp, batch_id=batch_id),
+            'batch_id': outbox_batch_id,
+            'success': not failed,
+            'total_chunks': len(states),
+            'sent_chunks': len(states) - len(failed),
+            'failed_chunks': len(failed),
+            'total_records': sum(state['records'] for state in states),
+            'sent_records': sum(state['records'] for state in states if state['status'] == 'sent'),
+            'chunks': [{key: value for key, value in state.items() if key not in ('retryable', 'claimed_at')}
+                       for state in states]
+        }
+        if failed:
+            logger.error(f"Còn {len(failed)}/{len(states)} phần {service_type} gửi không thành công: "
+                         f"{', '.join(state['maYeuCau'] for state in failed)}")
+        else:
+            logger.info(f"Đã gửi thành công {len(states)} phần {service_type} "
+                        f"({summary['total_records']} bản ghi)")
+        return summary
@@ -0,0 +1,181 @@
+import threading
+import time
+from .logger import Logger
+
+logger = Logger('token_manager')
+
+
+class _Flight:
+    """Một lượt lấy token đang chạy, các luồng khác chờ kết quả của lượt này"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.token = None
+        self.error = None
+
+
+class TokenManager:
+    """
+    Giữ access token và thời điểm hết hạn trong bộ nhớ.
+    - get_token() chỉ đọc bộ nhớ khi token còn hạn, không truy cập bảng token.
+    - Token được làm mới ở luồng nền trước khi hết hạn refresh_margin giây.
+    - Nhiều luồng cần token cùng lúc chỉ gây ra một lần gọi API lấy token (single-flight).
+    """
+
+    def __init__(self, fetch_token, load_token=None, refresh_margin=300, retry_interval=30, wait_timeout=30,
+                 default_lifetime=3600):
+        """
+        :param fetch_token: Hàm lấy token mới từ API, trả về (access_token, expires_in giây)
+        :param load_token: Hàm đọc token đã lưu, trả về (access_token, số giây còn lại) hoặc None.
+                           Chỉ được gọi một lần khi chưa có token trong bộ nhớ.
+        :param refresh_margin: Làm mới token trước khi hết hạn bao nhiêu giây
+        :param retry_interval: Thời gian chờ (giây) trước khi thử làm mới lại nếu lần làm mới nền bị lỗi
+        :param wait_timeout: Thời gian tối đa (giây) chờ lượt lấy token đang chạy
+        :param default_lifetime: Thời hạn (giây) dùng khi API không trả expires_in hoặc expires_in không dương
+        """
+        self._fetch_token = fetch_token
+        self._load_token = load_token
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.wait_timeout = wait_timeout
+        self.default_lifetime = default_lifetime
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._state = None  # (access_token, expires_at, refresh_at) theo time.monotonic()
+        self._flight = None
+        self._timer = None
+        self._loaded = load_token is None
+        self._stopped = False
+
+        self.stats = {'hits': 0, 'refreshes': 0, 'background_refreshes': 0, 'waits': 0, 'errors': 0}
+
+    def get_token(self):
+        """Lấy token còn hạn; chỉ chặn khi chưa có token hoặc token đã hết hạn"""
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now < state[1]:
+            self.stats['hits'] += 1
+            if now >= state[2]:
+                self._start_flight(wait=False)
+            return state[0]
+
+        if not self._loaded:
+            self._load_saved_token()
+            state = self._state
+            if state is not None and time.monotonic() < state[1]:
+                return state[0]
+
+        return self._start_flight(wait=True)
+
+    def invalidate(self, token=None):
+        """Bỏ token hiện tại (ví dụ khi API trả 401); nếu truyền token thì chỉ bỏ khi trùng"""
+        with self._lock:
+            if self._state is not None and (token is None or self._state[0] == token):
+                self._state = None
+                logger.info("Đã hủy token trong bộ nhớ")
+
+    def stop(self):
+        """Dừng làm mới token ở nền"""
+        with self._lock:
+            self._stopped = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _load_saved_token(self):
+        # Các luồng khác chờ lần đọc này xong rồi mới quyết định có cần lấy token mới hay không
+        with self._load_lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                saved = self._load_token()
+            except Exception as e:
+                logger.warning(f"Không đọc được token đã lưu: {str(e)}")
+                return
+            if saved:
+                access_token, remaining = saved
+                if remaining > 0:
+                    self._set_token(access_token, remaining)
+                    logger.info(f"Dùng token đã lưu (còn {int(remaining)} giây)")
+
+    def _lifetime(self, expires_in):
+        """Thời hạn token (giây); expires_in thiếu hoặc không dương thì dùng default_lifetime"""
+        try:
+            expires_in = int(expires_in)
+        except (TypeError, ValueError):
+            expires_in = 0
+        if expires_in <= 0:
+            logger.warning(f"Token không có thời hạn hợp lệ, dùng mặc định {self.default_lifetime} giây")
+            return self.default_lifetime
+        return expires_in
+
+    def _set_token(self, access_token, expires_in):
+        now = time.monotonic()
+        expires_at = now + expires_in
+        # Token có thời hạn ngắn thì làm mới khi đã dùng được một nửa thời gian, nhưng không sớm hơn
+        # retry_interval giây để không lấy token liên tục
+        refresh_at = max(expires_at - min(self.refresh_margin, expires_in / 2), now + self.retry_interval)
+        with self._lock:
+            self._state = (access_token, expires_at, refresh_at)
+        self._schedule(refresh_at - now)
+
+    def _schedule(self, delay):
+        with self._lock:
+            if self._stopped:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(max(delay, 0), self._start_flight, kwargs={'wait': False})
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _start_flight(self, wait):
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        if leader:
+            if wait:
+                self._run_flight(flight)
+            else:
+                self.stats['background_refreshes'] += 1
+                threading.Thread(target=self._run_flight, args=(flight,), daemon=True).start()
+        elif wait:
+            self.stats['waits'] += 1
+
+        if not wait:
+            return None
+        if not flight.done.wait(self.wait_timeout):
+            raise TimeoutError(f"Quá {self.wait_timeout} giây chờ lấy token")
+        if flight.error is not None:
+            raise flight.error
+        return flight.token
+
+    def _run_flight(self, flight):
+        try:
+            access_token, expires_in = self._fetch_token()
+            self.stats['refreshes'] += 1
+            self._set_token(access_token, self._lifetime(expires_in))
+            flight.token = access_token
+        except Exception as e:
+            self.stats['errors'] += 1
+            flight.error = e
+            logger.error(f"Lỗi khi làm mới token: {str(e)}")
+            # Token cũ còn hạn thì lùi lần làm mới tiếp theo, hết hạn thì lần get_token tiếp theo sẽ lấy lại
+            now = time.monotonic()
+            with self._lock:
+                state = self._state
+                if state is not None and now < state[1]:
+                    self._state = (state[0], state[1], min(state[1], now + self.retry_interval))
+                else:
+                    state = None
+            if state is not None:
+                self._schedule(self.retry_interval)
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
@@ -0,0 +1,204 @@
+import tkinter as tk
+from tkinter import ttk
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.local_config import API_CONFIG
+from utils.logger import Logger
+
+logger = Logger('background_tasks')
+
+
+class BackgroundTask:
+    """
+    Một công việc chạy ở luồng nền. Hàm công việc nhận đối tượng này để kiểm tra
+    đã bị hủy hay chưa và báo tiến độ về giao diện.
+    """
+
+    def __init__(self, runner, key, quiet=False):
+        self.runner = runner
+        self.key = key
+        self.quiet = quiet
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Đánh dấu hủy; kết quả (nếu có) sẽ bị bỏ qua"""
+        self.cancel_event.set()
+
+    def report_progress(self, value, text=None):
+        """Gửi tiến độ về luồng giao diện (gọi từ luồng nền)"""
+        if not self.cancelled:
+            self.runner.events.put(('progress', self, (value, text)))
+
+
+class BackgroundTaskRunner:
+    """
+    Chạy các thao tác chặn (truy vấn pyodbc, đọc openpyxl) trong pool luồng dùng chung và
+    trả kết quả về luồng Tk qua hàng đợi được đọc bằng widget.after.
+
+    Mỗi công việc có một khóa (ví dụ 'page', 'count'). Gửi công việc mới cùng khóa sẽ hủy
+    công việc cũ: nếu chưa chạy thì bỏ qua, nếu đang chạy thì kết quả bị bỏ đi, nên khi
+    chuyển trang nhanh chỉ trang cuối cùng được hiển thị.
+    """
+    # Pool dùng chung cho mọi tab
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, widget, indicator=None, poll_interval=50):
+        """
+        :param widget: Widget Tk dùng để lập lịch đọc hàng đợi kết quả
+        :param indicator: ProgressIndicator hiển thị khi có công việc đang chạy
+        :param poll_interval: Chu kỳ đọc hàng đợi (ms)
+        """
+        self.widget = widget
+        self.indicator = indicator
+        self.poll_interval = poll_interval
+        self.events = queue.Queue()
+        self.tasks = {}
+        self.callbacks = {}
+        self._polling = False
+
+    @classmethod
+    def get_executor(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=API_CONFIG.get('ui_task_workers', 4),
+                    thread_name_prefix='ui-task'
+                )
+            return cls._executor
+
+    def submit(self, key, func, on_success=None, on_error=None, on_progress=None, message=None, quiet=False):
+        """
+        Chạy func(task) ở luồng nền, hủy công việc cùng khóa đang chờ
+        :param key: Khóa công việc
+        :param func: Hàm nhận BackgroundTask, giá trị trả về được chuyển cho on_success
+        :param on_success: Gọi trên luồng Tk với kết quả
+        :param on_error: Gọi trên luồng Tk với exception (mặc định chỉ ghi log)
+        :param on_progress: Gọi trên luồng Tk với (value, text) từ task.report_progress
+        :param message: Nội dung hiển thị trên ProgressIndicator
+        :param quiet: Không hiện ProgressIndicator (ví dụ khi tải trước dữ liệu)
+        :return: BackgroundTask
+        """
+        self.cancel(key)
+        task = BackgroundTask(self, key, quiet=quiet)
+        self.tasks[key] = task
+        self.callbacks[task] = (on_success, on_error, on_progress)
+        if self.indicator is not None and not quiet:
+            self.indicator.start(message)
+        self.get_executor().submit(self._run, task, func)
+        self._schedule_poll()
+        return task
+
+    def cancel(self, key=None):
+        """Hủy công việc theo khóa, hoặc tất cả nếu không truyền khóa"""
+        keys = list(self.tasks) if key is None else [key]
+        for task_key in keys:
+            task = self.tasks.pop(task_key, None)
+            if task is not None:
+                task.cancel()
+                self.callbacks.pop(task, None)
+        self._update_indicator()
+
+    def is_running(self, key):
+        return key in self.tasks
+
+    def _run(self, task, func):
+        # Công việc đã bị thay thế trước khi tới lượt chạy thì không cần truy vấn nữa
+        if task.cancelled:
+            return
+        try:
+            result = func(task)
+            self.events.put(('done', task, result))
+        except Exception as e:
+            self.events.put(('error', task, e))
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """Đọc kết quả từ luồng nền và gọi callback trên luồng Tk"""
+        try:
+            while True:
+                kind, task, payload = self.events.get_nowait()
+                self._dispatch(kind, task, payload)
+        except queue.Empty:
+            pass
+        self._polling = False
+        if self.tasks:
+            self._schedule_poll()
+
+    def _dispatch(self, kind, task, payload):
+        callbacks = self.callbacks.get(task)
+        if callbacks is None or task.cancelled:
+            return
+        on_success, on_error, on_progress = callbacks
+
+        if kind == 'progress':
+            value, text = payload
+            if self.indicator is not None and text and not task.quiet:
+                self.indicator.set_message(text)
+            if on_progress:
+                on_progress(value, text)
+            return
+
+        # Công việc đã xong: bỏ khỏi danh sách trước khi gọi callback để callback có thể gửi công việc mới
+        self.callbacks.pop(task, None)
+        if self.tasks.get(task.key) is task:
+            del self.tasks[task.key]
+        self._update_indicator()
+
+        try:
+            if kind == 'done':
+                if on_success:
+                    on_success(payload)
+            elif on_error:
+                on_error(payload)
+            else:
+                logger.error(f"Lỗi khi chạy công việc nền {task.key}: {str(payload)}")
+        except Exception as e:
+            logger.error(f"Lỗi khi xử lý kết quả công việc nền {task.key}: {str(e)}")
+
+    def _update_indicator(self):
+        if self.indicator is not None and all(task.quiet for task in self.tasks.values()):
+            self.indicator.stop()
+
+
+class ProgressIndicator:
+    """Thanh tiến độ nhỏ kèm dòng trạng thái, chỉ hiện khi tab đang tải dữ liệu"""
+
+    def __init__(self, parent, default_message="Đang tải dữ liệu..."):
+        self.default_message = default_message
+        self.frame = ttk.Frame(parent)
+        self.progress = ttk.Progressbar(self.frame, mode='indeterminate', length=120)
+        self.label = ttk.Label(self.frame, text="", foreground='#555555')
+        self.label.pack(side=tk.RIGHT, padx=5)
+        self.active = False
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def start(self, message=None):
+        """Hiển thị trạng thái đang tải"""
+        self.label.config(text=message or self.default_message)
+        if not self.active:
+            self.active = True
+            self.progress.pack(side=tk.RIGHT, padx=5)
+            self.progress.start(10)
+
+    def set_message(self, message):
+        self.label.config(text=message)
+
+    def stop(self):
+        """Ẩn thanh tiến độ khi không còn công việc nào"""
+        if self.active:
+            self.active = False
+            self.progress.stop()
+            self.progress.pack_forget()
+        self.label.config(text="")
@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
 import os
 from utils.logger import Logger
+from utils.json_serializer import SerializedPayload, loads
+from views.background_tasks import BackgroundTaskRunner, ProgressIndicator
+from views.virtual_table import VirtualTable
 from openpyxl import load_workbook
 
 logger = Logger('excel_tab')
@@ -12,6 +14,8 @@ class ExcelTab:
         self.parent = parent
         self.api_handler = api_handler
         self.simo_converter = simo_converter
+        # Kết quả chuyển đổi đang hiển thị, dùng lại khi lưu/gửi nếu người dùng chưa sửa JSON
+        self.serialized = None
         
         # Frame chính
         self.excel_tab = ttk.Frame(parent)
@@ -66,6 +70,11 @@ class ExcelTab:
                             command=self.save_json, style='Info.TButton')
         save_btn.pack(side=tk.LEFT, padx=5)
         
+        # Đọc và chuyển đổi file Excel ở luồng nền để giao diện không bị treo
+        self.indicator = ProgressIndicator(button_frame, default_message="Đang đọc file Excel...")
+        self.indicator.pack(side=tk.RIGHT, padx=5)
+        self.tasks = BackgroundTaskRunner(self.excel_tab, self.indicator)
+        
         # Paned window để chia màn hình thành 2 phần
         self.paned = ttk.PanedWindow(self.excel_tab, orient=tk.HORIZONTAL)
         self.paned.pack(fill=tk.BOTH, expand=True)
@@ -74,27 +83,9 @@ class ExcelTab:
         excel_frame = ttk.LabelFrame(self.paned, text="Nội dung Excel", padding="10")
         self.paned.add(excel_frame, weight=1)
         
-        # Tạo frame chứa Treeview và scrollbar cho Excel
-        excel_container = ttk.Frame(excel_frame)
-        excel_container.pack(fill=tk.BOTH, expand=True)
-        
-        # Create Excel Treeview with scrollbars
-        self.excel_tree = ttk.Treeview(excel_container, show="headings", style='Treeview')
-        
-        # Tạo scrollbars cho Excel
-        excel_scroll_y = ttk.Scrollbar(excel_container, orient=tk.VERTICAL, 
-                                     command=self.excel_tree.yview)
-        excel_scroll_x = ttk.Scrollbar(excel_frame, orient=tk.HORIZONTAL, 
-                                     command=self.excel_tree.xview)
-        
-        # Cấu hình scrollbar cho Excel
-        self.excel_tree.configure(yscrollcommand=excel_scroll_y.set,
-                                xscrollcommand=excel_scroll_x.set)
-        
-        # Pack Excel components
-        excel_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.excel_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        excel_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+        # Bảng ảo cho Excel: file lớn chỉ tạo item cho các dòng đang nhìn thấy
+        self.excel_table = VirtualTable(excel_frame)
+        self.excel_table.pack(fill=tk.BOTH, expand=True)
         
         # JSON display frame (right side)
         json_frame = ttk.LabelFrame(self.paned, text="Nội dung JSON", padding="10")
@@ -133,33 +124,48 @@ class ExcelTab:
             self.load_excel_data(file_path)
             
     def load_excel_data(self, file_path):
+        """Đọc file Excel ở luồng nền và hiển thị khi xong; chọn file khác sẽ hủy lần đọc trước"""
+        self.tasks.submit('load', lambda task: self.read_excel_rows(task, file_path),
+                          on_success=lambda result: self.show_excel_data(file_path, *result),
+                          on_error=self.on_load_error)
+    
+    @staticmethod
+    def read_excel_rows(task, file_path, progress_every=5000):
+        """
+        Đọc headers và các dòng của sheet đầu tiên (chạy ở luồng nền)
+        :return: tuple (headers, rows) với giá trị gốc của từng ô
+        """
+        # Đọc ở chế độ read-only để không nạp toàn bộ file vào bộ nhớ
+        wb = load_workbook(file_path, read_only=True, data_only=True)
         try:
-            wb = load_workbook(file_path, data_only=True)
             ws = wb.active
-            
-            # Xóa dữ liệu cũ trong Treeview
-            self.excel_tree.delete(*self.excel_tree.get_children())
+            rows = ws.iter_rows(values_only=True)
             
             # Lấy headers từ dòng đầu tiên
-            headers = [str(cell.value).strip() for cell in ws[1]]
-            self.excel_tree["columns"] = headers
-            
-            # Định dạng các cột
-            for header in headers:
-                self.excel_tree.heading(header, text=header)
-                self.excel_tree.column(header, width=100)
+            headers = [str(value).strip() for value in next(rows, ())]
             
-            # Thêm dữ liệu vào Treeview
-            for row in ws.iter_rows(min_row=2):
-                values = [str(cell.value) if cell.value is not None else "" for cell in row]
-                self.excel_tree.insert("", tk.END, values=values)
-                
-            logger.info(f"Đã tải dữ liệu từ file: {file_path}")
-            messagebox.showinfo("Thành công", "Đã tải dữ liệu Excel!")
+            data = []
+            for row in rows:
+                if task.cancelled:
+                    break
+                data.append(row)
+                if len(data) % progress_every == 0:
+                    task.report_progress(len(data), f"Đã đọc {len(data):,} dòng...")
+            return headers, data
+        finally:
+            wb.close()
+    
+    def show_excel_data(self, file_path, headers, rows):
+        """Hiển thị dữ liệu Excel đã đọc (chạy trên luồng giao diện)"""
+        # Giá trị hiển thị được tạo khi dòng được cuộn tới
+        self.excel_table.set_data(headers, rows)
             
-        except Exception as e:
-            logger.error(f"Lỗi khi đọc file Excel: {str(e)}")
-            messagebox.showerror("Lỗi", f"Không thể đọc file Excel: {str(e)}")
+        logger.info(f"Đã tải dữ liệu từ file: {file_path}")
+        messagebox.showinfo("Thành công", "Đã tải dữ liệu Excel!")
+    
+    def on_load_error(self, error):
+        logger.error(f"Lỗi khi đọc file Excel: {str(error)}")
+        messagebox.showerror("Lỗi", f"Không thể đọc file Excel: {str(error)}")
     
     def convert_excel(self):
         file_path = self.entry_file.get()
@@ -169,25 +175,39 @@ class ExcelTab:
             messagebox.showwarning("Cảnh báo", "Vui lòng chọn file Excel hợp lệ!")
             return
             
-        try:
-            # Chuyển đổi Excel sang JSON
+        def convert(task):
             data = self.simo_converter.convert_excel_to_json(file_path, service_type)
+            # Serialize và giải mã chuỗi hiển thị ngay ở luồng nền, luồng giao diện chỉ chèn text
+            serialized = SerializedPayload(data)
+            serialized.text
+            return serialized
             
+        def on_success(serialized):
             # Hiển thị JSON
-            json_str = json.dumps(data, ensure_ascii=False, indent=2)
+            self.serialized = serialized
             self.json_text.delete(1.0, tk.END)
-            self.json_text.insert(tk.END, json_str)
+            self.json_text.insert(tk.END, self.serialized.text)
+            self.json_text.edit_modified(False)
             
             logger.info(f"Đã chuyển đổi dữ liệu từ {file_path} sang JSON")
             messagebox.showinfo("Thành công", "Đã chuyển đổi dữ liệu thành công!")
             
-        except Exception as e:
-            logger.error(f"Lỗi khi chuyển đổi dữ liệu: {str(e)}")
-            messagebox.showerror("Lỗi", f"Lỗi khi chuyển đổi dữ liệu: {str(e)}")
+        def on_error(error):
+            logger.error(f"Lỗi khi chuyển đổi dữ liệu: {str(error)}")
+            messagebox.showerror("Lỗi", f"Lỗi khi chuyển đổi dữ liệu: {str(error)}")
+            
+        # Chuyển đổi Excel sang JSON ở luồng nền
+        self.tasks.submit('convert', convert, on_success=on_success, on_error=on_error,
+                          message="Đang chuyển đổi sang JSON...")
+    
+    def is_json_unchanged(self):
+        """Nội dung đang hiển thị vẫn là kết quả chuyển đổi (người dùng chưa sửa)"""
+        return self.serialized is not None and not self.json_text.edit_modified()
     
     def save_json(self):
-        json_content = self.json_text.get(1.0, tk.END).strip()
-        if not json_content:
+        unchanged = self.is_json_unchanged()
+        json_content = "" if unchanged else self.json_text.get(1.0, tk.END).strip()
+        if not unchanged and not json_content:
             messagebox.showwarning("Cảnh báo", "Không có dữ liệu JSON để lưu!")
             return
             
@@ -198,8 +218,12 @@ class ExcelTab:
                 initialfile=f"payload_{self.service_var.get()}.json"
             )
             if file_path:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(json_content)
+                if unchanged:
+                    # Ghi thẳng bytes đã serialize, không lấy lại chuỗi từ Text widget
+                    self.serialized.save(file_path)
+                else:
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write(json_content)
                 logger.info(f"Đã lưu JSON vào file: {file_path}")
                 messagebox.showinfo("Thành công", f"Đã lưu file JSON tại: {file_path}")
         except Exception as e:
@@ -208,13 +232,16 @@ class ExcelTab:
     
     def send_data(self):
         try:
-            json_content = self.json_text.get(1.0, tk.END).strip()
-            if not json_content:
-                messagebox.showwarning("Cảnh báo", "Không có dữ liệu JSON để gửi!")
-                return
-                
             service_type = self.service_var.get()
-            payload = json.loads(json_content)
+            if self.is_json_unchanged():
+                # Gửi dữ liệu đã chuyển đổi, không parse lại JSON đang hiển thị
+                payload = self.serialized.data
+            else:
+                json_content = self.json_text.get(1.0, tk.END).strip()
+                if not json_content:
+                    messagebox.showwarning("Cảnh báo", "Không có dữ liệu JSON để gửi!")
+                    return
+                payload = loads(json_content)
             
             # Gửi dữ liệu qua API
             result = self.api_handler.send_data(service_type, payload)
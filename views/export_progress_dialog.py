@@ -0,0 +1,92 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import queue
+import threading
+from utils.export_engine import StreamingExporter
+from utils.logger import Logger
+
+logger = Logger('export_progress_dialog')
+
+class ExportProgressDialog:
+    """Dialog chạy xuất dữ liệu ở luồng nền, hiển thị tiến độ và cho phép hủy"""
+
+    def __init__(self, parent, rows_factory, file_path, total_hint=None):
+        """
+        :param rows_factory: Hàm trả về iterable các dòng cần xuất (được gọi ở luồng nền)
+        :param total_hint: Tổng số dòng dự kiến để hiển thị tiến độ (có thể là ước lượng)
+        """
+        self.file_path = file_path
+        self.total_hint = total_hint
+        self.cancel_event = threading.Event()
+        self.events = queue.Queue()
+
+        self.top = tk.Toplevel(parent)
+        self.top.title("Xuất dữ liệu")
+        self.top.geometry("420x150")
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        main_frame = ttk.Frame(self.top, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.status_label = ttk.Label(main_frame, text="Đang chuẩn bị dữ liệu...")
+        self.status_label.pack(fill=tk.X, pady=5)
+
+        mode = 'determinate' if total_hint else 'indeterminate'
+        self.progress = ttk.Progressbar(main_frame, mode=mode, maximum=total_hint or 100)
+        self.progress.pack(fill=tk.X, pady=5)
+        if not total_hint:
+            self.progress.start(10)
+
+        self.cancel_btn = ttk.Button(main_frame, text="Hủy", command=self.cancel)
+        self.cancel_btn.pack(pady=5)
+
+        exporter = StreamingExporter(
+            progress_callback=lambda written: self.events.put(('progress', written)),
+            cancel_event=self.cancel_event
+        )
+
+        def run():
+            try:
+                result = exporter.export(rows_factory(), file_path)
+                self.events.put(('done', result))
+            except Exception as e:
+                logger.error(f"Lỗi khi xuất dữ liệu: {str(e)}")
+                self.events.put(('error', e))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.top.after(100, self.poll)
+
+    def cancel(self):
+        """Yêu cầu dừng xuất dữ liệu"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state='disabled')
+        self.status_label.config(text="Đang hủy...")
+
+    def poll(self):
+        """Đọc tiến độ từ luồng nền và cập nhật giao diện"""
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind == 'progress':
+                    total_text = f" / ~{self.total_hint:,}" if self.total_hint else ""
+                    self.status_label.config(text=f"Đã ghi {payload:,}{total_text} dòng")
+                    if self.total_hint:
+                        self.progress['value'] = min(payload, self.total_hint)
+                elif kind == 'done':
+                    self.top.destroy()
+                    if payload['cancelled']:
+                        messagebox.showinfo("Đã hủy", "Đã hủy xuất dữ liệu.")
+                    else:
+                        messagebox.showinfo(
+                            "Thành công",
+                            f"Đã xuất {payload['rows']:,} dòng ra file:\n{self.file_path}\n\n"
+                            f"Thời gian: {payload['elapsed']:.1f}s ({payload['rows_per_second']:,.0f} dòng/giây)"
+                        )
+                    return
+                elif kind == 'error':
+                    self.top.destroy()
+                    messagebox.showerror("Lỗi", f"Không thể xuất dữ liệu: {str(payload)}")
+                    return
+        except queue.Empty:
+            pass
+        self.top.after(100, self.poll)
@@ -3,13 +3,16 @@ from tkinter import ttk, messagebox, filedialog
 import json
 from datetime import datetime
 from utils.logger import Logger
-from openpyxl import Workbook
 from views.detail_dialog import DetailDialog
 from views.preview_dialog import PreviewDialog
+from views.virtual_table import VirtualTable
+from views.paginated_tab import PaginatedTabMixin
+from utils.export_engine import StreamingExporter
+from models.tktt_model import TKTTModel, FRAUD_SELECT_COLUMNS
 
 logger = Logger('fraud_detection_tab')
 
-class FraudDetectionTab:
+class FraudDetectionTab(PaginatedTabMixin):
     # Định nghĩa các trạng thái nghi ngờ gian lận
     SUSPICION_TYPES = {
         0: "Không nghi ngờ gian lận",
@@ -36,11 +39,8 @@ class FraudDetectionTab:
         self.fraud_top_frame = ttk.Frame(self.fraud_detection_tab)
         self.fraud_top_frame.pack(fill=tk.X, pady=(0, 20))
         
-        # Biến cho phân trang
-        self.current_page = 1
-        self.rows_per_page = 100
-        self.total_records = 0
-        self.total_pages = 0
+        # Phân trang keyset và điều kiện tìm kiếm hiện tại
+        self.init_pagination(TKTTModel(db_handler), FRAUD_SELECT_COLUMNS)
         
         # Biến lưu trạng thái nghi ngờ đã chọn
         self.selected_suspicion_type = tk.IntVar(value=0)
@@ -49,17 +49,8 @@ class FraudDetectionTab:
         # Tạo giao diện
         self.create_fraud_detection_section()
         
-        # Add pagination frame
-        self.pagination_frame = ttk.Frame(self.fraud_top_frame)
-        self.pagination_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(self.pagination_frame, text="<<", command=self.prev_page).pack(side=tk.LEFT, padx=2)
-        self.page_label = ttk.Label(self.pagination_frame, text="Page 1")
-        self.page_label.pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.pagination_frame, text=">>", command=self.next_page).pack(side=tk.LEFT, padx=2)
-        
-        self.total_label = ttk.Label(self.pagination_frame, text="Total: 0 records")
-        self.total_label.pack(side=tk.LEFT, padx=20)
+        # Thanh phân trang
+        self.create_pagination_bar(self.fraud_top_frame, self.fraud_detection_tab, self.fraud_table)
         
     def get_tab_frame(self):
         return self.fraud_detection_tab
@@ -178,27 +169,12 @@ class FraudDetectionTab:
         self.fraud_display_frame = ttk.Frame(self.fraud_detection_tab)
         self.fraud_display_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # Tạo Treeview với scrollbar
-        self.fraud_tree = ttk.Treeview(self.fraud_display_frame, show="headings", 
-                                   selectmode='extended', style='Treeview')
-
-        # Tạo scrollbar
-        fraud_scroll_y = ttk.Scrollbar(self.fraud_display_frame, orient=tk.VERTICAL,
-                                   command=self.fraud_tree.yview)
-        fraud_scroll_x = ttk.Scrollbar(self.fraud_display_frame, orient=tk.HORIZONTAL,
-                                   command=self.fraud_tree.xview)
-
-        # Cấu hình scrollbar
-        self.fraud_tree.configure(yscrollcommand=fraud_scroll_y.set,
-                              xscrollcommand=fraud_scroll_x.set)
-
-        # Pack các components
-        fraud_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        fraud_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.fraud_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Bảng ảo: chỉ tạo item cho các dòng đang nhìn thấy, sắp xếp khi bấm tiêu đề cột
+        self.fraud_table = VirtualTable(self.fraud_display_frame, selectmode='extended')
+        self.fraud_table.pack(fill=tk.BOTH, expand=True)
 
         # Bind double click event để xem chi tiết
-        self.fraud_tree.bind("<Double-1>", self.show_detail_dialog)
+        self.fraud_table.bind("<Double-1>", self.show_detail_dialog)
     
     def on_suspicion_changed(self):
         """Xử lý khi thay đổi loại nghi ngờ"""
@@ -212,8 +188,8 @@ class FraudDetectionTab:
             
     def update_suspicion_status(self):
         """Cập nhật trạng thái nghi ngờ cho các mục đã chọn"""
-        selected_items = self.fraud_tree.selection()
-        if not selected_items:
+        selected_rows = self.fraud_table.get_selected_rows()
+        if not selected_rows:
             messagebox.showwarning("Chưa chọn dữ liệu", "Vui lòng chọn ít nhất một mục để cập nhật trạng thái.")
             return
             
@@ -224,214 +200,97 @@ class FraudDetectionTab:
             messagebox.showwarning("Thiếu thông tin", "Vui lòng nhập ghi chú cho dấu hiệu khác.")
             return
             
+        # Không hủy lần cập nhật đang chạy vì thay đổi vẫn được ghi vào database
+        if self.tasks.is_running('update'):
+            messagebox.showwarning("Đang cập nhật", "Vui lòng chờ lần cập nhật trước hoàn tất.")
+            return
+            
         try:
-            for item in selected_items:
-                item_values = self.fraud_tree.item(item)["values"]
-                columns = self.fraud_tree["columns"]
-                cif_idx = columns.index("Cif") if "Cif" in columns else -1
-                so_tai_khoan_idx = columns.index("SoTaiKhoan") if "SoTaiKhoan" in columns else -1
+            columns = self.fraud_table.columns
+            if "Cif" not in columns or "SoTaiKhoan" not in columns:
+                messagebox.showwarning("Thiếu thông tin", "Dữ liệu hiển thị không có cột Cif hoặc SoTaiKhoan.")
+                return
                 
-                if cif_idx >= 0 and so_tai_khoan_idx >= 0:
-                    cif = item_values[cif_idx]
-                    so_tai_khoan = item_values[so_tai_khoan_idx]
-                    
-                    # Cập nhật vào database
-                    query = """
-                        UPDATE TKTT 
-                        SET NghiNgo = ?, GhiChu = ?, UpdateDate = GETDATE()
-                        WHERE Cif = ? AND SoTaiKhoan = ?
-                    """
-                    self.db_handler.execute_query(query, params=(suspicion_type, note, cif, so_tai_khoan), 
-                                              fetchall=False)
-            
-            # Làm mới dữ liệu
-            self.refresh_data()
-            messagebox.showinfo("Thành công", f"Đã cập nhật trạng thái nghi ngờ cho {len(selected_items)} mục.")
+            # Lấy khóa tài khoản dưới dạng chuỗi để giữ nguyên các số 0 ở đầu
+            cif_index = columns.index("Cif")
+            account_index = columns.index("SoTaiKhoan")
+            account_keys = [(str(row[cif_index]), str(row[account_index])) for row in selected_rows]
             
         except Exception as e:
             logger.error(f"Lỗi khi cập nhật trạng thái nghi ngờ: {str(e)}")
             messagebox.showerror("Lỗi", f"Không thể cập nhật trạng thái: {str(e)}")
+            return
+            
+        def on_success(outcomes):
+            updated_count = sum(1 for updated in outcomes if updated)
+            not_found = [f"{cif} - {so_tai_khoan}"
+                         for (cif, so_tai_khoan), updated in zip(account_keys, outcomes) if not updated]
+            
+            # Làm mới dữ liệu
+            self.refresh_data()
+            message = f"Đã cập nhật trạng thái nghi ngờ cho {updated_count}/{len(selected_rows)} mục."
+            if not_found:
+                logger.warning(f"Không tìm thấy {len(not_found)} tài khoản khi cập nhật trạng thái nghi ngờ")
+                message += f"\n\nKhông tìm thấy {len(not_found)} tài khoản:\n" + "\n".join(not_found[:10])
+                if len(not_found) > 10:
+                    message += "\n..."
+            messagebox.showinfo("Thành công", message)
+            
+        def on_error(error):
+            logger.error(f"Lỗi khi cập nhật trạng thái nghi ngờ: {str(error)}")
+            messagebox.showerror("Lỗi", f"Không thể cập nhật trạng thái: {str(error)}")
+            
+        # Cập nhật vào database trong một transaction ở luồng nền
+        self.tasks.submit('update',
+                          lambda task: self.model.update_suspicion_bulk(account_keys, suspicion_type, note),
+                          on_success=on_success, on_error=on_error,
+                          message=f"Đang cập nhật {len(account_keys)} mục...")
     
     def refresh_data(self):
         """Làm mới dữ liệu"""
-        self.fraud_tree.delete(*self.fraud_tree.get_children())
+        self.invalidate_page_data()
         self.fetch_data()
 
     def fetch_data(self):
-        """Đọc và hiển thị dữ liệu từ bảng TKTT với phân trang"""
-        try:
-            # Get total records first
-            count_query = "SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'"
-            total = self.db_handler.execute_query(count_query, fetchall=False)[0]
-            self.total_records = total
-            self.total_pages = (total + self.rows_per_page - 1) // self.rows_per_page
-            
-            # Calculate offset
-            offset = (self.current_page - 1) * self.rows_per_page
-            
-            query = f"""
-                SELECT 
-                    CAST(Cif AS VARCHAR(36)) AS Cif,
-                    CAST(Soid AS VARCHAR(15)) AS Soid,
-                    CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang,
-                    CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
-                    CAST(TrangThaiHoatDongTaiKhoan AS INT) AS TrangThaiHoatDongTaiKhoan,
-                    CAST(NghiNgo AS INT) AS NghiNgo,
-                    CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
-                    CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate
-                FROM TKTT 
-                WHERE LoaiKhachHang = N'Ca Nhan'
-                ORDER BY UpdateDate DESC
-                OFFSET ? ROWS
-                FETCH NEXT ? ROWS ONLY
-            """
-            
-            rows = self.db_handler.execute_query(query, params=(offset, self.rows_per_page))
-            
-            # Clear existing data
-            self.fraud_tree.delete(*self.fraud_tree.get_children())
-            
-            # Get column names
-            columns = [column[0] for column in rows[0].cursor_description] if rows else []
-            
-            # Update Treeview columns
-            self.fraud_tree["columns"] = columns
-            for col in columns:
-                self.fraud_tree.heading(col, text=col)
-                self.fraud_tree.column(col, width=100)
-            
-            # Add data to Treeview
-            for row in rows:
-                values = [str(val) if val is not None else "" for val in row]
-                self.fraud_tree.insert("", tk.END, values=values)
-            
-            # Update pagination info
-            self.update_pagination_info()
-            
-            logger.info(f"Đã đọc {len(rows)} bản ghi từ bảng TKTT (Trang {self.current_page}/{self.total_pages})")
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi đọc dữ liệu: {str(e)}")
-            messagebox.showerror("Lỗi", f"Không thể đọc dữ liệu: {str(e)}")
-
-    def update_pagination_info(self):
-        """Cập nhật thông tin phân trang"""
-        self.page_label.config(text=f"Trang {self.current_page}/{self.total_pages}")
-        self.total_label.config(text=f"Tổng số: {self.total_records:,} bản ghi")
-
-    def next_page(self):
-        """Chuyển đến trang tiếp theo"""
-        if self.current_page < self.total_pages:
-            self.current_page += 1
-            self.fetch_data()
-
-    def prev_page(self):
-        """Quay lại trang trước"""
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.fetch_data()
+        """Đọc và hiển thị dữ liệu từ bảng TKTT với phân trang (tải lại trang hiện tại)"""
+        self.reload_current_page()
 
     def search_data(self):
         """Tìm kiếm dữ liệu TKTT theo các điều kiện với phân trang"""
-        try:
-            conditions = []
-            params = []
-            
-            # Reset pagination
-            self.current_page = 1
-            
-            # Base query với điều kiện lọc khách hàng cá nhân
-            base_query = """
-                SELECT 
-                    CAST(Cif AS VARCHAR(36)) AS Cif,
-                    CAST(Soid AS VARCHAR(15)) AS Soid,
-                    CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang,
-                    CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
-                    CAST(TrangThaiHoatDongTaiKhoan AS INT) AS TrangThaiHoatDongTaiKhoan,
-                    CAST(NghiNgo AS INT) AS NghiNgo,
-                    CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
-                    CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate
-                FROM TKTT 
-                WHERE LoaiKhachHang = N'Ca Nhan'
-            """
-
-            # Tìm theo CIF hoặc SoID
-            if self.search_cif_entry.get().strip():
-                search_term = self.search_cif_entry.get().strip()
-                conditions.append("(CAST(Cif AS VARCHAR(36)) LIKE ? OR CAST(Soid AS VARCHAR(15)) LIKE ?)")
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-            
-            # Tìm theo tên khách hàng
-            if self.search_name_entry.get().strip():
-                conditions.append("TenKhachHang LIKE ?")
-                params.append(f"%{self.search_name_entry.get().strip()}%")
-            
-            where_clause = ""
-            if conditions:
-                where_clause = " AND " + " AND ".join(conditions)
-            
-            # Get total records for search
-            count_query = f"SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}"
-            total = self.db_handler.execute_query(count_query, params=params, fetchall=False)[0]
-            self.total_records = total
-            self.total_pages = (total + self.rows_per_page - 1) // self.rows_per_page
-            
-            # Calculate offset for pagination
-            offset = (self.current_page - 1) * self.rows_per_page
-            
-            # Final query with pagination
-            query = f"{base_query}{where_clause} ORDER BY UpdateDate DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
-            params.extend([offset, self.rows_per_page])
-            
-            rows = self.db_handler.execute_query(query, params=params)
-            
-            # Clear existing data
-            self.fraud_tree.delete(*self.fraud_tree.get_children())
-            
-            # Add data to Treeview
-            for row in rows:
-                values = [str(val) if val is not None else "" for val in row]
-                self.fraud_tree.insert("", tk.END, values=values)
-            
-            # Update pagination info
-            self.update_pagination_info()
-            
-            # Display search results
-            conditions_text = []
-            if self.search_cif_entry.get().strip():
-                conditions_text.append(f"CIF/SoID: {self.search_cif_entry.get().strip()}")
-            if self.search_name_entry.get().strip():
-                conditions_text.append(f"Tên KH: {self.search_name_entry.get().strip()}")
-            
-            result_message = f"Tìm thấy {total:,} bản ghi"
+        self.search_conditions = self.get_search_conditions()
+        
+        # Display search results
+        conditions_text = []
+        if self.search_cif_entry.get().strip():
+            conditions_text.append(f"CIF/SoID: {self.search_cif_entry.get().strip()}")
+        if self.search_name_entry.get().strip():
+            conditions_text.append(f"Tên KH: {self.search_name_entry.get().strip()}")
+        
+        def show_result():
+            result_message = f"Tìm thấy {self.total_records:,} bản ghi"
             if conditions_text:
                 result_message += f"\nĐiều kiện tìm kiếm: {', '.join(conditions_text)}"
-            
             messagebox.showinfo("Kết quả tìm kiếm", result_message)
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi tìm kiếm: {str(e)}")
-            messagebox.showerror("Lỗi", f"Không thể tìm kiếm: {str(e)}")
+        
+        # Reset pagination
+        self.load_page(1, on_loaded=show_result)
 
     def clear_search(self):
         """Xóa các điều kiện tìm kiếm"""
         self.search_cif_entry.delete(0, tk.END)
         self.search_name_entry.delete(0, tk.END)
-        self.fetch_data()
+        self.search_conditions = None
+        self.load_page(1)
 
     def show_detail_dialog(self, event):
         """Hiển thị dialog chi tiết khi double click vào một dòng"""
-        # Lấy item được chọn
-        selected_item = self.fraud_tree.selection()
-        if not selected_item:
+        # Lấy dòng được chọn
+        selected_rows = self.fraud_table.get_selected_rows(display=True)
+        if not selected_rows:
             return
             
-        # Lấy dữ liệu của dòng được chọn
-        values = self.fraud_tree.item(selected_item[0])["values"]
-        
         # Tạo dictionary từ values và tên cột
-        columns = self.fraud_tree["columns"]
-        data_dict = dict(zip(columns, values))
+        data_dict = dict(zip(self.fraud_table.columns, selected_rows[0]))
         
         # Hiển thị dialog chi tiết
         DetailDialog(self.parent, data_dict)
@@ -439,12 +298,9 @@ class FraudDetectionTab:
     def export_to_excel(self):
         """Xuất dữ liệu ra file Excel"""
         try:
-            # Lấy tên cột và dữ liệu từ Treeview
-            columns = self.fraud_tree["columns"]
-            data = []
-            for item in self.fraud_tree.get_children():
-                values = self.fraud_tree.item(item)["values"]
-                data.append(values)
+            # Lấy tên cột và dữ liệu theo thứ tự đang hiển thị
+            columns = self.fraud_table.columns
+            data = self.fraud_table.get_rows()
 
             if not data:
                 messagebox.showwarning("Cảnh báo", "Không có dữ liệu để xuất!")
@@ -458,21 +314,7 @@ class FraudDetectionTab:
             )
             
             if file_path:
-                # Tạo workbook và worksheet mới
-                wb = Workbook()
-                ws = wb.active
-                
-                # Thêm headers
-                for col, header in enumerate(columns, 1):
-                    ws.cell(row=1, column=col, value=header)
-                
-                # Thêm dữ liệu
-                for row, record in enumerate(data, 2):
-                    for col, value in enumerate(record, 1):
-                        ws.cell(row=row, column=col, value=value)
-                
-                # Lưu file
-                wb.save(file_path)
+                StreamingExporter().export(data, file_path, columns=columns)
                 logger.info(f"Đã xuất dữ liệu ra file: {file_path}")
                 messagebox.showinfo("Thành công", f"Đã xuất dữ liệu ra file:\n{file_path}")
 
@@ -483,8 +325,8 @@ class FraudDetectionTab:
     def export_selected_to_simo_json(self):
         """Xuất dữ liệu được chọn thành JSON"""
         try:
-            selected_items = self.fraud_tree.selection()
-            if not selected_items:
+            selected_rows = self.fraud_table.get_selected_rows()
+            if not selected_rows:
                 messagebox.showwarning(
                     "Chưa chọn dữ liệu", 
                     "Vui lòng chọn ít nhất một dòng dữ liệu bằng cách:\n" +
@@ -495,12 +337,11 @@ class FraudDetectionTab:
                 return
 
             service_type = self.fraud_simo_var.get()
-            columns = self.fraud_tree["columns"]
+            columns = self.fraud_table.columns
             
             # Tạo danh sách chứa dữ liệu được chọn với định dạng đúng
             selected_data = []
-            for item in selected_items:
-                values = self.fraud_tree.item(item)["values"]
+            for values in selected_rows:
                 row_data = {}
                 for col, val in zip(columns, values):
                     formatted_value = self.format_tree_value(col, val)
@@ -510,7 +351,7 @@ class FraudDetectionTab:
             
             # Kiểm tra nếu không có dữ liệu hợp lệ
             if not selected_data:
-                logger.warning(f"Không có dữ liệu hợp lệ trong {len(selected_items)} dòng được chọn")
+                logger.warning(f"Không có dữ liệu hợp lệ trong {len(selected_rows)} dòng được chọn")
                 messagebox.showwarning(
                     "Dữ liệu không hợp lệ", 
                     "Các dòng được chọn không có dữ liệu hợp lệ để xuất.\n" +
@@ -542,7 +383,7 @@ class FraudDetectionTab:
             return None
             
     def format_tree_value(self, column, value):
-        """Format giá trị từ Treeview, giữ nguyên giá trị gốc từ database"""
+        """Format giá trị của dòng đang hiển thị, giữ nguyên giá trị gốc từ database"""
         if value in [None, "None", ""]:
             return None
             
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
 from utils.logger import Logger
+from utils.json_serializer import loads
 
 logger = Logger('json_converter_tab')
 
@@ -120,7 +121,7 @@ class JSONConverterTab:
                 raise ValueError("Vui lòng nhập dữ liệu JSON!")
 
             # Parse JSON
-            data = json.loads(json_content)
+            data = loads(json_content)
             
             # Kiểm tra xem có phải là list không
             if not isinstance(data, list):
@@ -217,7 +218,7 @@ class JSONConverterTab:
                 return
                 
             # Parse JSON và gửi dữ liệu
-            data = json.loads(json_content)
+            data = loads(json_content)
             service_type = self.json_service_var.get()
             
             # Gửi dữ liệu qua API
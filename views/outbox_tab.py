@@ -0,0 +1,136 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+from utils.logger import Logger
+from utils.outbox import STATUS_LABELS
+
+logger = Logger('outbox_tab')
+
+class OutboxTab:
+    """Tab theo dõi các lần gửi dữ liệu SIMO trong outbox và gửi lại các phần lỗi"""
+
+    BATCH_COLUMNS = ("Thời gian", "Dịch vụ", "Số phần", "Số bản ghi", "Đã gửi", "Đang chờ", "Lỗi", "Cập nhật")
+    CHUNK_COLUMNS = ("Phần", "maYeuCau", "Số bản ghi", "Trạng thái", "Số lần gửi", "Gửi lại lúc", "Lỗi gần nhất")
+
+    # Tự làm mới khi đang mở tab (ms)
+    REFRESH_INTERVAL = 5000
+
+    def __init__(self, parent, outbox, worker=None):
+        self.parent = parent
+        self.outbox = outbox
+        self.worker = worker
+
+        # Frame chính
+        self.outbox_tab = ttk.Frame(parent)
+
+        self.create_outbox_section()
+        self.schedule_refresh()
+
+    def get_tab_frame(self):
+        return self.outbox_tab
+
+    def create_outbox_section(self):
+        """Tạo giao diện cho tab Outbox"""
+        button_frame = ttk.Frame(self.outbox_tab)
+        button_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        refresh_btn = ttk.Button(button_frame, text="Làm mới",
+                              command=self.refresh, style='Primary.TButton')
+        refresh_btn.pack(side=tk.LEFT, padx=5)
+
+        retry_btn = ttk.Button(button_frame, text="Gửi lại phần lỗi",
+                            command=self.requeue_selected, style='Success.TButton')
+        retry_btn.pack(side=tk.LEFT, padx=5)
+
+        self.summary_label = ttk.Label(button_frame, text="")
+        self.summary_label.pack(side=tk.RIGHT, padx=5)
+
+        paned = ttk.PanedWindow(self.outbox_tab, orient=tk.VERTICAL)
+        paned.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        batch_frame = ttk.LabelFrame(paned, text="Các lần gửi", padding="10")
+        paned.add(batch_frame, weight=1)
+        self.batch_tree = self.create_tree(batch_frame, self.BATCH_COLUMNS, selectmode='browse')
+        self.batch_tree.bind("<<TreeviewSelect>>", lambda event: self.load_chunks())
+
+        chunk_frame = ttk.LabelFrame(paned, text="Chi tiết các phần", padding="10")
+        paned.add(chunk_frame, weight=1)
+        self.chunk_tree = self.create_tree(chunk_frame, self.CHUNK_COLUMNS, selectmode='extended')
+
+    def create_tree(self, parent, columns, selectmode):
+        tree = ttk.Treeview(parent, columns=columns, show="headings", selectmode=selectmode)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=120)
+
+        scroll_y = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scroll_y.set)
+        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        return tree
+
+    def schedule_refresh(self):
+        # Chỉ đọc outbox khi tab đang được hiển thị
+        if self.outbox_tab.winfo_ismapped():
+            self.refresh()
+        self.outbox_tab.after(self.REFRESH_INTERVAL, self.schedule_refresh)
+
+    def refresh(self):
+        """Đọc lại trạng thái outbox, giữ lần gửi đang chọn"""
+        try:
+            selected = self.batch_tree.selection()
+            counts = self.outbox.count_by_status()
+            self.summary_label.config(text=" | ".join(
+                f"{STATUS_LABELS.get(status, status)}: {count}" for status, count in sorted(counts.items())
+            ))
+
+            self.batch_tree.delete(*self.batch_tree.get_children())
+            for batch in self.outbox.list_batches():
+                self.batch_tree.insert("", tk.END, iid=batch['batch_id'], values=(
+                    self.format_time(batch['created_at']), batch['service_type'], batch['chunks'],
+                    batch['records'], batch['sent'], batch['waiting'], batch['failed'],
+                    self.format_time(batch['updated_at'])
+                ))
+
+            if selected and self.batch_tree.exists(selected[0]):
+                self.batch_tree.selection_set(selected[0])
+            self.load_chunks()
+        except Exception as e:
+            logger.error(f"Lỗi khi đọc outbox: {str(e)}")
+
+    def load_chunks(self):
+        """Hiển thị các phần của lần gửi đang chọn"""
+        self.chunk_tree.delete(*self.chunk_tree.get_children())
+        selected = self.batch_tree.selection()
+        if not selected:
+            return
+        for chunk in self.outbox.list_chunks(selected[0]):
+            next_attempt = ""
+            if chunk['status'] == 'retry' and chunk['next_attempt_at']:
+                next_attempt = datetime.fromtimestamp(chunk['next_attempt_at']).strftime("%H:%M:%S %d/%m/%Y")
+            self.chunk_tree.insert("", tk.END, values=(
+                chunk['chunk_index'] + 1, chunk['ma_yeu_cau'], chunk['records'],
+                STATUS_LABELS.get(chunk['status'], chunk['status']), chunk['attempts'],
+                next_attempt, chunk['last_error'] or ""
+            ))
+
+    def requeue_selected(self):
+        """Đưa các phần lỗi của lần gửi đang chọn (hoặc tất cả nếu không chọn) vào hàng đợi gửi lại"""
+        try:
+            selected = self.batch_tree.selection()
+            count = self.outbox.requeue(selected[0] if selected else None)
+            if self.worker is not None:
+                self.worker.wake()
+            logger.info(f"Đưa {count} phần vào hàng đợi gửi lại")
+            messagebox.showinfo("Thành công", f"Đã đưa {count} phần vào hàng đợi gửi lại")
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Lỗi khi gửi lại phần lỗi: {str(e)}")
+            messagebox.showerror("Lỗi", f"Không thể gửi lại: {str(e)}")
+
+    @staticmethod
+    def format_time(value):
+        try:
+            return datetime.fromisoformat(value).strftime("%H:%M:%S %d/%m/%Y")
+        except (TypeError, ValueError):
+            return value or ""
@@ -0,0 +1,208 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from utils.logger import Logger
+from utils.local_config import API_CONFIG
+from views.background_tasks import BackgroundTaskRunner, ProgressIndicator
+
+logger = Logger('paginated_tab')
+
+
+class PaginatedTabMixin:
+    """
+    Phân trang keyset dùng chung cho các tab hiển thị dữ liệu TKTT (TKTT Cá nhân, Phát hiện gian lận).
+    Tab gọi init_pagination trong __init__, tạo bảng rồi gọi create_pagination_bar. Trang được tải
+    ở luồng nền, trang liền kề được tải trước vào cache, số bản ghi chính xác được đếm sau.
+    """
+
+    def init_pagination(self, model, select_columns, rows_per_page=100):
+        """
+        :param model: TKTTModel dùng để tải trang và đếm số bản ghi
+        :param select_columns: Danh sách cột hiển thị (TKTT_SELECT_COLUMNS, FRAUD_SELECT_COLUMNS)
+        :param rows_per_page: Số bản ghi mỗi trang
+        """
+        self.model = model
+        self.select_columns = select_columns
+
+        # Biến cho phân trang
+        self.current_page = 1
+        self.rows_per_page = rows_per_page
+        self.total_records = 0
+        self.total_pages = 0
+        self.total_is_exact = True
+
+        # Trạng thái phân trang keyset và điều kiện tìm kiếm hiện tại
+        self.search_conditions = None
+        self.current_cursor = None
+        self.current_direction = "next"
+        self.next_cursor = None
+        self.prev_cursor = None
+
+    def create_pagination_bar(self, parent, tab_frame, table):
+        """
+        Tạo thanh phân trang và bộ chạy công việc nền của tab
+        :param parent: Frame chứa thanh phân trang
+        :param tab_frame: Frame chính của tab (dùng để lập lịch đọc kết quả từ luồng nền)
+        :param table: VirtualTable hiển thị trang hiện tại
+        """
+        self.paged_table = table
+        self.pagination_frame = ttk.Frame(parent)
+        self.pagination_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Button(self.pagination_frame, text="<<", command=self.prev_page).pack(side=tk.LEFT, padx=2)
+        self.page_label = ttk.Label(self.pagination_frame, text="Page 1")
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.pagination_frame, text=">>", command=self.next_page).pack(side=tk.LEFT, padx=2)
+
+        self.total_label = ttk.Label(self.pagination_frame, text="Total: 0 records")
+        self.total_label.pack(side=tk.LEFT, padx=20)
+
+        # Truy vấn chạy ở luồng nền để giao diện không bị treo khi chờ database
+        self.indicator = ProgressIndicator(self.pagination_frame)
+        self.indicator.pack(side=tk.RIGHT, padx=5)
+        self.tasks = BackgroundTaskRunner(tab_frame, self.indicator)
+
+    def invalidate_page_data(self):
+        """Xóa bảng và cache (số bản ghi, trang, kết quả tìm kiếm) trước khi tải lại"""
+        self.paged_table.clear()
+        self.model.count_service.invalidate(self.search_conditions)
+        self.model.page_cache.invalidate(self.search_conditions)
+        self.model.search_cache.invalidate()
+
+    def reload_current_page(self):
+        """Tải lại trang hiện tại"""
+        self.load_page(self.current_page, self.current_cursor, self.current_direction)
+
+    def load_page(self, page, cursor=None, direction="next", on_loaded=None):
+        """
+        Tải một trang dữ liệu bằng phân trang keyset ở luồng nền.
+        Yêu cầu tải trang mới sẽ hủy yêu cầu trước đó chưa xong (ví dụ khi chuyển trang nhanh).
+        :param page: Số thứ tự trang dùng để hiển thị
+        :param cursor: Cursor của trang liền kề, None để lấy trang đầu
+        :param direction: 'next' hoặc 'prev'
+        :param on_loaded: Hàm gọi sau khi trang đã được hiển thị
+        """
+        search_conditions = self.search_conditions
+        select_columns = self.select_columns
+
+        def on_success(result):
+            self.show_page(page, cursor, direction, *result)
+            if on_loaded:
+                on_loaded()
+
+        # Trang đã được tải trước và số bản ghi đã có trong cache: hiển thị ngay, không chờ luồng nền
+        cached_page = self.model.get_cached_page(self.rows_per_page, search_conditions, cursor=cursor,
+                                                 direction=direction, select_columns=select_columns)
+        cached_total = self.model.count_service.get_cached_count(search_conditions)
+        if cached_page is not None and cached_total is not None:
+            self.tasks.cancel('page')
+            on_success((cached_total, True, cached_page))
+            return
+
+        def query(task):
+            # Lấy tổng số bản ghi từ cache hoặc ước lượng, số chính xác được cập nhật sau
+            total, is_exact = self.model.count_service.get_count_for_display(search_conditions)
+            if task.cancelled:
+                return None
+            page_data = self.model.get_page(self.rows_per_page, search_conditions,
+                                            cursor=cursor, direction=direction,
+                                            select_columns=select_columns)
+            return total, is_exact, page_data
+
+        # Số đếm cũ không còn đúng với trang sắp tải
+        self.tasks.cancel('count')
+        self.tasks.submit('page', query, on_success=on_success, on_error=self.on_load_error,
+                          message=f"Đang tải trang {page}...")
+
+    def show_page(self, page, cursor, direction, total, is_exact, page_data):
+        """Hiển thị một trang đã tải (chạy trên luồng giao diện)"""
+        self.set_total_records(total, is_exact)
+        rows = page_data['rows']
+
+        # Lưu trạng thái phân trang
+        self.current_page = page
+        self.current_cursor = cursor
+        self.current_direction = direction
+        self.next_cursor = page_data['next_cursor']
+        self.prev_cursor = page_data['prev_cursor']
+
+        # Hiển thị trang mới, giữ nguyên cột cũ nếu trang rỗng
+        self.paged_table.set_data(page_data['columns'] or self.paged_table.columns, rows)
+
+        # Update pagination info
+        self.update_pagination_info()
+        if not is_exact:
+            self.update_exact_count()
+        self.prefetch_adjacent()
+
+        logger.info(f"Đã đọc {len(rows)} bản ghi từ bảng TKTT (Trang {self.current_page}/{self.total_pages})")
+
+    def prefetch_adjacent(self):
+        """Tải trước trang sau (và trang trước) vào cache ở luồng nền để chuyển trang không phải chờ"""
+        search_conditions = self.search_conditions
+        select_columns = self.select_columns
+        targets = [('prefetch_next', self.next_cursor, "next")]
+        if API_CONFIG.get('prefetch_previous_page', True):
+            targets.append(('prefetch_prev', self.prev_cursor, "prev"))
+
+        for key, cursor, direction in targets:
+            if not cursor:
+                self.tasks.cancel(key)
+                continue
+            self.tasks.submit(
+                key,
+                lambda task, cursor=cursor, direction=direction: self.model.get_page(
+                    self.rows_per_page, search_conditions, cursor=cursor, direction=direction,
+                    select_columns=select_columns),
+                on_error=lambda error: logger.warning(f"Không thể tải trước trang: {str(error)}"),
+                quiet=True
+            )
+
+    def on_load_error(self, error):
+        """Báo lỗi khi tải trang thất bại"""
+        logger.error(f"Lỗi khi đọc dữ liệu TKTT: {str(error)}")
+        messagebox.showerror("Lỗi", f"Không thể đọc dữ liệu: {str(error)}")
+
+    def set_total_records(self, total, is_exact=True):
+        """Lưu tổng số bản ghi và số trang"""
+        self.total_records = total
+        self.total_is_exact = is_exact
+        self.total_pages = (total + self.rows_per_page - 1) // self.rows_per_page
+
+    def update_exact_count(self):
+        """Đếm chính xác ở luồng nền và cập nhật sau khi trang đã được hiển thị"""
+        search_conditions = self.search_conditions
+
+        def on_success(total):
+            self.set_total_records(total)
+            self.update_pagination_info()
+
+        def on_error(error):
+            logger.error(f"Lỗi khi đếm số bản ghi: {str(error)}")
+
+        self.tasks.submit('count', lambda task: self.model.count_service.get_exact_count(search_conditions),
+                          on_success=on_success, on_error=on_error, message="Đang đếm số bản ghi...")
+
+    def update_pagination_info(self):
+        """Cập nhật thông tin phân trang"""
+        approx_mark = "" if self.total_is_exact else "~"
+        self.page_label.config(text=f"Trang {self.current_page}/{approx_mark}{self.total_pages}")
+        self.total_label.config(text=f"Tổng số: {approx_mark}{self.total_records:,} bản ghi")
+
+    def next_page(self):
+        """Chuyển đến trang tiếp theo"""
+        if self.next_cursor:
+            self.load_page(self.current_page + 1, self.next_cursor, "next")
+
+    def prev_page(self):
+        """Quay lại trang trước"""
+        if self.prev_cursor and self.current_page > 1:
+            self.load_page(self.current_page - 1, self.prev_cursor, "prev")
+
+    def get_search_conditions(self):
+        """Lấy điều kiện tìm kiếm từ các ô nhập liệu search_cif_entry và search_name_entry của tab"""
+        search_conditions = {}
+        if self.search_cif_entry.get().strip():
+            search_conditions['cif_soid'] = self.search_cif_entry.get().strip()
+        if self.search_name_entry.get().strip():
+            search_conditions['customer_name'] = self.search_name_entry.get().strip()
+        return search_conditions or None
@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import json
+from utils.json_serializer import SerializedPayload
 
 class PreviewDialog:
     def __init__(self, parent, converted_data, service_type):
@@ -43,9 +43,9 @@ class PreviewDialog:
         self.text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         x_scrollbar.pack(fill=tk.X)
         
-        # Hiển thị JSON được format
-        json_str = json.dumps(converted_data, ensure_ascii=False, indent=2)
-        self.text_widget.insert(tk.END, json_str)
+        # Hiển thị JSON được format (serialize một lần, dùng lại khi xuất file)
+        self.serialized = SerializedPayload(converted_data)
+        self.text_widget.insert(tk.END, self.serialized.text)
         self.text_widget.configure(state='disabled')  # Chỉ cho phép đọc
         
         # Frame cho các nút
@@ -54,14 +54,14 @@ class PreviewDialog:
         
         # Nút Export để xuất file
         export_btn = ttk.Button(button_frame, text="Xuất JSON", 
-                              command=lambda: self.export_json(converted_data, service_type))
+                              command=lambda: self.export_json(self.serialized, service_type))
         export_btn.pack(side=tk.LEFT, padx=5)
         
         # Nút đóng
         close_btn = ttk.Button(button_frame, text="Đóng", command=self.top.destroy)
         close_btn.pack(side=tk.LEFT, padx=5)
     
-    def export_json(self, data, service_type):
+    def export_json(self, serialized, service_type):
         """Xuất dữ liệu JSON ra file"""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
@@ -70,6 +70,5 @@ class PreviewDialog:
         )
         
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            serialized.save(file_path)
             messagebox.showinfo("Thành công", f"Đã xuất dữ liệu ra file:\n{file_path}")
\ No newline at end of file
@@ -3,13 +3,18 @@ from tkinter import ttk, messagebox, filedialog
 import json
 from datetime import datetime
 from utils.logger import Logger
-from openpyxl import Workbook
+from utils.local_config import API_CONFIG
 from views.detail_dialog import DetailDialog
 from views.preview_dialog import PreviewDialog
+from views.export_progress_dialog import ExportProgressDialog
+from views.virtual_table import VirtualTable
+from views.paginated_tab import PaginatedTabMixin
+from utils.export_engine import StreamingExporter
+from models.tktt_model import TKTTModel, TKTT_SELECT_COLUMNS
 
 logger = Logger('tktt_tab')
 
-class TKTTTab:
+class TKTTTab(PaginatedTabMixin):
     def __init__(self, parent, db_handler, api_handler, simo_converter):
         self.parent = parent
         self.db_handler = db_handler
@@ -23,26 +28,17 @@ class TKTTTab:
         self.tktt_ca_nhan_top_frame = ttk.Frame(self.tktt_ca_nhan_tab)
         self.tktt_ca_nhan_top_frame.pack(fill=tk.X, pady=(0, 20))
         
-        # Biến cho phân trang
-        self.current_page = 1
-        self.rows_per_page = 100
-        self.total_records = 0
-        self.total_pages = 0
+        # Phân trang keyset và điều kiện tìm kiếm hiện tại
+        self.init_pagination(TKTTModel(db_handler), TKTT_SELECT_COLUMNS)
+        
+        # Lịch chạy tìm kiếm khi đang gõ (debounce)
+        self.search_job = None
         
         # Tạo giao diện
         self.create_tktt_section()
         
-        # Add pagination frame
-        self.pagination_frame = ttk.Frame(self.tktt_ca_nhan_top_frame)
-        self.pagination_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(self.pagination_frame, text="<<", command=self.prev_page).pack(side=tk.LEFT, padx=2)
-        self.page_label = ttk.Label(self.pagination_frame, text="Page 1")
-        self.page_label.pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.pagination_frame, text=">>", command=self.next_page).pack(side=tk.LEFT, padx=2)
-        
-        self.total_label = ttk.Label(self.pagination_frame, text="Total: 0 records")
-        self.total_label.pack(side=tk.LEFT, padx=20)
+        # Thanh phân trang
+        self.create_pagination_bar(self.tktt_ca_nhan_top_frame, self.tktt_ca_nhan_tab, self.tktt_table)
         
     def get_tab_frame(self):
         return self.tktt_ca_nhan_tab
@@ -86,6 +82,10 @@ class TKTTTab:
                                   command=self.export_tktt_to_excel, style='Success.TButton')
         export_excel_btn.pack(side=tk.LEFT, padx=5)
 
+        export_all_btn = ttk.Button(button_frame, text="Xuất toàn bộ", 
+                                command=self.export_all_tktt, style='Success.TButton')
+        export_all_btn.pack(side=tk.LEFT, padx=5)
+
         export_json_btn = ttk.Button(button_frame, text="Xuất JSON", 
                                  command=self.export_selected_to_simo_json, style='Primary.TButton')
         export_json_btn.pack(side=tk.LEFT, padx=5)
@@ -108,6 +108,10 @@ class TKTTTab:
         self.search_name_entry = ttk.Entry(basic_search_frame, width=30)
         self.search_name_entry.grid(row=0, column=3, padx=5, pady=5)
 
+        # Tìm kiếm ngay khi gõ, chờ người dùng ngừng gõ một chút để không truy vấn theo từng phím
+        self.search_cif_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_name_entry.bind("<KeyRelease>", self.schedule_search)
+
         # Frame cho các nút tìm kiếm
         search_button_frame = ttk.Frame(search_frame)
         search_button_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -125,236 +129,87 @@ class TKTTTab:
         self.tktt_display_frame = ttk.Frame(self.tktt_ca_nhan_tab)
         self.tktt_display_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # Tạo Treeview với scrollbar
-        self.tktt_tree = ttk.Treeview(self.tktt_display_frame, show="headings", 
-                                   selectmode='extended', style='Treeview')
-
-        # Tạo scrollbar
-        tktt_scroll_y = ttk.Scrollbar(self.tktt_display_frame, orient=tk.VERTICAL,
-                                   command=self.tktt_tree.yview)
-        tktt_scroll_x = ttk.Scrollbar(self.tktt_display_frame, orient=tk.HORIZONTAL,
-                                   command=self.tktt_tree.xview)
-
-        # Cấu hình scrollbar
-        self.tktt_tree.configure(yscrollcommand=tktt_scroll_y.set,
-                              xscrollcommand=tktt_scroll_x.set)
-
-        # Pack các components
-        tktt_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        tktt_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.tktt_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Bảng ảo: chỉ tạo item cho các dòng đang nhìn thấy, sắp xếp khi bấm tiêu đề cột
+        self.tktt_table = VirtualTable(self.tktt_display_frame, selectmode='extended')
+        self.tktt_table.pack(fill=tk.BOTH, expand=True)
 
         # Bind double click event để xem chi tiết
-        self.tktt_tree.bind("<Double-1>", self.show_detail_dialog)
+        self.tktt_table.bind("<Double-1>", self.show_detail_dialog)
         
     def refresh_tktt_data(self):
         """Làm mới dữ liệu TKTT"""
-        self.tktt_tree.delete(*self.tktt_tree.get_children())
+        self.invalidate_page_data()
         self.fetch_tktt_data()
 
     def fetch_tktt_data(self):
-        """Đọc và hiển thị dữ liệu từ bảng TKTT với phân trang"""
-        try:
-            # Get total records first
-            count_query = "SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'"
-            total = self.db_handler.execute_query(count_query, fetchall=False)[0]
-            self.total_records = total
-            self.total_pages = (total + self.rows_per_page - 1) // self.rows_per_page
-            
-            # Calculate offset
-            offset = (self.current_page - 1) * self.rows_per_page
-            
-            query = f"""
-                SELECT 
-                    CAST(Cif AS VARCHAR(36)) AS Cif,
-                    CAST(Soid AS VARCHAR(15)) AS Soid,
-                    CAST(LoaiD AS INT) AS LoaiD,
-                    CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang,
-                    CONVERT(VARCHAR(10), NgaySinh, 103) AS NgaySinh,
-                    CAST(GioiTinh AS INT) AS GioiTinh,
-                    CAST(MaSoThue AS VARCHAR(50)) AS MaSoThue,
-                    CAST(SoDienThoaiDangKyDichVu AS VARCHAR(15)) AS SoDienThoaiDangKyDichVu,
-                    CAST(DiaChi AS NVARCHAR(300)) AS DiaChi,
-                    CAST(DiaChiKiemSoatTruyCap AS NVARCHAR(60)) AS DiaChiKiemSoatTruyCap,
-                    CAST(MaSoNhanDangThietBiDong AS VARCHAR(36)) AS MaSoNhanDangThietBiDong,
-                    CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
-                    CAST(LoaiTaiKhoan AS INT) AS LoaiTaiKhoan,
-                    CAST(TrangThaiHoatDongTaiKhoan AS INT) AS TrangThaiHoatDongTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayMoTaiKhoan, 103) AS NgayMoTaiKhoan,
-                    CAST(PhuongThucMoTaiKhoan AS INT) AS PhuongThucMoTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayXacThucTaiQuay, 103) AS NgayXacThucTaiQuay,
-                    CAST(QuocTich AS NVARCHAR(36)) AS QuocTich,
-                    CAST(LoaiKhachHang AS NVARCHAR(50)) AS LoaiKhachHang,
-                    CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
-                    CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate,
-                    CAST(NghiNgo AS INT) AS NghiNgo
-                FROM TKTT 
-                WHERE LoaiKhachHang = N'Ca Nhan'
-                ORDER BY UpdateDate DESC
-                OFFSET ? ROWS
-                FETCH NEXT ? ROWS ONLY
-            """
-            
-            rows = self.db_handler.execute_query(query, params=(offset, self.rows_per_page))
-            
-            # Clear existing data
-            self.tktt_tree.delete(*self.tktt_tree.get_children())
-            
-            # Get column names
-            columns = [column[0] for column in rows[0].cursor_description] if rows else []
-            
-            # Update Treeview columns
-            self.tktt_tree["columns"] = columns
-            for col in columns:
-                self.tktt_tree.heading(col, text=col)
-                self.tktt_tree.column(col, width=100)
-            
-            # Add data to Treeview
-            for row in rows:
-                values = [str(val) if val is not None else "" for val in row]
-                self.tktt_tree.insert("", tk.END, values=values)
-            
-            # Update pagination info
-            self.update_pagination_info()
-            
-            logger.info(f"Đã đọc {len(rows)} bản ghi từ bảng TKTT (Trang {self.current_page}/{self.total_pages})")
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi đọc dữ liệu TKTT: {str(e)}")
-            messagebox.showerror("Lỗi", f"Không thể đọc dữ liệu: {str(e)}")
-
-    def update_pagination_info(self):
-        """Cập nhật thông tin phân trang"""
-        self.page_label.config(text=f"Trang {self.current_page}/{self.total_pages}")
-        self.total_label.config(text=f"Tổng số: {self.total_records:,} bản ghi")
-
-    def next_page(self):
-        """Chuyển đến trang tiếp theo"""
-        if self.current_page < self.total_pages:
-            self.current_page += 1
-            self.fetch_tktt_data()
-
-    def prev_page(self):
-        """Quay lại trang trước"""
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.fetch_tktt_data()
+        """Đọc và hiển thị dữ liệu từ bảng TKTT với phân trang (tải lại trang hiện tại)"""
+        self.reload_current_page()
+
+    def schedule_search(self, event=None):
+        """Hẹn giờ tìm kiếm sau khi người dùng ngừng gõ search_debounce_ms mili giây"""
+        self.cancel_scheduled_search()
+        self.search_job = self.tktt_ca_nhan_tab.after(API_CONFIG.get('search_debounce_ms', 400),
+                                                      self.run_incremental_search)
+
+    def cancel_scheduled_search(self):
+        if self.search_job is not None:
+            self.tktt_ca_nhan_tab.after_cancel(self.search_job)
+            self.search_job = None
+
+    def run_incremental_search(self):
+        """
+        Tìm kiếm khi đang gõ: bỏ qua nếu điều kiện không đổi (ví dụ phím mũi tên) hoặc từ khóa quá ngắn.
+        Yêu cầu mới thay thế yêu cầu đang chạy; từ khóa dài hơn từ khóa đã có kết quả đầy đủ
+        được lọc lại trong bộ nhớ (TKTTModel.get_search_result).
+        """
+        self.search_job = None
+        search_conditions = self.get_search_conditions()
+        if search_conditions == self.search_conditions:
+            return
+        min_chars = API_CONFIG.get('search_min_chars', 2)
+        if search_conditions and all(len(value) < min_chars for value in search_conditions.values()):
+            return
+        self.search_conditions = search_conditions
+        self.load_page(1)
 
     def search_tktt_data(self):
         """Tìm kiếm dữ liệu TKTT theo các điều kiện với phân trang"""
-        try:
-            conditions = []
-            params = []
-            
-            # Reset pagination
-            self.current_page = 1
-            
-            # Base query với điều kiện lọc khách hàng cá nhân
-            base_query = """
-                SELECT 
-                    CAST(Cif AS VARCHAR(36)) AS Cif,
-                    CAST(Soid AS VARCHAR(15)) AS Soid,
-                    CAST(LoaiD AS INT) AS LoaiD,
-                    CAST(TenKhachHang AS NVARCHAR(150)) AS TenKhachHang,
-                    CONVERT(VARCHAR(10), NgaySinh, 103) AS NgaySinh,
-                    CAST(GioiTinh AS INT) AS GioiTinh,
-                    CAST(MaSoThue AS VARCHAR(50)) AS MaSoThue,
-                    CAST(SoDienThoaiDangKyDichVu AS VARCHAR(15)) AS SoDienThoaiDangKyDichVu,
-                    CAST(DiaChi AS NVARCHAR(300)) AS DiaChi,
-                    CAST(DiaChiKiemSoatTruyCap AS NVARCHAR(60)) AS DiaChiKiemSoatTruyCap,
-                    CAST(MaSoNhanDangThietBiDong AS VARCHAR(36)) AS MaSoNhanDangThietBiDong,
-                    CAST(SoTaiKhoan AS VARCHAR(50)) AS SoTaiKhoan,
-                    CAST(LoaiTaiKhoan AS INT) AS LoaiTaiKhoan,
-                    CAST(TrangThaiHoatDongTaiKhoan AS INT) AS TrangThaiHoatDongTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayMoTaiKhoan, 103) AS NgayMoTaiKhoan,
-                    CAST(PhuongThucMoTaiKhoan AS INT) AS PhuongThucMoTaiKhoan,
-                    CONVERT(VARCHAR(10), NgayXacThucTaiQuay, 103) AS NgayXacThucTaiQuay,
-                    CAST(QuocTich AS NVARCHAR(36)) AS QuocTich,
-                    CAST(LoaiKhachHang AS NVARCHAR(50)) AS LoaiKhachHang,
-                    CAST(GhiChu AS NVARCHAR(500)) AS GhiChu,
-                    CONVERT(VARCHAR(10), UpdateDate, 103) AS UpdateDate,
-                    CAST(NghiNgo AS INT) AS NghiNgo
-                FROM TKTT 
-                WHERE LoaiKhachHang = N'Ca Nhan'
-            """
-
-            # Tìm theo CIF hoặc SoID
-            if self.search_cif_entry.get().strip():
-                search_term = self.search_cif_entry.get().strip()
-                conditions.append("(CAST(Cif AS VARCHAR(36)) LIKE ? OR CAST(Soid AS VARCHAR(15)) LIKE ?)")
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-            
-            # Tìm theo tên khách hàng
-            if self.search_name_entry.get().strip():
-                conditions.append("TenKhachHang LIKE ?")
-                params.append(f"%{self.search_name_entry.get().strip()}%")
-            
-            where_clause = ""
-            if conditions:
-                where_clause = " AND " + " AND ".join(conditions)
-            
-            # Get total records for search
-            count_query = f"SELECT COUNT(*) FROM TKTT WHERE LoaiKhachHang = N'Ca Nhan'{where_clause}"
-            total = self.db_handler.execute_query(count_query, params=params, fetchall=False)[0]
-            self.total_records = total
-            self.total_pages = (total + self.rows_per_page - 1) // self.rows_per_page
-            
-            # Calculate offset for pagination
-            offset = (self.current_page - 1) * self.rows_per_page
-            
-            # Final query with pagination
-            query = f"{base_query}{where_clause} ORDER BY UpdateDate DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
-            params.extend([offset, self.rows_per_page])
-            
-            rows = self.db_handler.execute_query(query, params=params)
-            
-            # Clear existing data
-            self.tktt_tree.delete(*self.tktt_tree.get_children())
-            
-            # Add data to Treeview
-            for row in rows:
-                values = [str(val) if val is not None else "" for val in row]
-                self.tktt_tree.insert("", tk.END, values=values)
-            
-            # Update pagination info
-            self.update_pagination_info()
-            
-            # Display search results
-            conditions_text = []
-            if self.search_cif_entry.get().strip():
-                conditions_text.append(f"CIF/SoID: {self.search_cif_entry.get().strip()}")
-            if self.search_name_entry.get().strip():
-                conditions_text.append(f"Tên KH: {self.search_name_entry.get().strip()}")
-            
-            result_message = f"Tìm thấy {total:,} bản ghi"
+        self.cancel_scheduled_search()
+        self.search_conditions = self.get_search_conditions()
+        
+        # Display search results
+        conditions_text = []
+        if self.search_cif_entry.get().strip():
+            conditions_text.append(f"CIF/SoID: {self.search_cif_entry.get().strip()}")
+        if self.search_name_entry.get().strip():
+            conditions_text.append(f"Tên KH: {self.search_name_entry.get().strip()}")
+        
+        def show_result():
+            result_message = f"Tìm thấy {self.total_records:,} bản ghi"
             if conditions_text:
                 result_message += f"\nĐiều kiện tìm kiếm: {', '.join(conditions_text)}"
-            
             messagebox.showinfo("Kết quả tìm kiếm", result_message)
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi tìm kiếm: {str(e)}")
-            messagebox.showerror("Lỗi", f"Không thể tìm kiếm: {str(e)}")
+        
+        # Reset pagination
+        self.load_page(1, on_loaded=show_result)
 
     def clear_search(self):
         """Xóa các điều kiện tìm kiếm"""
+        self.cancel_scheduled_search()
         self.search_cif_entry.delete(0, tk.END)
         self.search_name_entry.delete(0, tk.END)
-        self.fetch_tktt_data()
+        self.search_conditions = None
+        self.load_page(1)
 
     def show_detail_dialog(self, event):
         """Hiển thị dialog chi tiết khi double click vào một dòng"""
-        # Lấy item được chọn
-        selected_item = self.tktt_tree.selection()
-        if not selected_item:
+        # Lấy dòng được chọn
+        selected_rows = self.tktt_table.get_selected_rows(display=True)
+        if not selected_rows:
             return
             
-        # Lấy dữ liệu của dòng được chọn
-        values = self.tktt_tree.item(selected_item[0])["values"]
-        
         # Tạo dictionary từ values và tên cột
-        columns = self.tktt_tree["columns"]
-        data_dict = dict(zip(columns, values))
+        data_dict = dict(zip(self.tktt_table.columns, selected_rows[0]))
         
         # Hiển thị dialog chi tiết
         DetailDialog(self.parent, data_dict)
@@ -362,12 +217,9 @@ class TKTTTab:
     def export_tktt_to_excel(self):
         """Xuất dữ liệu TKTT ra file Excel"""
         try:
-            # Lấy tên cột và dữ liệu từ Treeview
-            columns = self.tktt_tree["columns"]
-            data = []
-            for item in self.tktt_tree.get_children():
-                values = self.tktt_tree.item(item)["values"]
-                data.append(values)
+            # Lấy tên cột và dữ liệu theo thứ tự đang hiển thị
+            columns = self.tktt_table.columns
+            data = self.tktt_table.get_rows()
 
             if not data:
                 messagebox.showwarning("Cảnh báo", "Không có dữ liệu để xuất!")
@@ -381,21 +233,7 @@ class TKTTTab:
             )
             
             if file_path:
-                # Tạo workbook và worksheet mới
-                wb = Workbook()
-                ws = wb.active
-                
-                # Thêm headers
-                for col, header in enumerate(columns, 1):
-                    ws.cell(row=1, column=col, value=header)
-                
-                # Thêm dữ liệu
-                for row, record in enumerate(data, 2):
-                    for col, value in enumerate(record, 1):
-                        ws.cell(row=row, column=col, value=value)
-                
-                # Lưu file
-                wb.save(file_path)
+                StreamingExporter().export(data, file_path, columns=columns)
                 logger.info(f"Đã xuất dữ liệu TKTT ra file: {file_path}")
                 messagebox.showinfo("Thành công", f"Đã xuất dữ liệu ra file:\n{file_path}")
 
@@ -403,11 +241,30 @@ class TKTTTab:
             logger.error(f"Lỗi khi xuất dữ liệu: {str(e)}")
             messagebox.showerror("Lỗi", f"Không thể xuất dữ liệu: {str(e)}")
         
+    def export_all_tktt(self):
+        """Xuất toàn bộ dữ liệu TKTT (theo điều kiện tìm kiếm hiện tại) trực tiếp từ database"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")],
+            initialfile="TKTT_Full.xlsx"
+        )
+        if not file_path:
+            return
+            
+        search_conditions = self.search_conditions
+        total_hint = self.model.count_service.get_cached_count(search_conditions, allow_stale=True)
+        ExportProgressDialog(
+            self.parent,
+            lambda: self.model.stream_records(search_conditions),
+            file_path,
+            total_hint=total_hint or None
+        )
+        
     def export_selected_to_simo_json(self):
         """Xuất dữ liệu được chọn thành JSON"""
         try:
-            selected_items = self.tktt_tree.selection()
-            if not selected_items:
+            selected_rows = self.tktt_table.get_selected_rows()
+            if not selected_rows:
                 messagebox.showwarning(
                     "Chưa chọn dữ liệu", 
                     "Vui lòng chọn ít nhất một dòng dữ liệu bằng cách:\n" +
@@ -418,12 +275,11 @@ class TKTTTab:
                 return
 
             service_type = self.tktt_simo_var.get()
-            columns = self.tktt_tree["columns"]
+            columns = self.tktt_table.columns
             
             # Tạo danh sách chứa dữ liệu được chọn với định dạng đúng
             selected_data = []
-            for item in selected_items:
-                values = self.tktt_tree.item(item)["values"]
+            for values in selected_rows:
                 row_data = {}
                 for col, val in zip(columns, values):
                     formatted_value = self.format_tree_value(col, val)
@@ -433,7 +289,7 @@ class TKTTTab:
             
             # Kiểm tra nếu không có dữ liệu hợp lệ
             if not selected_data:
-                logger.warning(f"Không có dữ liệu hợp lệ trong {len(selected_items)} dòng được chọn")
+                logger.warning(f"Không có dữ liệu hợp lệ trong {len(selected_rows)} dòng được chọn")
                 messagebox.showwarning(
                     "Dữ liệu không hợp lệ", 
                     "Các dòng được chọn không có dữ liệu hợp lệ để xuất.\n" +
@@ -479,7 +335,7 @@ class TKTTTab:
             return None
             
     def format_tree_value(self, column, value):
-        """Format giá trị từ Treeview, giữ nguyên giá trị gốc từ database"""
+        """Format giá trị của dòng đang hiển thị, giữ nguyên giá trị gốc từ database"""
         if value in [None, "None", ""]:
             return None
             
@@ -0,0 +1,371 @@
+import tkinter as tk
+from tkinter import ttk
+from numbers import Number
+from utils.logger import Logger
+
+logger = Logger('virtual_table')
+
+
+def format_cell(value):
+    """Giá trị hiển thị của một ô"""
+    return "" if value is None else str(value)
+
+
+def sort_key(value):
+    """Khóa sắp xếp chịu được dữ liệu lẫn kiểu: số trước, chuỗi sau, NULL cuối cùng"""
+    if value is None:
+        return (2, "")
+    if isinstance(value, Number) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value))
+
+
+class ColumnStore:
+    """
+    Dữ liệu bảng lưu theo cột (mỗi cột một list giá trị gốc).
+    Sắp xếp chỉ đọc một cột và trả về thứ tự chỉ số dòng, dữ liệu không bị di chuyển.
+    """
+
+    def __init__(self, columns=(), rows=()):
+        self.load(columns, rows)
+
+    def load(self, columns, rows):
+        """
+        Nạp dữ liệu mới
+        :param columns: Danh sách tên cột
+        :param rows: Danh sách dòng (tuple/list hoặc pyodbc Row) theo thứ tự cột
+        """
+        self.columns = list(columns)
+        width = len(self.columns)
+        rows = rows if isinstance(rows, list) else list(rows)
+        # Dòng Excel có thể ngắn/dài hơn dòng tiêu đề
+        if any(len(row) != width for row in rows):
+            rows = [(tuple(row) + (None,) * width)[:width] for row in rows]
+        self.row_count = len(rows)
+        if rows:
+            self.data = [list(column) for column in zip(*rows)]
+        else:
+            self.data = [[] for _ in self.columns]
+
+    def __len__(self):
+        return self.row_count
+
+    def column_index(self, column):
+        return self.columns.index(column)
+
+    def row(self, index):
+        """Giá trị gốc của một dòng"""
+        return tuple(column[index] for column in self.data)
+
+    def display_row(self, index):
+        """Giá trị hiển thị của một dòng"""
+        return tuple(format_cell(column[index]) for column in self.data)
+
+    def sort_order(self, column, reverse=False):
+        """Thứ tự chỉ số dòng khi sắp xếp theo một cột (sắp xếp ổn định)"""
+        values = self.data[self.column_index(column)]
+        return sorted(range(self.row_count), key=lambda index: sort_key(values[index]), reverse=reverse)
+
+
+class VirtualTable:
+    """
+    Bảng hiển thị dữ liệu lớn bằng ttk.Treeview mà chỉ tạo item cho các dòng đang nhìn thấy.
+    Khi cuộn, các item có sẵn được gán lại giá trị của dòng mới; giá trị hiển thị được tạo
+    khi cần và giữ lại cho vùng nhìn thấy cộng thêm buffer_rows dòng mỗi phía.
+    Sắp xếp (bấm tiêu đề cột) và chọn dòng làm trên ColumnStore, không dựa vào item của Tk.
+    """
+
+    SCROLL_UNITS = 3
+    DEFAULT_ROW_HEIGHT = 20
+    DEFAULT_HEADER_HEIGHT = 25
+
+    def __init__(self, parent, selectmode='extended', buffer_rows=50, column_width=100):
+        """
+        :param selectmode: 'extended' (Ctrl/Shift để chọn nhiều dòng) hoặc 'browse' (một dòng)
+        :param buffer_rows: Số dòng giữ sẵn giá trị hiển thị ở mỗi phía vùng nhìn thấy
+        """
+        self.selectmode = selectmode
+        self.buffer_rows = buffer_rows
+        self.column_width = column_width
+
+        self.store = ColumnStore()
+        # Thứ tự hiển thị: danh sách chỉ số dòng trong store
+        self.order = []
+        self.sort_column = None
+        self.sort_reverse = False
+        # Các dòng được chọn (chỉ số trong store) và vị trí neo cho Shift
+        self.selected = set()
+        self.anchor = None
+        self.cursor = None
+
+        self.top = 0
+        self.visible_rows = 1
+        self.row_height = self.DEFAULT_ROW_HEIGHT
+        self.header_height = self.DEFAULT_HEADER_HEIGHT
+        self.items = []
+        self.rendered = {}
+
+        self.frame = ttk.Frame(parent)
+        # Tự quản lý việc chọn dòng nên tắt binding chọn mặc định của Treeview
+        self.tree = ttk.Treeview(self.frame, show="headings", selectmode='none', style='Treeview')
+        self.scroll_y = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.scroll_x = ttk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.scroll_x.set)
+
+        self.scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<Control-Button-1>", lambda event: self.on_click(event, toggle=True))
+        self.tree.bind("<Shift-Button-1>", lambda event: self.on_click(event, extend=True))
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_rows(-self.SCROLL_UNITS))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_rows(self.SCROLL_UNITS))
+        self.tree.bind("<Up>", lambda event: self.move_cursor(-1))
+        self.tree.bind("<Down>", lambda event: self.move_cursor(1))
+        self.tree.bind("<Shift-Up>", lambda event: self.move_cursor(-1, extend=True))
+        self.tree.bind("<Shift-Down>", lambda event: self.move_cursor(1, extend=True))
+        self.tree.bind("<Prior>", lambda event: self.move_cursor(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.move_cursor(self.visible_rows))
+        self.tree.bind("<Home>", lambda event: self.move_cursor(-len(self.order)))
+        self.tree.bind("<End>", lambda event: self.move_cursor(len(self.order)))
+        self.tree.bind("<Control-a>", lambda event: self.select_all())
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, func):
+        """Bind sự kiện lên Treeview (ví dụ <Double-1> để xem chi tiết dòng đang chọn)"""
+        self.tree.bind(sequence, func, add='+')
+
+    @property
+    def columns(self):
+        return self.store.columns
+
+    def __len__(self):
+        return len(self.order)
+
+    # Dữ liệu
+
+    def set_data(self, columns, rows):
+        """Thay toàn bộ dữ liệu; chỉ tạo item Tk cho các dòng nhìn thấy"""
+        columns = list(columns)
+        self.store.load(columns, rows)
+        self.order = list(range(len(self.store)))
+        self.sort_column = None
+        self.sort_reverse = False
+        self.selected.clear()
+        self.anchor = None
+        self.cursor = None
+        self.top = 0
+        self.rendered.clear()
+
+        if list(self.tree["columns"]) != columns:
+            self.tree.delete(*self.items)
+            self.items = []
+            self.tree["columns"] = columns
+            for col in columns:
+                self.tree.column(col, width=self.column_width)
+        self.update_headings()
+        self.render()
+
+    def clear(self):
+        """Xóa dữ liệu, giữ nguyên các cột"""
+        self.set_data(self.columns, [])
+
+    def get_rows(self, display=False):
+        """Tất cả các dòng theo thứ tự đang hiển thị (giá trị gốc hoặc chuỗi hiển thị)"""
+        row = self.store.display_row if display else self.store.row
+        return [row(index) for index in self.order]
+
+    def get_selected_rows(self, display=False):
+        """Các dòng đang chọn theo thứ tự đang hiển thị"""
+        row = self.store.display_row if display else self.store.row
+        if not self.selected:
+            return []
+        return [row(index) for index in self.order if index in self.selected]
+
+    def select_all(self):
+        if self.selectmode == 'extended':
+            self.selected = set(self.order)
+            self.render()
+        return "break"
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.anchor = None
+        self.render()
+
+    # Sắp xếp
+
+    def update_headings(self):
+        for col in self.columns:
+            arrow = ""
+            if col == self.sort_column:
+                arrow = " ▼" if self.sort_reverse else " ▲"
+            self.tree.heading(col, text=f"{col}{arrow}", command=lambda c=col: self.sort_by(c))
+
+    def sort_by(self, column):
+        """Sắp xếp theo cột; bấm lần nữa để đảo chiều. Các dòng đang chọn được giữ nguyên."""
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        self.order = self.store.sort_order(column, self.sort_reverse)
+        self.anchor = None
+        self.cursor = None
+        self.top = 0
+        self.rendered.clear()
+        self.update_headings()
+        self.render()
+
+    # Cuộn và hiển thị
+
+    def max_top(self):
+        return max(0, len(self.order) - self.visible_rows)
+
+    def yview(self, *args):
+        """Lệnh của thanh cuộn dọc: ('moveto', fraction) hoặc ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * len(self.order)))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(1, self.visible_rows - 1)
+            self.scroll_rows(step)
+
+    def scroll_to(self, top):
+        top = min(max(0, top), self.max_top())
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def scroll_rows(self, count):
+        self.scroll_to(self.top + count)
+        return "break"
+
+    def on_mousewheel(self, event):
+        if event.delta:
+            direction = -1 if event.delta > 0 else 1
+            self.scroll_rows(direction * self.SCROLL_UNITS * max(1, abs(event.delta) // 120))
+        return "break"
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.header_height) // self.row_height)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self.top = min(self.top, self.max_top())
+            self.render()
+
+    def display_values(self, index):
+        """Giá trị hiển thị của một dòng, tạo khi cần lần đầu"""
+        values = self.rendered.get(index)
+        if values is None:
+            values = self.store.display_row(index)
+            self.rendered[index] = values
+        return values
+
+    def render(self):
+        """Gán dữ liệu của vùng nhìn thấy vào các item Tk có sẵn"""
+        total = len(self.order)
+        count = min(self.visible_rows, total - self.top)
+
+        # Chỉ giữ đúng số item cần cho vùng nhìn thấy
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", tk.END))
+        if len(self.items) > count:
+            self.tree.delete(*self.items[count:])
+            del self.items[count:]
+
+        selected_items = []
+        for offset, item in enumerate(self.items):
+            index = self.order[self.top + offset]
+            self.tree.item(item, values=self.display_values(index))
+            if index in self.selected:
+                selected_items.append(item)
+        self.tree.selection_set(selected_items)
+
+        # Giữ giá trị hiển thị cho vùng nhìn thấy và buffer, bỏ phần còn lại
+        start = max(0, self.top - self.buffer_rows)
+        end = min(total, self.top + count + self.buffer_rows)
+        if len(self.rendered) > 2 * (end - start):
+            keep = {index: self.rendered[index] for index in self.order[start:end] if index in self.rendered}
+            self.rendered = keep
+        for position in range(start, end):
+            self.display_values(self.order[position])
+
+        if total:
+            self.scroll_y.set(self.top / total, (self.top + count) / total)
+        else:
+            self.scroll_y.set(0, 1)
+        self.calibrate()
+
+    def calibrate(self):
+        """Đo chiều cao dòng và tiêu đề thực tế để tính đúng số dòng nhìn thấy"""
+        if not self.items:
+            return
+        bbox = self.tree.bbox(self.items[0])
+        if not bbox:
+            return
+        header_height, row_height = bbox[1], bbox[3]
+        if row_height > 0 and (row_height, header_height) != (self.row_height, self.header_height):
+            self.row_height = row_height
+            self.header_height = header_height
+            visible = max(1, (self.tree.winfo_height() - header_height) // row_height)
+            if visible != self.visible_rows:
+                self.visible_rows = visible
+                self.top = min(self.top, self.max_top())
+                self.render()
+
+    # Chọn dòng
+
+    def position_at(self, y):
+        """Vị trí trong thứ tự hiển thị của dòng tại tọa độ y, None nếu không có"""
+        item = self.tree.identify_row(y)
+        if not item or item not in self.items:
+            return None
+        return self.top + self.items.index(item)
+
+    def on_click(self, event, toggle=False, extend=False):
+        # Để Treeview tự xử lý bấm tiêu đề (sắp xếp) và kéo độ rộng cột
+        if self.tree.identify_region(event.x, event.y) in ("heading", "separator"):
+            return None
+        self.tree.focus_set()
+        position = self.position_at(event.y)
+        if position is None:
+            return "break"
+        self.select_position(position, toggle=toggle, extend=extend)
+        return "break"
+
+    def select_position(self, position, toggle=False, extend=False):
+        """Chọn dòng tại vị trí hiển thị: bấm thường, Ctrl (đảo chọn) hoặc Shift (chọn đoạn)"""
+        index = self.order[position]
+        if self.selectmode != 'extended':
+            toggle = extend = False
+
+        if extend and self.anchor is not None:
+            start, end = sorted((self.anchor, position))
+            self.selected = set(self.order[start:end + 1])
+        elif toggle:
+            self.selected.symmetric_difference_update((index,))
+            self.anchor = position
+        else:
+            self.selected = {index}
+            self.anchor = position
+        self.cursor = position
+        self.render()
+
+    def move_cursor(self, step, extend=False):
+        """Di chuyển dòng đang chọn bằng bàn phím và cuộn để dòng đó luôn nhìn thấy"""
+        if not self.order:
+            return "break"
+        current = self.cursor if self.cursor is not None else self.top - (1 if step > 0 else -1)
+        position = min(max(0, current + step), len(self.order) - 1)
+        if position < self.top:
+            self.top = position
+        elif position >= self.top + self.visible_rows:
+            self.top = min(position - self.visible_rows + 1, self.max_top())
+        self.select_position(position, extend=extend)
+        return "break"
@@ -9,13 +9,18 @@ import json
 import tempfile
 from datetime import datetime
 from utils.api_handler import APIHandler
+from utils.outbox import OutboxWorker
 from utils.db_handler import DatabaseHandler
 from utils.logger import Logger
-from openpyxl import load_workbook
+from utils.json_serializer import SerializedPayload
+from models.simo_converter import SimoConverter
 
 # Khởi tạo logger
 logger = Logger('web_app')
 
+# Số dòng Excel chuyển đổi mỗi lô
+EXCEL_BATCH_SIZE = 1000
+
 # Khởi tạo API handler
 api_handler = APIHandler()
 
@@ -153,36 +158,29 @@ def convert_to_simo_012(data):
 def convert_excel_to_json(file_path, service_type):
     """Chuyển đổi Excel sang JSON"""
     try:
-        wb = load_workbook(file_path, data_only=True)
-        ws = wb.active
-        
-        # Lấy headers từ dòng đầu tiên
-        headers = [str(cell.value).strip() for cell in ws[1]]
-        
-        # Đọc dữ liệu từ dòng thứ 2
-        raw_data = []
-        for row in ws.iter_rows(min_row=2):
-            row_dict = {}
-            for header, cell in zip(headers, row):
-                value = cell.value if cell.value is not None else ""
-                row_dict[header] = value
-            raw_data.append(row_dict)
-
-        # Chuyển đổi dữ liệu theo định dạng tương ứng
-        if service_type == "simo_001":
-            return convert_to_simo_001(raw_data)
-        elif service_type == "simo_002":
-            return convert_to_simo_002(raw_data)
-        elif service_type == "simo_003":
-            return convert_to_simo_003(raw_data)
-        elif service_type == "simo_004":
-            return convert_to_simo_004(raw_data)
-        elif service_type == "simo_011":
-            return convert_to_simo_011(raw_data)
-        elif service_type == "simo_012":
-            return convert_to_simo_012(raw_data)
-        else:
+        converters = {
+            "simo_001": convert_to_simo_001,
+            "simo_002": convert_to_simo_002,
+            "simo_003": convert_to_simo_003,
+            "simo_004": convert_to_simo_004,
+            "simo_011": convert_to_simo_011,
+            "simo_012": convert_to_simo_012
+        }
+        converter = converters.get(service_type)
+        if converter is None:
             raise ValueError(f"Không hỗ trợ chuyển đổi cho loại dịch vụ: {service_type}")
+        
+        # Đọc file ở chế độ read-only và chuyển đổi theo từng lô
+        result = []
+        batch = []
+        for row_dict in SimoConverter.iter_excel_rows(file_path):
+            batch.append(row_dict)
+            if len(batch) >= EXCEL_BATCH_SIZE:
+                result.extend(converter(batch))
+                batch = []
+        if batch:
+            result.extend(converter(batch))
+        return result
             
     except Exception as e:
         logger.error(f"Lỗi khi chuyển đổi Excel sang JSON: {str(e)}")
@@ -238,15 +236,15 @@ def simo_web_app():
                 with put_loading():
                     data = convert_excel_to_json(temp_file, service_type)
                 
-                # Hiển thị JSON
-                json_str = json.dumps(data, ensure_ascii=False, indent=2)
+                # Hiển thị JSON (serialize một lần, dùng lại khi tải xuống)
+                serialized = SerializedPayload(data)
                 
                 # Tạo container cho JSON
                 put_markdown("### Kết quả chuyển đổi:")
-                put_code(json_str, language='json')
+                put_code(serialized.text, language='json')
                 
                 # Tạo nút để tải xuống JSON
-                put_button("Tải xuống JSON", onclick=lambda: download(f"payload_{service_type}.json", json_str))
+                put_button("Tải xuống JSON", onclick=lambda: download(f"payload_{service_type}.json", serialized.content))
                 
                 # Tạo nút để gửi dữ liệu
                 put_button("Gửi dữ liệu", onclick=lambda: send_data(service_type, data))
@@ -373,6 +371,9 @@ def simo_web_app():
                         logger.error(f"Lỗi khi lưu endpoint URL: {str(e)}")
                         success = False
             
+            # URL endpoint đã được cache trong APIHandler
+            APIHandler.clear_endpoint_cache()
+            
             if success:
                 toast("Đã lưu cấu hình endpoint")
             else:
@@ -488,5 +489,11 @@ if __name__ == '__main__':
     if not os.path.exists('logs'):
         os.makedirs('logs')
     
+    debug = True
+    # Luồng nền gửi lại các phần còn trong outbox. Ở chế độ debug, reloader của Werkzeug chạy khối này
+    # ở cả tiến trình cha và tiến trình con, chỉ khởi động ở tiến trình phục vụ request (con)
+    if api_handler.outbox is not None and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        OutboxWorker(api_handler, api_handler.outbox).start()
+    
     # Chạy ứng dụng web
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=8080, debug=debug)
\ No newline at end of file